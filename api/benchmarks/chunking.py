@@ -0,0 +1,161 @@
+"""
+Micro-benchmark of the concept extraction chunker.
+
+Compares `TokenChunker` with the previous `_split_text_by_size` implementation
+of `PDFProcessorService` on a book-sized corpus.
+
+Usage (from the `api` directory):
+
+    python -m benchmarks.chunking --corpus path/to/book.pdf
+    python -m benchmarks.chunking --corpus path/to/book.txt --overlap 200
+    python -m benchmarks.chunking  # synthetic ~300 pages book
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from pathlib import Path
+
+import tiktoken
+from PyPDF2 import PdfReader
+from src.utils.chunking import DEFAULT_ENCODING, TokenChunker, get_encoding
+
+
+def legacy_split_text_by_size(text: str, max_tokens: int) -> list[str]:
+    """Copy of the former `PDFProcessorService._split_text_by_size`."""
+    encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    if not text.strip():
+        return []
+    sentences = re.split(r"(?<=[.!?])\s+", text)
+    chunks = []
+    current_chunk = ""
+    current_chunk_tokens = 0
+
+    for sentence in sentences:
+        sentence_tokens = len(encoding.encode(sentence))
+        if sentence_tokens > max_tokens:
+            words = sentence.split()
+            sub_chunk = ""
+            sub_chunk_tokens = 0
+            for word in words:
+                word_tokens = len(encoding.encode(word))
+                space_tokens = len(encoding.encode(" ")) if sub_chunk else 0
+                if sub_chunk_tokens + space_tokens + word_tokens <= max_tokens:
+                    sub_chunk += (" " if sub_chunk else "") + word
+                    sub_chunk_tokens += space_tokens + word_tokens
+                else:
+                    if current_chunk:
+                        space_tokens_chunk = len(encoding.encode(" "))
+                        if (
+                            current_chunk_tokens + space_tokens_chunk + sub_chunk_tokens
+                            <= max_tokens
+                        ):
+                            current_chunk += " " + sub_chunk
+                            current_chunk_tokens += space_tokens_chunk + sub_chunk_tokens
+                        else:
+                            chunks.append(current_chunk)
+                            current_chunk = sub_chunk
+                            current_chunk_tokens = sub_chunk_tokens
+                    else:
+                        chunks.append(sub_chunk)
+                    sub_chunk = word
+                    sub_chunk_tokens = word_tokens
+            if sub_chunk:
+                if current_chunk:
+                    space_tokens_chunk = len(encoding.encode(" "))
+                    if (
+                        current_chunk_tokens + space_tokens_chunk + sub_chunk_tokens
+                        <= max_tokens
+                    ):
+                        current_chunk += " " + sub_chunk
+                        current_chunk_tokens += space_tokens_chunk + sub_chunk_tokens
+                    else:
+                        chunks.append(current_chunk)
+                        current_chunk = sub_chunk
+                        current_chunk_tokens = sub_chunk_tokens
+                else:
+                    current_chunk = sub_chunk
+                    current_chunk_tokens = sub_chunk_tokens
+        else:
+            space_tokens = len(encoding.encode(" ")) if current_chunk else 0
+            if current_chunk_tokens + space_tokens + sentence_tokens <= max_tokens:
+                current_chunk += (" " if current_chunk else "") + sentence
+                current_chunk_tokens += space_tokens + sentence_tokens
+            else:
+                if current_chunk:
+                    chunks.append(current_chunk)
+                current_chunk = sentence
+                current_chunk_tokens = sentence_tokens
+
+    if current_chunk:
+        chunks.append(current_chunk)
+
+    return chunks
+
+
+def load_corpus(corpus: Path | None, pages: int) -> str:
+    if corpus is None:
+        # Deterministic synthetic book: ~400 words per page
+        rng = random.Random(0)
+        vocabulary = [
+            "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(2, 11)))
+            for _ in range(5000)
+        ]
+        sentences = []
+        for _ in range(pages * 20):
+            sentence = " ".join(rng.choices(vocabulary, k=rng.randint(5, 35)))
+            sentences.append(sentence.capitalize() + rng.choice([".", ".", "?", "!"]))
+        return " ".join(sentences)
+    if corpus.suffix.lower() == ".pdf":
+        return "\n".join(page.extract_text() or "" for page in PdfReader(corpus).pages)
+    return corpus.read_text()
+
+
+def measure(name: str, split, text: str, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = split(text)
+        timings.append(time.perf_counter() - start)
+    encoding = get_encoding()
+    chunk_tokens = [len(encoding.encode(chunk)) for chunk in chunks]
+    return {
+        "implementation": name,
+        "best_seconds": round(min(timings), 4),
+        "chunks": len(chunks),
+        "max_chunk_tokens": max(chunk_tokens, default=0),
+        "mean_chunk_tokens": round(sum(chunk_tokens) / max(len(chunks), 1), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", type=Path, help="PDF or text file to split")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic book pages")
+    parser.add_argument("--max-tokens", type=int, default=4000)
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = load_corpus(args.corpus, args.pages)
+    chunker = TokenChunker(max_tokens=args.max_tokens, overlap_tokens=args.overlap)
+    results = {
+        "corpus_characters": len(text),
+        "corpus_tokens": len(get_encoding().encode(text)),
+        "results": [
+            measure(
+                "legacy_split_text_by_size",
+                lambda text: legacy_split_text_by_size(text, args.max_tokens),
+                text,
+                args.repeat,
+            ),
+            measure("TokenChunker", chunker.split, text, args.repeat),
+        ],
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Deterministic local stand-ins for Ollama, LLMSherpa, MongoDB, Neo4j, Redis and
+the tiktoken encoding.
+
+They implement the subset of the client APIs used by the ingestion pipeline,
+with configurable latencies, so benchmarks measure the pipeline itself
+without any external service.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import random
+import re
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+import numpy as np
+from llmsherpa.readers import Document
+from ollama import ChatResponse, EmbedResponse, Message
+from src.database.neo4j_schema import NEO4J_CONSTRAINTS, NEO4J_INDEXES
+from src.utils.chunking import DEFAULT_ENCODING, get_encoding
+from src.utils.pdf_reader import flatten_sections
+
+WORD_PATTERN = re.compile(r"[a-z]{6,}")
+
+
+def text_seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def make_vocabulary(size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 11)))
+        for _ in range(size)
+    ]
+
+
+def make_book_blocks(
+    pages: int,
+    seed: int = 0,
+    sections_per_page: float = 0.5,
+    paragraphs_per_page: int = 6,
+    vocabulary_size: int = 5000,
+) -> list[dict[str, Any]]:
+    """LLMSherpa layout blocks of a synthetic book: headers and paragraphs."""
+    rng = random.Random(seed)
+    # Books share a vocabulary, so concepts recur across books like in a library
+    vocabulary = make_vocabulary(vocabulary_size)
+    blocks = []
+    section_number = 0
+    for page_idx in range(pages):
+        if page_idx == 0 or rng.random() < sections_per_page:
+            section_number += 1
+            blocks.append(
+                {
+                    "tag": "header",
+                    "level": 0,
+                    "page_idx": page_idx,
+                    "block_idx": len(blocks),
+                    "sentences": [f"Chapter {section_number} {rng.choice(vocabulary)}"],
+                }
+            )
+        for _ in range(paragraphs_per_page):
+            sentences = [
+                " ".join(rng.choices(vocabulary, k=rng.randint(8, 25))).capitalize()
+                + "."
+                for _ in range(rng.randint(2, 5))
+            ]
+            blocks.append(
+                {
+                    "tag": "para",
+                    "level": 1,
+                    "page_idx": page_idx,
+                    "block_idx": len(blocks),
+                    "sentences": sentences,
+                }
+            )
+    return blocks
+
+
+class LocalEncoding:
+    """
+    Offline stand-in for a tiktoken encoding: every word, with the whitespace
+    before it, is one token. Implements what `TokenChunker` uses.
+    """
+
+    name = "local"
+    TOKEN_PATTERN = re.compile(r"\s*\S+|\s+")
+
+    def __init__(self) -> None:
+        self.token_ids: dict[bytes, int] = {}
+        self.tokens: list[bytes] = []
+
+    def encode(self, text: str, disallowed_special: Any = ()) -> list[int]:
+        token_ids = []
+        for token in self.TOKEN_PATTERN.findall(text):
+            token_bytes = token.encode("utf-8")
+            if token_bytes not in self.token_ids:
+                self.token_ids[token_bytes] = len(self.tokens)
+                self.tokens.append(token_bytes)
+            token_ids.append(self.token_ids[token_bytes])
+        return token_ids
+
+    def decode_tokens_bytes(self, token_ids: list[int]) -> list[bytes]:
+        return [self.tokens[token_id] for token_id in token_ids]
+
+
+def load_encoding() -> Any:
+    """
+    The encoding of the chunker, downloaded by tiktoken on first use unless
+    found in `TIKTOKEN_CACHE_DIR`, or `LocalEncoding` when it can't be loaded.
+    """
+    try:
+        return get_encoding()
+    except Exception as e:
+        logging.warning(
+            f"Encoding {DEFAULT_ENCODING} not available ({e}), chunking with "
+            "LocalEncoding: texts count fewer tokens"
+        )
+        return LocalEncoding()
+
+
+class FakeLayoutPDFReader:
+    """LayoutPDFReader reading the layout blocks of a PDF from a fixture."""
+
+    parser_api_url = "fake://llmsherpa"
+
+    def __init__(self, library: dict[str, list[dict[str, Any]]]) -> None:
+        # Layout blocks by PDF path
+        self.library = library
+
+    def read_pdf(self, path_or_url: str) -> Document:
+        return Document(self.library[path_or_url])
+
+
+def parse_fixture(library: dict[str, list[dict[str, Any]]], pdf_url: str) -> dict:
+    """Stand-in for `parse_pdf`, flattening the layout fixture of the PDF."""
+    blocks = library[pdf_url]
+    return {
+        "title": pdf_url,
+        "pages": max((block["page_idx"] for block in blocks), default=-1) + 1,
+        "sections": flatten_sections(FakeLayoutPDFReader(library).read_pdf(pdf_url)),
+    }
+
+
+class FakeOllamaClient:
+    """
+    Ollama `AsyncClient` answering after a fixed latency.
+
+    Concepts are words picked from the chunk and embeddings are unit vectors
+    seeded by the text, so the same input always gets the same answer.
+    """
+
+    def __init__(
+        self,
+        chat_latency: float = 0.0,
+        embed_latency: float = 0.0,
+        concepts_per_chunk: int = 8,
+        dimensions: int = 768,
+    ) -> None:
+        self.chat_latency = chat_latency
+        self.embed_latency = embed_latency
+        self.concepts_per_chunk = concepts_per_chunk
+        self.dimensions = dimensions
+        self.chat_requests = 0
+        self.embed_requests = 0
+
+    def embedding(self, text: str) -> list[float]:
+        vector = np.random.default_rng(text_seed(text)).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    async def chat(self, model: str, messages: list[dict[str, str]], **kwargs: Any):
+        self.chat_requests += 1
+        await asyncio.sleep(self.chat_latency)
+        prompt = messages[-1]["content"]
+        words = sorted(set(WORD_PATTERN.findall(prompt.lower())))
+        rng = random.Random(text_seed(prompt))
+        concepts = rng.sample(words, min(self.concepts_per_chunk, len(words)))
+        content = json.dumps({"concepts": concepts})
+        return ChatResponse(
+            model=model,
+            message=Message(role="assistant", content=content),
+            prompt_eval_count=len(prompt) // 4,
+            eval_count=len(content) // 4,
+        )
+
+    async def embed(self, model: str, input: str | list[str], **kwargs: Any):
+        self.embed_requests += 1
+        await asyncio.sleep(self.embed_latency)
+        texts = [input] if isinstance(input, str) else input
+        return EmbedResponse(
+            model=model,
+            embeddings=[self.embedding(text) for text in texts],
+            prompt_eval_count=sum(len(text) // 4 for text in texts),
+        )
+
+
+def get_field(document: dict[str, Any], path: str) -> Any:
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def matches(document: dict[str, Any], query: dict[str, Any]) -> bool:
+    for path, condition in query.items():
+        value = get_field(document, path)
+        is_operator = isinstance(condition, dict) and any(
+            key.startswith("$") for key in condition
+        )
+        if is_operator:
+            for operator, operand in condition.items():
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+                if operator == "$ne" and value == operand:
+                    return False
+                if operator == "$exists" and (value is not None) != operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def apply_update(document: dict[str, Any], update: dict[str, Any]) -> None:
+    for operator, fields in update.items():
+        for path, operand in fields.items():
+            *parents, name = path.split(".")
+            target = document
+            for part in parents:
+                target = target.setdefault(part, {})
+            if operator == "$set":
+                target[name] = copy.deepcopy(operand)
+            elif operator == "$inc":
+                target[name] = target.get(name, 0) + operand
+            else:
+                raise NotImplementedError(f"Unsupported update operator {operator}")
+
+
+def project(document: dict[str, Any], projection: dict[str, int] | None) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    included = [field for field, include in projection.items() if include]
+    projected = {
+        field: copy.deepcopy(document[field]) for field in included if field in document
+    }
+    if projection.get("_id", 1) and "_id" in document:
+        projected["_id"] = document["_id"]
+    return projected
+
+
+class InMemoryCursor:
+    def __init__(self, documents: list[dict[str, Any]]) -> None:
+        self.documents = documents
+
+    def sort(self, key: str, direction: int = 1) -> "InMemoryCursor":
+        self.documents.sort(
+            key=lambda document: document.get(key), reverse=direction < 0
+        )
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        self.documents = self.documents[:count]
+        return self
+
+    def batch_size(self, size: int) -> "InMemoryCursor":
+        return self
+
+    async def to_list(self, length: int | None = None) -> list[dict[str, Any]]:
+        return self.documents[:length]
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        for document in self.documents:
+            yield document
+
+
+class InMemoryCollection:
+    """Motor collection backed by a dict, for the queries of the repositories."""
+
+    def __init__(self, name: str, latency: float = 0.0) -> None:
+        self.name = name
+        self.latency = latency
+        self.documents: dict[Any, dict[str, Any]] = {}
+        self.operations = 0
+        self._next_id = 0
+
+    async def _round_trip(self) -> None:
+        self.operations += 1
+        await asyncio.sleep(self.latency)
+
+    def _find(self, query: dict[str, Any]) -> list[dict[str, Any]]:
+        return [
+            document for document in self.documents.values() if matches(document, query)
+        ]
+
+    def _insert(self, document: dict[str, Any]) -> Any:
+        document = copy.deepcopy(document)
+        if "_id" not in document:
+            self._next_id += 1
+            document["_id"] = self._next_id
+        self.documents[document["_id"]] = document
+        return document["_id"]
+
+    def _upsert(
+        self, query: dict[str, Any], update: dict[str, Any], upsert: bool
+    ) -> int:
+        documents = self._find(query)
+        if not documents and upsert:
+            documents = [self.documents[self._insert(dict(query))]]
+        for document in documents[:1]:
+            apply_update(document, update)
+        return len(documents[:1])
+
+    async def create_index(self, keys: Any, **kwargs: Any) -> str:
+        return "index"
+
+    async def insert_one(self, document: dict[str, Any]):
+        await self._round_trip()
+        return SimpleNamespace(inserted_id=self._insert(document))
+
+    async def insert_many(self, documents: list[dict[str, Any]]):
+        await self._round_trip()
+        return SimpleNamespace(inserted_ids=[self._insert(doc) for doc in documents])
+
+    async def find_one(
+        self, query: dict[str, Any], projection: dict | None = None, sort: Any = None
+    ) -> dict[str, Any] | None:
+        await self._round_trip()
+        documents = self._find(query)
+        for key, direction in reversed(sort or []):
+            documents.sort(
+                key=lambda document: document.get(key), reverse=direction < 0
+            )
+        return project(documents[0], projection) if documents else None
+
+    def find(
+        self, query: dict[str, Any], projection: dict | None = None
+    ) -> InMemoryCursor:
+        self.operations += 1
+        return InMemoryCursor([project(doc, projection) for doc in self._find(query)])
+
+    async def find_one_and_update(
+        self,
+        query: dict[str, Any],
+        update: dict[str, Any],
+        projection: dict | None = None,
+        return_document: bool = False,
+        upsert: bool = False,
+    ) -> dict[str, Any] | None:
+        await self._round_trip()
+        documents = self._find(query)
+        before = project(documents[0], projection) if documents else None
+        self._upsert(query, update, upsert)
+        if not return_document:
+            return before
+        documents = self._find(query)
+        return project(documents[0], projection) if documents else None
+
+    async def update_one(
+        self, query: dict[str, Any], update: dict[str, Any], upsert: bool = False
+    ):
+        await self._round_trip()
+        return SimpleNamespace(modified_count=self._upsert(query, update, upsert))
+
+    async def update_many(self, query: dict[str, Any], update: dict[str, Any]):
+        await self._round_trip()
+        documents = self._find(query)
+        for document in documents:
+            apply_update(document, update)
+        return SimpleNamespace(modified_count=len(documents))
+
+    async def bulk_write(self, requests: list[Any], ordered: bool = True):
+        await self._round_trip()
+        for request in requests:
+            # pymongo.UpdateOne keeps its arguments in private attributes
+            self._upsert(request._filter, request._doc, request._upsert)
+        return SimpleNamespace(modified_count=len(requests))
+
+    async def delete_many(self, query: dict[str, Any]):
+        await self._round_trip()
+        documents = self._find(query)
+        for document in documents:
+            del self.documents[document["_id"]]
+        return SimpleNamespace(deleted_count=len(documents))
+
+    async def estimated_document_count(self) -> int:
+        return len(self.documents)
+
+
+class InMemoryMongoDatabase:
+    """Motor database stand-in, every operation costs `latency` seconds."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.collections: dict[str, InMemoryCollection] = {}
+
+    def get_collection(self, name: str) -> InMemoryCollection:
+        if name not in self.collections:
+            self.collections[name] = InMemoryCollection(name, self.latency)
+        return self.collections[name]
+
+    @property
+    def operations(self) -> int:
+        return sum(collection.operations for collection in self.collections.values())
+
+
+class FakeNeo4jResult:
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        self.records = records
+
+    async def consume(self) -> None:
+        return None
+
+    async def data(self) -> list[dict[str, Any]]:
+        return self.records
+
+    async def single(self) -> dict[str, Any] | None:
+        return self.records[0] if self.records else None
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        for record in self.records:
+            yield record
+
+
+class FakeNeo4jDriver:
+    """
+    Neo4j `AsyncDriver` stand-in: queries are not executed, every transaction
+    costs `transaction_latency` plus `row_latency` per `$rows` element.
+    The graph schema is reported online.
+    """
+
+    def __init__(
+        self, transaction_latency: float = 0.0, row_latency: float = 0.0
+    ) -> None:
+        self.transaction_latency = transaction_latency
+        self.row_latency = row_latency
+        self.transactions = 0
+        self.queries = 0
+        self.rows = 0
+
+    async def run(
+        self, query: str, parameters: dict[str, Any] | None = None, **kwargs: Any
+    ) -> FakeNeo4jResult:
+        parameters = {**(parameters or {}), **kwargs}
+        self.queries += 1
+        rows = len(parameters.get("rows", []))
+        self.rows += rows
+        await asyncio.sleep(self.transaction_latency + rows * self.row_latency)
+        if query.startswith("SHOW INDEXES"):
+            return FakeNeo4jResult(
+                [
+                    {"name": name, "state": "ONLINE"}
+                    for name in [*NEO4J_CONSTRAINTS, *NEO4J_INDEXES]
+                ]
+            )
+        return FakeNeo4jResult([])
+
+    async def execute_write(self, work: Any, *args: Any, **kwargs: Any) -> Any:
+        self.transactions += 1
+        return await work(SimpleNamespace(run=self.run), *args, **kwargs)
+
+    execute_read = execute_write
+
+    @asynccontextmanager
+    async def session(self, **kwargs: Any) -> AsyncIterator["FakeNeo4jDriver"]:
+        yield self
+
+    async def close(self) -> None:
+        return None
+
+
+class FakeRedis:
+    """Redis stand-in for the library events published by the workers."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+        self.published: list[tuple[str, str]] = []
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = True) -> AsyncIterator["FakeRedis"]:
+        yield self
+
+    def incr(self, key: str) -> None:
+        self.values[key] = self.values.get(key, 0) + 1
+
+    def publish(self, channel: str, message: str) -> None:
+        self.published.append((channel, message))
+
+    async def execute(self) -> list[Any]:
+        return []
@@ -0,0 +1,234 @@
+"""
+End-to-end benchmark of `PDFProcessorService.process_pdf` on local stand-ins.
+
+Synthetic books are parsed from LLMSherpa layout fixtures and processed
+against the fakes of `benchmarks.fakes` (Ollama answering after a fixed
+latency, in-memory MongoDB, Neo4j accepting writes without storing them),
+so the results only depend on the pipeline code and on the parameters.
+Every combination of book size, books processed at once and Ollama requests
+in flight is run `--repeat` times, plus once under tracemalloc to measure
+the peak memory of the Python allocations.
+
+Chunks are counted with the `o200k_base` encoding, which tiktoken downloads
+on first use. Offline, point `TIKTOKEN_CACHE_DIR` to a directory where it was
+cached, otherwise the word level `LocalEncoding` is used instead (reported as
+`encoding` in the results).
+
+Usage (from the `api` directory):
+
+    python -m benchmarks.ingestion
+    python -m benchmarks.ingestion --pages 50 300 --books 1 4 --in-flight 1 8
+    python -m benchmarks.ingestion --chat-latency 0.5 --output before.json
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import platform
+import statistics
+import time
+import tracemalloc
+from typing import Any
+from unittest.mock import patch
+
+from benchmarks.fakes import (
+    FakeLayoutPDFReader,
+    FakeNeo4jDriver,
+    FakeOllamaClient,
+    FakeRedis,
+    InMemoryMongoDatabase,
+    load_encoding,
+    make_book_blocks,
+    parse_fixture,
+)
+from bson import ObjectId
+from src.config.settings import app_settings
+from src.schemas.upload import ProcessedBook
+from src.services.pdf_processing import PDFProcessorService
+from src.utils.llm_scheduler import LLMScheduler
+from src.utils.metrics import sum_metrics
+from src.utils.pdf_reader import get_pdf_parsing_executor
+
+
+class BenchmarkPDFProcessorService(PDFProcessorService):
+    async def _read_pdf(self, pdf_url: str, document_id: str) -> ProcessedBook:
+        # Same executor as the real parsing, only the PDF of the book is sent
+        loop = asyncio.get_running_loop()
+        parsed_pdf = await loop.run_in_executor(
+            get_pdf_parsing_executor(),
+            parse_fixture,
+            {pdf_url: self.pdf_reader.library[pdf_url]},
+            pdf_url,
+        )
+        return ProcessedBook(document_id=document_id, **parsed_pdf)
+
+
+async def run_ingestion(
+    args: argparse.Namespace, pages: int, books: int, in_flight: int
+) -> dict[str, Any]:
+    library = {
+        f"benchmark-{pages}-pages-{index}.pdf": make_book_blocks(
+            pages, seed=args.seed + index
+        )
+        for index in range(books)
+    }
+    ollama_client = FakeOllamaClient(
+        chat_latency=args.chat_latency, embed_latency=args.embed_latency
+    )
+    mongo_db = InMemoryMongoDatabase(latency=args.mongo_latency)
+    neo4j_driver = FakeNeo4jDriver(
+        transaction_latency=args.neo4j_latency, row_latency=args.neo4j_row_latency
+    )
+    service = BenchmarkPDFProcessorService(
+        ollama_client=ollama_client,
+        mongo_db=mongo_db,
+        neo4j_sync_driver=None,
+        neo4j_async_driver=neo4j_driver,
+        pdf_reader=FakeLayoutPDFReader(library),
+    )
+    scheduler = LLMScheduler(max_in_flight=in_flight)
+    service.llm_scheduler = scheduler
+    service.embedding_service.llm_scheduler = scheduler
+
+    start_time = time.perf_counter()
+    with patch("src.utils.events.get_redis", return_value=FakeRedis()):
+        documents = await asyncio.gather(
+            *(service.process_pdf(pdf_url, str(ObjectId())) for pdf_url in library)
+        )
+    seconds = time.perf_counter() - start_time
+
+    processing_documents = mongo_db.get_collection("pdf_processing").documents.values()
+    metrics = sum_metrics(document["metrics"] for document in processing_documents)
+    return {
+        "seconds": seconds,
+        "completed": sum(document.status == "COMPLETED" for document in documents),
+        "pages": sum(document["pages"] for document in processing_documents),
+        "sections": sum(
+            document["sections_processed"] for document in processing_documents
+        ),
+        "concepts": sum(
+            document["concepts_extracted"] for document in processing_documents
+        ),
+        "chat_requests": ollama_client.chat_requests,
+        "embed_requests": ollama_client.embed_requests,
+        "neo4j_transactions": neo4j_driver.transactions,
+        "neo4j_rows": neo4j_driver.rows,
+        "mongo_operations": mongo_db.operations,
+        "stage_seconds": {
+            key.split(".")[1]: round(value, 4)
+            for key, value in metrics.items()
+            if key.startswith("stages.") and key.endswith(".seconds")
+        },
+    }
+
+
+async def measure_peak_memory(
+    args: argparse.Namespace, pages: int, books: int, in_flight: int
+) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        await run_ingestion(args, pages, books, in_flight)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024**2, 2)
+
+
+async def benchmark(args: argparse.Namespace) -> list[dict[str, Any]]:
+    results = []
+    for pages, books, in_flight in itertools.product(
+        args.pages, args.books, args.in_flight
+    ):
+        runs = [
+            await run_ingestion(args, pages, books, in_flight)
+            for _ in range(args.repeat)
+        ]
+        best_run = min(runs, key=lambda run: run["seconds"])
+        seconds = [run["seconds"] for run in runs]
+        results.append(
+            {
+                "pages_per_book": pages,
+                "books": books,
+                "max_in_flight": in_flight,
+                "best_seconds": round(best_run["seconds"], 4),
+                "median_seconds": round(statistics.median(seconds), 4),
+                "pages_per_second": round(best_run["pages"] / best_run["seconds"], 2),
+                "sections_per_second": round(
+                    best_run["sections"] / best_run["seconds"], 2
+                ),
+                "peak_memory_mb": await measure_peak_memory(
+                    args, pages, books, in_flight
+                ),
+                **{
+                    key: value
+                    for key, value in best_run.items()
+                    if key not in ("seconds", "pages", "sections")
+                },
+                "total_pages": best_run["pages"],
+                "total_sections": best_run["sections"],
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 300])
+    parser.add_argument("--books", type=int, nargs="+", default=[1, 4])
+    parser.add_argument(
+        "--in-flight",
+        type=int,
+        nargs="+",
+        default=[app_settings.OLLAMA_MAX_IN_FLIGHT],
+        help="Ollama requests in flight per model",
+    )
+    parser.add_argument("--chat-latency", type=float, default=0.05)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--neo4j-latency", type=float, default=0.005)
+    parser.add_argument("--neo4j-row-latency", type=float, default=0.00001)
+    parser.add_argument("--mongo-latency", type=float, default=0.0005)
+    parser.add_argument(
+        "--window-size", type=int, default=app_settings.INGESTION_WINDOW_SIZE
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    app_settings.INGESTION_WINDOW_SIZE = args.window_size
+    # Start the parsing processes before measuring
+    get_pdf_parsing_executor().submit(parse_fixture, {"": []}, "").result()
+    encoding = load_encoding()
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "pdf_parsing_processes": app_settings.PDF_PARSING_PROCESSES,
+            "ingestion_window_size": app_settings.INGESTION_WINDOW_SIZE,
+            "embedding_batch_size": app_settings.EMBEDDING_BATCH_SIZE,
+            "neo4j_write_batch_size": app_settings.NEO4J_WRITE_BATCH_SIZE,
+            "encoding": encoding.name,
+        },
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "window_size")
+        },
+    }
+    with patch("src.utils.chunking.get_encoding", return_value=encoding):
+        results["results"] = asyncio.run(benchmark(args))
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Latency and throughput of `/v1/search-concept` as the graph grows.
+
+Seeds Neo4j with synthetic books, sections and concepts (random 768-d
+embeddings) through `PDFProcessingRepository`, then drives the endpoint
+concurrently through the ASGI app, in process, for every retrieval strategy:
+
+* `brute_force`: cosine similarity computed against every concept node
+  (`vector.similarity.cosine`, the GDS plugin isn't installed)
+* `vector_index`: the Neo4j vector index (`mode: vector`)
+* `ann_index`: the local IVF index of the API process
+* `hybrid`: fulltext and vector search fused (`mode: hybrid`)
+* `two_stage`: nearest books and sections by their concept centroids, then
+  their concepts only (`mode: two_stage`)
+* `cached`: repeated queries served by the Redis results cache
+
+Query embeddings come from the fake Ollama client of `benchmarks.fakes`, so
+only the search itself is measured. Needs the Neo4j and Redis of the
+configured environment: run it against a disposable one, the seeded books
+(document ids starting with `benchmark-`) are only deleted with `--cleanup`.
+
+Usage (from the `api` directory):
+
+    python -m benchmarks.retrieval --books 10 100 1000 --cleanup
+    python -m benchmarks.retrieval --books 100 --strategies vector_index cached
+    python -m benchmarks.retrieval --books 100 --concurrency 1 16 --requests 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+from benchmarks.fakes import FakeOllamaClient, make_vocabulary
+from src.config.settings import app_settings
+from src.database.connections import close_connections
+from src.database.mongodb import get_mongodb
+from src.database.neo4j import get_neo4j_async, get_neo4j_sync
+from src.database.neo4j_schema import INDEXES_ONLINE_TIMEOUT
+from src.main import ai_library_app
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.repository.retrieval import RetrievalRepository
+from src.schemas.upload import (
+    Concepts,
+    ProcessedBook,
+    SectionData,
+    SectionParagraphData,
+)
+from src.services.concept_index import ConceptIndexService, get_concept_index_service
+from src.utils.ann_index import ConceptANNIndex
+from src.utils.events import publish_book_ingested
+from src.utils.ollama_client import get_ollama_client
+from src.utils.pdf_reader import paragraph_id, section_id
+from src.utils.vectors import centroid
+
+BENCHMARK_PREFIX = "benchmark-"
+CONCEPT_PREFIX = "benchmark-concept-"
+STRATEGIES = [
+    "brute_force",
+    "vector_index",
+    "ann_index",
+    "hybrid",
+    "two_stage",
+    "cached",
+]
+
+# Exhaustive scan of the concepts, in place of the vector index
+CYPHER_BRUTE_FORCE_SEARCH_SECTIONS = (
+    """
+    MATCH (concept:Concept)
+    WITH concept,
+        vector.similarity.cosine(concept.embedding, $query_embedding) AS score
+    ORDER BY score DESC
+    LIMIT $k
+    """
+    + RetrievalRepository.CYPHER_RANK_SECTIONS
+)
+
+CYPHER_DELETE_BENCHMARK = [
+    """
+    MATCH (section:Section)-[:HAS_PARAGRAPH]->(paragraph:Paragraph)
+    WHERE section.document_id STARTS WITH $prefix
+    CALL { WITH paragraph DETACH DELETE paragraph } IN TRANSACTIONS OF 5000 ROWS
+    """,
+    """
+    MATCH (node) WHERE (node:Book OR node:Section)
+        AND node.document_id STARTS WITH $prefix
+    CALL { WITH node DETACH DELETE node } IN TRANSACTIONS OF 5000 ROWS
+    """,
+    """
+    MATCH (concept:Concept) WHERE concept.name STARTS WITH $concept_prefix
+    CALL { WITH concept DETACH DELETE concept } IN TRANSACTIONS OF 5000 ROWS
+    """,
+]
+
+
+def make_book(
+    book_index: int,
+    args: argparse.Namespace,
+    vocabulary: list[str],
+    embedder: FakeOllamaClient,
+) -> ProcessedBook:
+    """Synthetic book whose sections mention concepts of a growing pool."""
+    rng = random.Random(book_index)
+    concepts_pool = (book_index + 1) * args.concepts_per_book
+    sections = []
+    for section_index in range(args.sections_per_book):
+        names = [
+            f"{CONCEPT_PREFIX}{concept_id}"
+            for concept_id in rng.sample(
+                range(concepts_pool), min(args.concepts_per_section, concepts_pool)
+            )
+        ]
+        embeddings = [embedder.embedding(name) for name in names]
+        texts = [
+            " ".join(rng.choices(vocabulary, k=rng.randint(30, 80))) + "."
+            for _ in range(args.paragraphs_per_section)
+        ]
+        sections.append(
+            SectionData(
+                section_id=section_id("", f"Section {section_index + 1}", 0),
+                section_name=f"Section {section_index + 1}",
+                section_paragraphs_data=[
+                    SectionParagraphData(
+                        id=paragraph_id(text),
+                        position=position,
+                        level=1,
+                        text=text,
+                        page=section_index + 1,
+                    )
+                    for position, text in enumerate(texts)
+                ],
+                concepts=[
+                    Concepts(name=name, embedding=embedding)
+                    for name, embedding in zip(names, embeddings)
+                ],
+                embedding=centroid(embeddings),
+            )
+        )
+    return ProcessedBook(
+        document_id=f"{BENCHMARK_PREFIX}{book_index}",
+        title=f"Benchmark book {book_index}",
+        author="Benchmark",
+        pages=args.sections_per_book,
+        sections=sections,
+    )
+
+
+async def seed_library(
+    repository: PDFProcessingRepository,
+    start: int,
+    stop: int,
+    args: argparse.Namespace,
+    embedder: FakeOllamaClient,
+) -> float:
+    """Store the books `start` to `stop` like the ingestion does."""
+    vocabulary = make_vocabulary(5000)
+    start_time = time.perf_counter()
+    for book_index in range(start, stop):
+        book = make_book(book_index, args, vocabulary, embedder)
+        await repository.store_book_in_neo4j(book)
+        await repository.store_sections_in_neo4j(book.document_id, book.sections)
+        await repository.finalize_book_in_neo4j(book.document_id)
+    async with get_neo4j_async().session() as session:
+        result = await session.run(
+            "CALL db.awaitIndexes($timeout)", timeout=INDEXES_ONLINE_TIMEOUT
+        )
+        await result.consume()
+    # Bump the library version, cached results of a smaller library are stale
+    await publish_book_ingested(f"{BENCHMARK_PREFIX}{stop - 1}")
+    return time.perf_counter() - start_time
+
+
+async def delete_library() -> None:
+    async with get_neo4j_async().session() as session:
+        for query in CYPHER_DELETE_BENCHMARK:
+            result = await session.run(
+                query, prefix=BENCHMARK_PREFIX, concept_prefix=CONCEPT_PREFIX
+            )
+            await result.consume()
+
+
+@contextmanager
+def use_strategy(
+    strategy: str,
+    embedder: FakeOllamaClient,
+    concept_index_service: ConceptIndexService | None,
+) -> Iterator[None]:
+    overrides = {
+        get_ollama_client: lambda: embedder,
+        get_concept_index_service: lambda: (
+            concept_index_service if strategy == "ann_index" else None
+        ),
+    }
+    ai_library_app.dependency_overrides.update(overrides)
+    try:
+        if strategy == "brute_force":
+            with patch.object(
+                RetrievalRepository,
+                "CYPHER_VECTOR_SEARCH_SECTIONS",
+                CYPHER_BRUTE_FORCE_SEARCH_SECTIONS,
+            ):
+                yield
+        else:
+            yield
+    finally:
+        for dependency in overrides:
+            ai_library_app.dependency_overrides.pop(dependency, None)
+
+
+def make_queries(strategy: str, args: argparse.Namespace) -> Iterator[str]:
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(5000)
+    if strategy == "cached":
+        # The same few queries over and over, served from the results cache
+        queries = [" ".join(rng.sample(vocabulary, 3)) for _ in range(args.distinct)]
+        return itertools.cycle(queries)
+    # A unique token per query, so that no cache is ever hit
+    return (
+        f"{' '.join(rng.sample(vocabulary, 3))} {uuid.uuid4().hex}"
+        for _ in itertools.count()
+    )
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    queries: Iterator[str],
+    mode: str,
+    requests: int,
+    concurrency: int,
+) -> dict[str, Any]:
+    """Send `requests` searches from `concurrency` clients, one after the other."""
+    latencies = []
+    server_timings = defaultdict(list)
+    errors = 0
+    pending = itertools.islice(queries, requests)
+
+    async def run_client() -> None:
+        nonlocal errors
+        for query in pending:
+            start_time = time.perf_counter()
+            response = await client.post(
+                "/v1/search-concept", json={"query": query, "mode": mode}
+            )
+            latencies.append(time.perf_counter() - start_time)
+            if response.status_code != 200:
+                errors += 1
+                continue
+            for name, value in response.json().get("timings", {}).items():
+                server_timings[name].append(value)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start_time
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / seconds, 2),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 2),
+            "p90": round(float(np.percentile(latencies_ms, 90)), 2),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 2),
+            "mean": round(float(latencies_ms.mean()), 2),
+            "max": round(float(latencies_ms.max()), 2),
+        },
+        "server_timings_ms": {
+            name: round(float(np.mean(values)), 2)
+            for name, values in sorted(server_timings.items())
+        },
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> list[dict[str, Any]]:
+    embedder = FakeOllamaClient(embed_latency=args.embed_latency)
+    repository = PDFProcessingRepository(
+        neo4j_async_driver=get_neo4j_async(),
+        neo4j_sync_driver=get_neo4j_sync(),
+        mongodb_client=get_mongodb(),
+    )
+    index_directory = tempfile.TemporaryDirectory(prefix="benchmark-ann-")
+    concept_index_service = ConceptIndexService(
+        ConceptANNIndex(
+            index_directory.name,
+            n_probe=app_settings.ANN_INDEX_N_PROBE,
+            quantization=app_settings.ANN_INDEX_QUANTIZATION,
+            rerank_factor=app_settings.ANN_INDEX_RERANK_FACTOR,
+        ),
+        RetrievalRepository(
+            neo4j_async_driver=get_neo4j_async(), mongodb_client=get_mongodb()
+        ),
+        retrain_growth=app_settings.ANN_INDEX_RETRAIN_GROWTH,
+    )
+
+    results = []
+    seeded_books = args.start_book
+    transport = httpx.ASGITransport(app=ai_library_app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://benchmark", timeout=None
+    ) as client:
+        try:
+            for books in sorted(args.books):
+                seed_seconds = 0.0
+                if books > seeded_books:
+                    seed_seconds = await seed_library(
+                        repository, seeded_books, books, args, embedder
+                    )
+                    seeded_books = books
+                if "ann_index" in args.strategies:
+                    await concept_index_service.sync()
+
+                for strategy, concurrency in itertools.product(
+                    args.strategies, args.concurrency
+                ):
+                    mode = (
+                        strategy if strategy in ("hybrid", "two_stage") else "vector"
+                    )
+                    queries = make_queries(strategy, args)
+                    with use_strategy(strategy, embedder, concept_index_service):
+                        await run_load(
+                            client, queries, mode, args.warmup, concurrency
+                        )
+                        load = await run_load(
+                            client, queries, mode, args.requests, concurrency
+                        )
+                    results.append(
+                        {
+                            "books": books,
+                            "sections": books * args.sections_per_book,
+                            "concepts_pool": books * args.concepts_per_book,
+                            "seed_seconds": round(seed_seconds, 2),
+                            "strategy": strategy,
+                            "concurrency": concurrency,
+                            **load,
+                        }
+                    )
+                    logging.warning(
+                        f"{books} books, {strategy}, concurrency {concurrency}: "
+                        f"p50 {load['latency_ms']['p50']} ms, "
+                        f"p99 {load['latency_ms']['p99']} ms"
+                    )
+        finally:
+            if args.cleanup:
+                await delete_library()
+            index_directory.cleanup()
+            await close_connections()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, nargs="+", default=[10, 100])
+    parser.add_argument(
+        "--start-book",
+        type=int,
+        default=0,
+        help="Books already seeded by a previous run (without --cleanup)",
+    )
+    parser.add_argument("--sections-per-book", type=int, default=30)
+    parser.add_argument("--paragraphs-per-section", type=int, default=5)
+    parser.add_argument("--concepts-per-section", type=int, default=8)
+    parser.add_argument(
+        "--concepts-per-book", type=int, default=50, help="Growth of the concepts pool"
+    )
+    parser.add_argument(
+        "--strategies", nargs="+", choices=STRATEGIES, default=STRATEGIES
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--distinct", type=int, default=20, help="Distinct queries of `cached`"
+    )
+    parser.add_argument("--embed-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cleanup", action="store_true")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "results": asyncio.run(benchmark(args)),
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
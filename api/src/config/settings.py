@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Literal
 
 from pydantic_settings import BaseSettings
 
@@ -18,18 +18,93 @@ class AppSettings(BaseSettings):
     NEO4J_USER: str
     NEO4J_DB: str
     NEO4J_PASSWORD: str
+    # Rows written per UNWIND transaction
+    NEO4J_WRITE_BATCH_SIZE: int = 500
+    NEO4J_MAX_CONNECTION_POOL_SIZE: int = 100
+    NEO4J_CONNECTION_ACQUISITION_TIMEOUT: float = 60.0
 
     # MongoDB
     MONGO_DB_URL: str
     MONGO_DB_NAME: str
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+
+    # Uploads, sizes in bytes
+    MAX_UPLOAD_SIZE: int = 200 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
 
     # LLMSherpa
     LLMSHERPA_API_URL: str
+    # Processes parsing PDFs in parallel, off the API event loop
+    PDF_PARSING_PROCESSES: int = 2
 
     # Ollama models
     EMBEDDING_MODEL: str
     GENERATION_MODEL: str
 
+    # Documents ingested at once by all the Celery workers (0: no limit). A
+    # slot is held from parsing to finalizing, its lease renewed while a stage
+    # runs. The slot of a crashed worker is free once its lease expires
+    INGESTION_MAX_CONCURRENT_DOCUMENTS: int = 4
+    INGESTION_SLOT_LEASE: int = 15 * 60
+    # Files hashed at once by a bulk import
+    IMPORT_HASHING_CONCURRENCY: int = 4
+    # Directory the import endpoint may read PDFs from, the endpoint refuses
+    # every import while unset. The command line import is not restricted
+    IMPORT_ROOT: str = ""
+
+    # Sections extracted, embedded and stored together during ingestion
+    INGESTION_WINDOW_SIZE: int = 16
+
+    # Tokens shared by consecutive chunks sent for concept extraction
+    CHUNK_OVERLAP_TOKENS: int = 0
+
+    # LLM responses cache
+    CONCEPT_CACHE_MAX_ENTRIES: int = 200_000
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 500_000
+
+    # Concepts whose embeddings are at least this similar (cosine) are merged
+    # into one canonical concept at ingestion, above 1 only names are normalized
+    CONCEPT_MERGE_THRESHOLD: float = 0.92
+
+    # Number of texts sent to Ollama per embedding request
+    EMBEDDING_BATCH_SIZE: int = 64
+
+    # Ollama requests scheduling (per process)
+    OLLAMA_MAX_IN_FLIGHT: int = 4
+    OLLAMA_MODEL_MAX_IN_FLIGHT: dict[str, int] = {}
+    OLLAMA_REQUEST_TIMEOUT: float = 300.0
+    OLLAMA_MAX_RETRIES: int = 3
+    OLLAMA_RETRY_BACKOFF: float = 1.0
+    OLLAMA_RETRY_BACKOFF_MAX: float = 30.0
+    # HTTP connections kept open to Ollama (per process)
+    OLLAMA_MAX_CONNECTIONS: int = 20
+
+    # Retrieval: concepts fetched from the vector index per search, at least
+    VECTOR_SEARCH_CANDIDATES: int = 200
+    SEARCH_EXCERPT_LENGTH: int = 300
+
+    # Two-stage retrieval: books, then sections, nearest to the query by the
+    # centroids of their concepts, whose concepts only are ranked. Without
+    # candidate books (0), sections are searched in the whole library
+    SEARCH_BOOK_CANDIDATES: int = 10
+    SEARCH_SECTION_CANDIDATES: int = 50
+
+    # Local ANN index over the concept embeddings, searched in the API process
+    ANN_INDEX_ENABLED: bool = False
+    ANN_INDEX_PATH: str = "data/ann_index"
+    ANN_INDEX_N_PROBE: int = 8
+    # Retrain the clusters once the index grew by this factor
+    ANN_INDEX_RETRAIN_GROWTH: float = 2.0
+    # Compact codes scanned by the searches ("none", "float16" or "int8"), the
+    # best `k * ANN_INDEX_RERANK_FACTOR` candidates are re-ranked in float32
+    ANN_INDEX_QUANTIZATION: Literal["none", "float16", "int8"] = "none"
+    ANN_INDEX_RERANK_FACTOR: int = 4
+
+    # Search cache in Redis, time to live in seconds
+    SEARCH_EMBEDDING_CACHE_TTL: int = 7 * 24 * 3600
+    SEARCH_RESULTS_CACHE_TTL: int = 3600
+
     # CORS
     CORS_ORIGINS: list[str]
     CORS_HEADERS: list[str]
@@ -39,6 +114,11 @@ class AppSettings(BaseSettings):
     CELERY_BROKER_URL: str
     CELERY_RESULT_BACKEND: str
     REDIS_HOST: str
+    CELERY_WORKER_CONCURRENCY: int = 2
+    REDIS_MAX_CONNECTIONS: int = 50
+
+    # Seconds to wait for each dependency in the health checks
+    HEALTH_CHECK_TIMEOUT: float = 5.0
 
     # Logs
     DEBUG_MODE: bool = False
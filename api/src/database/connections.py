@@ -0,0 +1,56 @@
+"""Lifecycle of the process-wide clients of the databases and Ollama."""
+
+import asyncio
+import logging
+
+from src.config.settings import app_settings
+from src.database.mongodb import check_mongodb, close_mongodb, get_mongodb
+from src.database.neo4j import check_neo4j, close_neo4j, get_neo4j_async, get_neo4j_sync
+from src.database.redis import check_redis, close_redis, get_redis
+from src.utils.ollama_client import check_ollama, close_ollama_client, get_ollama_client
+
+HEALTH_CHECKS = {
+    "mongodb": check_mongodb,
+    "neo4j": check_neo4j,
+    "redis": check_redis,
+    "ollama": check_ollama,
+}
+
+
+def open_connections() -> None:
+    """Create the shared clients, so that the first requests don't pay for it."""
+    get_mongodb()
+    get_neo4j_async()
+    get_neo4j_sync()
+    get_redis()
+    get_ollama_client()
+
+
+async def check_connections() -> dict[str, str]:
+    """Check every dependency concurrently, returning "ok" or the error of each."""
+
+    async def check(name: str) -> str:
+        try:
+            await asyncio.wait_for(
+                HEALTH_CHECKS[name](), app_settings.HEALTH_CHECK_TIMEOUT
+            )
+            return "ok"
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+    statuses = await asyncio.gather(*(check(name) for name in HEALTH_CHECKS))
+    return dict(zip(HEALTH_CHECKS, statuses))
+
+
+async def close_connections() -> None:
+    """Close the shared clients, waiting for their connections to be released."""
+    for name, close in [
+        ("mongodb", close_mongodb),
+        ("neo4j", close_neo4j),
+        ("redis", close_redis),
+        ("ollama", close_ollama_client),
+    ]:
+        try:
+            await close()
+        except Exception as e:
+            logging.warning(f"Failed to close the {name} client: {e}")
@@ -1,8 +1,29 @@
+from functools import lru_cache
+
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from src.config.settings import app_settings
 
 
+@lru_cache()
+def get_mongodb_client() -> AsyncIOMotorClient:
+    """Get the MongoDB client instance, shared by the process."""
+    return AsyncIOMotorClient(
+        app_settings.MONGO_DB_URL,
+        maxPoolSize=app_settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=app_settings.MONGO_MIN_POOL_SIZE,
+    )
+
+
 def get_mongodb() -> AsyncIOMotorDatabase:
-    """Get MongoDB client instance."""
-    client = AsyncIOMotorClient(app_settings.MONGO_DB_URL)
-    return client.get_database(app_settings.MONGO_DB_NAME)
+    """Get the MongoDB database, from the shared client."""
+    return get_mongodb_client().get_database(app_settings.MONGO_DB_NAME)
+
+
+async def check_mongodb() -> None:
+    await get_mongodb().command("ping")
+
+
+async def close_mongodb() -> None:
+    if get_mongodb_client.cache_info().currsize:
+        get_mongodb_client().close()
+        get_mongodb_client.cache_clear()
@@ -1,24 +1,45 @@
 """Database initializer."""
 
+from functools import lru_cache
+
 from neo4j import AsyncDriver, AsyncGraphDatabase, Driver, GraphDatabase
 from src.config.settings import app_settings
 
 
-# Dependency to provide the Neo4j async session
+# Dependency to provide the Neo4j async driver, shared by the process
+@lru_cache()
 def get_neo4j_async() -> AsyncDriver:
     """Get the Neo4j async driver instance."""
     return AsyncGraphDatabase.driver(
         app_settings.NEO4J_URI,
         auth=(app_settings.NEO4J_USER, app_settings.NEO4J_PASSWORD),
         database=app_settings.NEO4J_DB,
+        max_connection_pool_size=app_settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=app_settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
     )
 
 
-# Dependency to provide the Neo4j sync session
+# Dependency to provide the Neo4j sync driver, shared by the process
+@lru_cache()
 def get_neo4j_sync() -> Driver:
     """Get the Neo4j sync driver instance."""
     return GraphDatabase.driver(
         app_settings.NEO4J_URI,
         auth=(app_settings.NEO4J_USER, app_settings.NEO4J_PASSWORD),
         database=app_settings.NEO4J_DB,
+        max_connection_pool_size=app_settings.NEO4J_MAX_CONNECTION_POOL_SIZE,
+        connection_acquisition_timeout=app_settings.NEO4J_CONNECTION_ACQUISITION_TIMEOUT,
     )
+
+
+async def check_neo4j() -> None:
+    await get_neo4j_async().verify_connectivity()
+
+
+async def close_neo4j() -> None:
+    if get_neo4j_async.cache_info().currsize:
+        await get_neo4j_async().close()
+        get_neo4j_async.cache_clear()
+    if get_neo4j_sync.cache_info().currsize:
+        get_neo4j_sync().close()
+        get_neo4j_sync.cache_clear()
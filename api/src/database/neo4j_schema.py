@@ -0,0 +1,139 @@
+"""Neo4j graph schema: constraints and indexes backing the ingestion and retrieval queries."""
+
+import logging
+
+from neo4j import AsyncDriver
+
+# Uniqueness constraints, each backed by a range index, for the keys the
+# ingestion queries MERGE on
+NEO4J_CONSTRAINTS = {
+    "bookDocumentIdUnique": """
+        CREATE CONSTRAINT bookDocumentIdUnique IF NOT EXISTS
+        FOR (b:Book) REQUIRE b.document_id IS UNIQUE
+    """,
+    "sectionBookIdUnique": """
+        CREATE CONSTRAINT sectionBookIdUnique IF NOT EXISTS
+        FOR (s:Section) REQUIRE (s.document_id, s.section_id) IS UNIQUE
+    """,
+    "paragraphTextHashUnique": """
+        CREATE CONSTRAINT paragraphTextHashUnique IF NOT EXISTS
+        FOR (p:Paragraph) REQUIRE p.text_hash IS UNIQUE
+    """,
+    "conceptNameUnique": """
+        CREATE CONSTRAINT conceptNameUnique IF NOT EXISTS
+        FOR (c:Concept) REQUIRE c.name IS UNIQUE
+    """,
+}
+
+NEO4J_INDEXES = {
+    # Full-text index for Paragraph nodes on the "text" property
+    "paragraphTextIndex": """
+        CREATE FULLTEXT INDEX paragraphTextIndex IF NOT EXISTS
+        FOR (n:Paragraph) ON EACH [n.text]
+        OPTIONS {
+            indexConfig: {
+                `fulltext.analyzer`: 'english',
+                `fulltext.eventually_consistent`: true
+            }
+        }
+    """,
+    # Fulltext index for Concept nodes on the "name" property
+    "conceptNameIndex": """
+        CREATE FULLTEXT INDEX conceptNameIndex IF NOT EXISTS
+        FOR (n:Concept) ON EACH [n.name]
+        OPTIONS {
+            indexConfig: {
+                `fulltext.analyzer`: 'english',
+                `fulltext.eventually_consistent`: true
+            }
+        }
+    """,
+    # Vector index for Concept nodes on the "embedding" property
+    "conceptEmbeddingIndex": """
+        CREATE VECTOR INDEX conceptEmbeddingIndex IF NOT EXISTS
+        FOR (c:Concept) ON (c.embedding)
+        OPTIONS {
+            indexConfig: {
+                `vector.dimensions`: 768,
+                `vector.similarity_function`: 'cosine'
+            }
+        }
+    """,
+    # Vector indexes of the centroids of the concepts of each section and
+    # book, narrowing the two-stage search
+    "sectionEmbeddingIndex": """
+        CREATE VECTOR INDEX sectionEmbeddingIndex IF NOT EXISTS
+        FOR (s:Section) ON (s.embedding)
+        OPTIONS {
+            indexConfig: {
+                `vector.dimensions`: 768,
+                `vector.similarity_function`: 'cosine'
+            }
+        }
+    """,
+    "bookEmbeddingIndex": """
+        CREATE VECTOR INDEX bookEmbeddingIndex IF NOT EXISTS
+        FOR (b:Book) ON (b.embedding)
+        OPTIONS {
+            indexConfig: {
+                `vector.dimensions`: 768,
+                `vector.similarity_function`: 'cosine'
+            }
+        }
+    """,
+}
+
+# Seconds to wait for the indexes to be populated
+INDEXES_ONLINE_TIMEOUT = 300
+
+_schema_verified = False
+
+
+async def create_neo4j_schema(neo4j_async_driver: AsyncDriver) -> None:
+    """Create the constraints and indexes that don't exist yet."""
+    async with neo4j_async_driver.session() as session:
+        for statement in [*NEO4J_CONSTRAINTS.values(), *NEO4J_INDEXES.values()]:
+            result = await session.run(statement)
+            await result.consume()
+
+
+async def get_missing_neo4j_schema(neo4j_async_driver: AsyncDriver) -> list[str]:
+    """Return the names of the constraints and indexes missing or not online."""
+    # Constraints are listed through the index backing them, named alike
+    async with neo4j_async_driver.session() as session:
+        result = await session.run("SHOW INDEXES YIELD name, state")
+        states = {record["name"]: record["state"] async for record in result}
+
+    return [
+        name
+        for name in [*NEO4J_CONSTRAINTS, *NEO4J_INDEXES]
+        if states.get(name) != "ONLINE"
+    ]
+
+
+async def ensure_neo4j_schema(neo4j_async_driver: AsyncDriver) -> None:
+    """
+    Make sure the graph schema exists and its indexes are online.
+
+    The check is done once per process: call it at startup and before
+    ingesting, it is a no-op once the schema has been verified.
+    """
+    global _schema_verified
+    if _schema_verified:
+        return
+
+    missing = await get_missing_neo4j_schema(neo4j_async_driver)
+    if missing:
+        logging.info(f"Creating Neo4j schema: {', '.join(missing)}")
+        await create_neo4j_schema(neo4j_async_driver)
+        async with neo4j_async_driver.session() as session:
+            result = await session.run(
+                "CALL db.awaitIndexes($timeout)", timeout=INDEXES_ONLINE_TIMEOUT
+            )
+            await result.consume()
+        missing = await get_missing_neo4j_schema(neo4j_async_driver)
+        if missing:
+            raise RuntimeError(f"Neo4j schema is not online: {', '.join(missing)}")
+
+    _schema_verified = True
+    logging.info("Neo4j schema verified")
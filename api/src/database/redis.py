@@ -0,0 +1,22 @@
+from functools import lru_cache
+
+from redis.asyncio import Redis
+from src.config.settings import app_settings
+
+
+@lru_cache()
+def get_redis() -> Redis:
+    """Get the Redis async client instance, shared by the process."""
+    return Redis.from_url(
+        app_settings.REDIS_HOST, max_connections=app_settings.REDIS_MAX_CONNECTIONS
+    )
+
+
+async def check_redis() -> None:
+    await get_redis().ping()
+
+
+async def close_redis() -> None:
+    if get_redis.cache_info().currsize:
+        await get_redis().aclose()
+        get_redis.cache_clear()
@@ -0,0 +1,110 @@
+"""
+Import a library of PDF files from the command line.
+
+Usage (from the api directory):
+
+    python -m src.import_library /path/to/library [--manifest books.txt] [--watch]
+
+Files are hashed and queued from this process, then processed by the Celery
+workers like uploads.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import timedelta
+
+from src.database.connections import close_connections
+from src.database.mongodb import get_mongodb
+from src.database.neo4j import get_neo4j_async, get_neo4j_sync
+from src.config.settings import app_settings
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.schemas.bulk_import import BulkImportProgress
+from src.services.bulk_import import BulkImportService, collect_pdf_paths, read_manifest
+from src.tasks import enqueue_pdf_processing
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.import_library",
+        description="Import a library of PDF files into the AI Library.",
+    )
+    parser.add_argument(
+        "directory", nargs="?", default="", help="Directory of the PDF files to import"
+    )
+    parser.add_argument(
+        "--manifest", help="File listing the paths of the PDF files, one per line"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Report the progress until all the documents are processed",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=30.0, help="Seconds between progress reports"
+    )
+    args = parser.parse_args(argv)
+    if not args.directory and not args.manifest:
+        parser.error("a directory or a --manifest is required")
+    return args
+
+
+def format_progress(progress: BulkImportProgress) -> str:
+    documents = ", ".join(
+        f"{count} {status.lower()}" for status, count in sorted(progress.documents.items())
+    )
+    eta = (
+        str(timedelta(seconds=round(progress.eta_seconds)))
+        if progress.eta_seconds is not None
+        else "unknown"
+    )
+    return (
+        f"{documents or 'no documents'} | "
+        f"{progress.pages_per_minute:.1f} pages/min, "
+        f"{progress.sections_per_minute:.1f} sections/min, "
+        f"{progress.concepts_per_minute:.1f} concepts/min | ETA {eta}"
+    )
+
+
+async def main(args: argparse.Namespace) -> int:
+    manifest_paths = read_manifest(args.manifest) if args.manifest else []
+    paths = collect_pdf_paths(args.directory, manifest_paths)
+    if not paths:
+        print("No PDF file to import")
+        return 1
+
+    bulk_import_service = BulkImportService(
+        processing_repository=PDFProcessingRepository(
+            neo4j_async_driver=get_neo4j_async(),
+            neo4j_sync_driver=get_neo4j_sync(),
+            mongodb_client=get_mongodb(),
+        ),
+        enqueue=enqueue_pdf_processing,
+        hashing_concurrency=app_settings.IMPORT_HASHING_CONCURRENCY,
+    )
+    try:
+        import_job = await bulk_import_service.create_import(paths)
+        print(f"Import {import_job.import_id}: {len(paths)} files")
+        import_job = await bulk_import_service.enqueue_files(import_job.import_id, paths)
+        print(
+            f"{import_job.documents_queued} documents queued, "
+            f"{import_job.duplicates} duplicates skipped, {len(import_job.errors)} errors"
+        )
+        for error in import_job.errors:
+            print(f"  {error}", file=sys.stderr)
+
+        while args.watch:
+            progress = await bulk_import_service.get_progress(import_job.import_id)
+            print(format_progress(progress))
+            if not progress.documents.get("QUEUED") and not progress.documents.get(
+                "PROCESSING"
+            ):
+                break
+            await asyncio.sleep(args.interval)
+    finally:
+        await close_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
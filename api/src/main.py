@@ -1,10 +1,26 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from functools import lru_cache
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.routers.v1.upload import router as api_v1_upload_router
 from src.routers.v1.retrieval import router as api_v1_retrieval_router
+from src.routers.v1.bulk_import import router as api_v1_bulk_import_router
 from src.config.settings import AppSettings
+from src.database.connections import (
+    check_connections,
+    close_connections,
+    open_connections,
+)
+from src.database.mongodb import get_mongodb
+from src.database.neo4j import get_neo4j_async, get_neo4j_sync
+from src.database.neo4j_schema import ensure_neo4j_schema
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.services.concept_index import get_concept_index_service
+from src.utils.metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus, sum_metrics
 from pathlib import Path
 from typing import Any
 
@@ -21,6 +37,44 @@ docs_url = "/docs" if app_settings.ENABLE_DOCS else None
 redoc_url = "/redoc" if app_settings.ENABLE_DOCS else None
 openapi_url = "/openapi.json" if app_settings.ENABLE_DOCS else None
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Open the shared database and Ollama clients, create the Neo4j constraints
+    and indexes, and keep the local ANN index up to date while the app runs.
+    Clients are closed on shutdown.
+    """
+    open_connections()
+    for name, status in (await check_connections()).items():
+        if status != "ok":
+            logging.error(f"{name} is not available at startup: {status}")
+
+    try:
+        await ensure_neo4j_schema(get_neo4j_async())
+    except Exception as e:
+        # Ingestion verifies the schema again before writing to the graph
+        logging.error(f"Failed to set up the Neo4j schema: {e}")
+
+    concept_index_service = get_concept_index_service()
+    listener = None
+    if concept_index_service is not None:
+        try:
+            await concept_index_service.sync()
+        except Exception as e:
+            # Searches use the Neo4j vector index until the local index is built
+            logging.error(f"Failed to load the ANN index: {e}")
+        listener = asyncio.create_task(concept_index_service.listen())
+
+    yield
+
+    if listener is not None:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+    await close_connections()
+
+
 ai_library_app = FastAPI(
     **app_settings.model_dump(),
     summary=Path("src/docs/app_overview.md").read_text(),
@@ -28,6 +82,7 @@ ai_library_app = FastAPI(
     redoc_url=redoc_url,
     openapi_url=openapi_url,
     root_path="/api",
+    lifespan=lifespan,
 )
 
 ai_library_app.add_middleware(
@@ -45,5 +100,36 @@ def healthcheck() -> dict[str, Any]:
     return app_settings.app_info
 
 
+@ai_library_app.get("/health", tags=["healthcheck"])
+async def dependencies_healthcheck() -> JSONResponse:
+    """Check the connections to MongoDB, Neo4j, Redis and Ollama."""
+    dependencies = await check_connections()
+    healthy = all(status == "ok" for status in dependencies.values())
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={
+            "status": "ok" if healthy else "unavailable",
+            "dependencies": dependencies,
+        },
+    )
+
+
+@ai_library_app.get("/metrics", tags=["healthcheck"], response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Ingestion metrics of the library, in the Prometheus text format."""
+    processing_repository = PDFProcessingRepository(
+        neo4j_async_driver=get_neo4j_async(),
+        neo4j_sync_driver=get_neo4j_sync(),
+        mongodb_client=get_mongodb(),
+    )
+    documents_by_status = await processing_repository.count_documents_by_status()
+    metrics_totals = sum_metrics([await processing_repository.get_processing_metrics()])
+    return PlainTextResponse(
+        render_prometheus(metrics_totals, documents_by_status),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+
 ai_library_app.include_router(api_v1_upload_router)
 ai_library_app.include_router(api_v1_retrieval_router)
+ai_library_app.include_router(api_v1_bulk_import_router)
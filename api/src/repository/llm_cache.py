@@ -0,0 +1,186 @@
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+from src.utils.vectors import as_embedding, embedding_to_bytes
+
+
+class LLMCacheRepository:
+    """
+    Content-addressed MongoDB cache for LLM responses.
+
+    Entries are keyed by a hash of the model, the prompt version and the input
+    text. The collection is bounded to `max_entries`: once exceeded, the least
+    recently used entries are evicted.
+    """
+
+    # Check the collection size every N writes instead of on each of them
+    EVICTION_INTERVAL = 100
+
+    def __init__(
+        self, mongodb_client: AsyncIOMotorDatabase, collection_name: str, max_entries: int
+    ) -> None:
+        self.collection = mongodb_client.get_collection(collection_name)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._indexes_created = False
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    async def _ensure_indexes(self) -> None:
+        if self._indexes_created:
+            return
+        await self.collection.create_index([("last_used_at", ASCENDING)])
+        self._indexes_created = True
+
+    async def get(self, key: str) -> Any | None:
+        entry = await self.collection.find_one_and_update(
+            {"_id": key},
+            {"$set": {"last_used_at": datetime.now(timezone.utc)}},
+            projection={"value": 1},
+        )
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Return the cached values found for `keys`, indexed by key."""
+        if not keys:
+            return {}
+        cursor = self.collection.find({"_id": {"$in": keys}}, projection={"value": 1})
+        values = {entry["_id"]: entry["value"] async for entry in cursor}
+        if values:
+            await self.collection.update_many(
+                {"_id": {"$in": list(values)}},
+                {"$set": {"last_used_at": datetime.now(timezone.utc)}},
+            )
+        self.hits += len(values)
+        self.misses += len(keys) - len(values)
+        return values
+
+    async def set(self, key: str, value: Any, **metadata: Any) -> None:
+        await self._ensure_indexes()
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "value": value,
+                    "last_used_at": datetime.now(timezone.utc),
+                    **metadata,
+                }
+            },
+            upsert=True,
+        )
+        await self._record_writes(1)
+
+    async def set_many(self, values: dict[str, Any], **metadata: Any) -> None:
+        if not values:
+            return
+        await self._ensure_indexes()
+        now = datetime.now(timezone.utc)
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": key},
+                    {"$set": {"value": value, "last_used_at": now, **metadata}},
+                    upsert=True,
+                )
+                for key, value in values.items()
+            ],
+            ordered=False,
+        )
+        await self._record_writes(len(values))
+
+    async def _record_writes(self, count: int) -> None:
+        previous_writes = self._writes
+        self._writes += count
+        if (
+            self._writes // self.EVICTION_INTERVAL
+            > previous_writes // self.EVICTION_INTERVAL
+        ):
+            await self.evict()
+
+    async def evict(self) -> int:
+        """Remove the least recently used entries above `max_entries`."""
+        excess = await self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return 0
+        cursor = (
+            self.collection.find({}, projection={"_id": 1})
+            .sort("last_used_at", ASCENDING)
+            .limit(excess)
+        )
+        keys = [entry["_id"] async for entry in cursor]
+        result = await self.collection.delete_many({"_id": {"$in": keys}})
+        logging.info(
+            f"Evicted {result.deleted_count} entries from {self.collection.name}"
+        )
+        return result.deleted_count
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class ConceptExtractionCache(LLMCacheRepository):
+    """Cache of the concepts extracted from a text chunk."""
+
+    def __init__(self, mongodb_client: AsyncIOMotorDatabase, max_entries: int) -> None:
+        super().__init__(mongodb_client, "concept_extraction_cache", max_entries)
+
+    async def get_concepts(
+        self, model: str, prompt_version: str, chunk: str
+    ) -> list[str] | None:
+        return await self.get(self.make_key(model, prompt_version, chunk))
+
+    async def set_concepts(
+        self, model: str, prompt_version: str, chunk: str, concepts: list[str]
+    ) -> None:
+        await self.set(
+            self.make_key(model, prompt_version, chunk),
+            concepts,
+            model=model,
+            prompt_version=prompt_version,
+        )
+
+
+class EmbeddingCache(LLMCacheRepository):
+    """
+    Cache of the embedding vectors of texts, stored as float32 bytes and read
+    back without copying them.
+    """
+
+    def __init__(self, mongodb_client: AsyncIOMotorDatabase, max_entries: int) -> None:
+        super().__init__(mongodb_client, "embedding_cache", max_entries)
+
+    async def get_embeddings(
+        self, model: str, texts: list[str]
+    ) -> dict[str, np.ndarray]:
+        keys = {self.make_key(model, text): text for text in texts}
+        cached = await self.get_many(list(keys))
+        # Entries cached before the binary format are lists of floats
+        return {keys[key]: as_embedding(embedding) for key, embedding in cached.items()}
+
+    async def set_embeddings(
+        self, model: str, embeddings: dict[str, np.ndarray]
+    ) -> None:
+        await self.set_many(
+            {
+                self.make_key(model, text): embedding_to_bytes(embedding)
+                for text, embedding in embeddings.items()
+            },
+            model=model,
+        )
@@ -0,0 +1,70 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from neo4j import AsyncDriver
+from neo4j._async.work.transaction import AsyncManagedTransaction
+
+
+@dataclass
+class BatchWriteStats:
+    """Timing of one batch written to Neo4j."""
+
+    name: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class Neo4jBatchWriter:
+    """
+    Write rows to Neo4j with an UNWIND query, `batch_size` rows per transaction.
+
+    Every batch runs in its own short managed transaction, which the driver
+    retries on transient errors (deadlocks, leader switches, lost connections),
+    so a failure only replays the current batch instead of the whole write.
+    """
+
+    def __init__(self, neo4j_async_driver: AsyncDriver, batch_size: int) -> None:
+        self.neo4j_async_driver = neo4j_async_driver
+        self.batch_size = batch_size
+
+    @staticmethod
+    async def _run_batch(
+        tx: AsyncManagedTransaction,
+        query: str,
+        rows: list[dict[str, Any]],
+        parameters: dict[str, Any],
+    ) -> None:
+        result = await tx.run(query, {**parameters, "rows": rows})
+        await result.consume()
+
+    async def write(
+        self,
+        name: str,
+        query: str,
+        rows: list[dict[str, Any]],
+        **parameters: Any,
+    ) -> list[BatchWriteStats]:
+        """Run `query` (reading its input from `$rows`) over `rows` in batches."""
+        stats = []
+        async with self.neo4j_async_driver.session() as session:
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start : start + self.batch_size]
+                start_time = time.perf_counter()
+                await session.execute_write(self._run_batch, query, batch, parameters)
+                batch_stats = BatchWriteStats(
+                    name=name,
+                    rows=len(batch),
+                    seconds=time.perf_counter() - start_time,
+                )
+                logging.debug(
+                    f"Neo4j {name} batch: {batch_stats.rows} rows in "
+                    f"{batch_stats.seconds:.3f}s ({batch_stats.rows_per_second:.0f} rows/s)"
+                )
+                stats.append(batch_stats)
+        return stats
@@ -1,25 +1,49 @@
+import hashlib
 import logging
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from neo4j import AsyncDriver, Driver
 from neo4j._async.work.transaction import AsyncManagedTransaction
-from src.database.mongodb import get_mongodb
-from src.database.neo4j import get_neo4j_async, get_neo4j_sync
-from src.schemas.upload import ProcessedBook, ProcessedBookMongoDB
-from pymongo import ReturnDocument
+from src.config.settings import app_settings
+from src.database.neo4j_schema import ensure_neo4j_schema
+from src.repository.neo4j_writer import BatchWriteStats, Neo4jBatchWriter
+from src.schemas.bulk_import import BulkImportJob
+from src.schemas.upload import ProcessedBook, ProcessedBookMongoDB, SectionData
+from src.utils.vectors import centroid
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
 from bson import ObjectId
 
+# Document of the `processing_metrics` collection holding the library totals
+METRICS_TOTALS_ID = "totals"
+
+
+def section_fingerprint(section: SectionData) -> str:
+    """Fingerprint of the name, parent and text of a section, to detect changes."""
+    return hashlib.sha256(
+        "\0".join(
+            [section.section_name, section.parent_section, section.section_text]
+        ).encode("utf-8")
+    ).hexdigest()
+
 
 class PDFProcessingRepository:
+    # The checksum and waiting indexes are created once per process
+    _checksum_index_created = False
+    _waiting_index_created = False
+
     def __init__(
         self,
-        neo4j_async_driver: AsyncDriver = get_neo4j_async(),
-        neo4j_sync_driver: Driver = get_neo4j_sync(),
-        mongodb_client: AsyncIOMotorDatabase = get_mongodb(),
+        neo4j_async_driver: AsyncDriver,
+        neo4j_sync_driver: Driver,
+        mongodb_client: AsyncIOMotorDatabase,
     ) -> None:
         self.mongodb_client = mongodb_client
         self.neo4j_async_driver = neo4j_async_driver
         self.neo4j_sync_driver = neo4j_sync_driver
+        self.neo4j_writer = Neo4jBatchWriter(
+            neo4j_async_driver, batch_size=app_settings.NEO4J_WRITE_BATCH_SIZE
+        )
 
     async def save_pdf_processing_metadata(
         self, document: ProcessedBook
@@ -40,7 +64,8 @@ class PDFProcessingRepository:
         self, document: ProcessedBook
     ) -> ProcessedBook | None:
         pdf_processing_collection = self.mongodb_client.get_collection("pdf_processing")
-        document_dict = document.model_dump()
+        # Only overwrite the fields that were explicitly provided
+        document_dict = document.model_dump(exclude_unset=True)
         document_dict["_id"] = ObjectId(document.document_id)
         updated_document = await pdf_processing_collection.find_one_and_update(
             {"_id": document_dict["_id"]},
@@ -49,137 +74,698 @@ class PDFProcessingRepository:
         )
         return updated_document
 
+    async def increment_processing_progress(
+        self, document_id: str, sections: int, concepts: int
+    ) -> None:
+        pdf_processing_collection = self.mongodb_client.get_collection("pdf_processing")
+        await pdf_processing_collection.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$inc": {"sections_processed": sections, "concepts_extracted": concepts}},
+        )
+
+    async def increment_processing_metrics(
+        self, document_id: str, increments: dict[str, float]
+    ) -> None:
+        if not increments:
+            return
+        pdf_processing_collection = self.mongodb_client.get_collection("pdf_processing")
+        await pdf_processing_collection.update_one(
+            {"_id": ObjectId(document_id)}, {"$inc": increments}
+        )
+        # Running totals of the library, in a single document: scrapes don't
+        # read every document, and reprocessing a document doesn't lower them
+        metrics_collection = self.mongodb_client.get_collection("processing_metrics")
+        await metrics_collection.update_one(
+            {"_id": METRICS_TOTALS_ID}, {"$inc": increments}, upsert=True
+        )
+
+    async def count_documents_by_status(self) -> dict[str, int]:
+        collection = self.mongodb_client.get_collection("pdf_processing")
+        cursor = collection.aggregate(
+            [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        )
+        return {row["_id"]: row["count"] async for row in cursor}
+
+    async def get_processing_metrics(self) -> dict[str, Any]:
+        """
+        Ingestion metrics of all the documents measured so far, nested like the
+        metrics of a document.
+        """
+        collection = self.mongodb_client.get_collection("processing_metrics")
+        totals = await collection.find_one({"_id": METRICS_TOTALS_ID}, {"metrics": 1})
+        return totals["metrics"] if totals else {}
+
     async def get_processing_status(self, document_id: str) -> ProcessedBook:
         collection = self.mongodb_client.get_collection("pdf_processing")
         return await collection.find_one({"_id": ObjectId(document_id)})
 
-    async def _neo4j_create_indexes(self, tx: AsyncManagedTransaction) -> None:
+    async def get_processing_by_checksum(self, checksum: str) -> dict[str, Any] | None:
+        """Return the latest upload of the same file, unless its processing failed."""
+        collection = self.mongodb_client.get_collection("pdf_processing")
+        if not PDFProcessingRepository._checksum_index_created:
+            await collection.create_index([("checksum", ASCENDING)])
+            PDFProcessingRepository._checksum_index_created = True
+        return await collection.find_one(
+            {"checksum": checksum, "status": {"$ne": "FAILED"}},
+            sort=[("_id", DESCENDING)],
+        )
+
+    async def mark_waiting_for_slot(self, document_id: str) -> None:
+        """Record that the document waits for an ingestion slot."""
+        collection = self.mongodb_client.get_collection("pdf_processing")
+        await collection.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$set": {"waiting_since": datetime.now(timezone.utc)}},
+        )
+
+    async def pop_waiting_document(self) -> dict[str, Any] | None:
         """
-        Create the necessary Neo4j indexes if they do not already exist.
+        Take the document waiting the longest for an ingestion slot, if any.
+        Each waiting document is taken once, whatever the number of callers.
         """
-        # Full-text index for Paragraph nodes on the "text" property
-        await tx.run(
-            """
-            CREATE FULLTEXT INDEX paragraphTextIndex IF NOT EXISTS
-            FOR (n:Paragraph) ON EACH [n.text]
-            OPTIONS {
-                indexConfig: {
-                    `fulltext.analyzer`: 'english',
-                    `fulltext.eventually_consistent`: true
-                }
-            }
-            """
+        collection = self.mongodb_client.get_collection("pdf_processing")
+        if not PDFProcessingRepository._waiting_index_created:
+            await collection.create_index(
+                [("waiting_since", ASCENDING)],
+                partialFilterExpression={"waiting_since": {"$type": "date"}},
+            )
+            PDFProcessingRepository._waiting_index_created = True
+        return await collection.find_one_and_update(
+            {"waiting_since": {"$type": "date"}},
+            {"$set": {"waiting_since": None}},
+            sort=[("waiting_since", ASCENDING)],
         )
 
-        # Fulltext index for Concept nodes on the "name" property
-        await tx.run(
-            """
-            CREATE FULLTEXT INDEX conceptNameIndex IF NOT EXISTS
-            FOR (n:Concept) ON EACH [n.name]
-            OPTIONS {
-                indexConfig: {
-                    `fulltext.analyzer`: 'english',
-                    `fulltext.eventually_consistent`: true
-                }
-            }
-            """
+    async def save_import_job(self, import_job: BulkImportJob) -> None:
+        collection = self.mongodb_client.get_collection("pdf_imports")
+        import_dict = import_job.model_dump()
+        import_dict["_id"] = ObjectId(import_job.import_id)
+        await collection.insert_one(import_dict)
+
+    async def update_import_job(self, import_job: BulkImportJob) -> None:
+        collection = self.mongodb_client.get_collection("pdf_imports")
+        await collection.update_one(
+            {"_id": ObjectId(import_job.import_id)},
+            {"$set": import_job.model_dump(exclude_unset=True)},
         )
 
-        # Vector index for Concept nodes on the "embedding" property
-        await tx.run(
-            """
-            CREATE VECTOR INDEX conceptEmbeddingIndex IF NOT EXISTS
-            FOR (c:Concept) ON (c.embedding)
-            OPTIONS {
-                indexConfig: {
-                    `vector.dimensions`: 768,
-                    `vector.similarity_function`: 'cosine'
-                }
+    async def get_import_job(self, import_id: str) -> dict[str, Any] | None:
+        collection = self.mongodb_client.get_collection("pdf_imports")
+        return await collection.find_one({"_id": ObjectId(import_id)})
+
+    async def get_import_documents_stats(self, import_id: str) -> list[dict[str, Any]]:
+        """Progress of the documents queued by an import, summed per status."""
+        collection = self.mongodb_client.get_collection("pdf_processing")
+        cursor = collection.aggregate(
+            [
+                {"$match": {"import_id": import_id}},
+                {
+                    "$group": {
+                        "_id": "$status",
+                        "documents": {"$sum": 1},
+                        "pages": {"$sum": "$pages"},
+                        "sections_processed": {"$sum": "$sections_processed"},
+                        "concepts_extracted": {"$sum": "$concepts_extracted"},
+                        "last_completed_at": {"$max": "$completed_at"},
+                    }
+                },
+            ]
+        )
+        return await cursor.to_list(length=None)
+
+    async def save_stage_checkpoint(
+        self, processed_document: ProcessedBook, stage: str
+    ) -> None:
+        """
+        Persist the output of a processing stage.
+
+        The book metadata and every section are stored as separate documents so
+        that large books don't hit the MongoDB document size limit. The book
+        document marks the stage as complete, it is written last, once all the
+        sections are.
+        """
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        document_id = processed_document.document_id
+        await collection.delete_many({"document_id": document_id, "stage": stage})
+
+        if processed_document.sections:
+            await collection.insert_many(
+                [
+                    {
+                        "document_id": document_id,
+                        "stage": stage,
+                        "kind": "section",
+                        "index": index,
+                        "fingerprint": section_fingerprint(section),
+                        "data": section.model_dump(),
+                    }
+                    for index, section in enumerate(processed_document.sections)
+                ]
+            )
+        await collection.insert_one(
+            {
+                "document_id": document_id,
+                "stage": stage,
+                "kind": "book",
+                "data": processed_document.model_dump(exclude={"sections"}),
             }
-            """
         )
 
-        # Fulltext index for Section nodes on the "section_text" property
-        await tx.run(
-            """
-            CREATE FULLTEXT INDEX sectionTextIndex IF NOT EXISTS
-            FOR (s:Section) ON EACH [s.section_text]
-            OPTIONS {
-                indexConfig: {
-                    `fulltext.analyzer`: 'english',
-                    `fulltext.eventually_consistent`: true
+        await self.update_pdf_processing_metadata(
+            ProcessedBookMongoDB(
+                document_id=document_id,
+                last_completed_stage=stage,
+                sections_total=len(processed_document.sections),
+            )
+        )
+
+    async def load_book_checkpoint(
+        self, document_id: str, stage: str
+    ) -> ProcessedBook | None:
+        """Load the book metadata of a checkpointed stage, without its sections."""
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        book_checkpoint = await collection.find_one(
+            {"document_id": document_id, "stage": stage, "kind": "book"}
+        )
+        if not book_checkpoint:
+            return None
+        return ProcessedBook(**book_checkpoint["data"], sections=[])
+
+    async def iter_checkpoint_sections(
+        self,
+        document_id: str,
+        stage: str,
+        window_size: int,
+        exclude_indexes: set[int] | None = None,
+    ) -> AsyncIterator[list[tuple[int, SectionData]]]:
+        """
+        Stream the sections of a checkpointed stage in windows of `window_size`
+        (index, section) pairs, so only a window of sections is held in memory.
+        """
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        query = {"document_id": document_id, "stage": stage, "kind": "section"}
+        if exclude_indexes:
+            query["index"] = {"$nin": list(exclude_indexes)}
+        cursor = collection.find(query).sort("index", 1).batch_size(window_size)
+
+        window = []
+        async for checkpoint in cursor:
+            window.append((checkpoint["index"], SectionData(**checkpoint["data"])))
+            if len(window) == window_size:
+                yield window
+                window = []
+        if window:
+            yield window
+
+    async def mark_sections_checkpoint(
+        self, document_id: str, stage: str, indexes: list[int]
+    ) -> None:
+        """Record that the sections at `indexes` went through `stage`."""
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        await collection.insert_many(
+            [
+                {
+                    "document_id": document_id,
+                    "stage": stage,
+                    "kind": "section",
+                    "index": index,
                 }
-            }
-            """
+                for index in indexes
+            ]
+        )
+
+    async def get_checkpoint_section_indexes(
+        self, document_id: str, stage: str
+    ) -> set[int]:
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        cursor = collection.find(
+            {"document_id": document_id, "stage": stage, "kind": "section"},
+            projection={"index": 1},
         )
+        return {checkpoint["index"] async for checkpoint in cursor}
 
-    async def _neo4j_add_book_data(
+    async def get_checkpoint_section_fingerprints(
+        self, document_id: str, stage: str
+    ) -> list[tuple[int, str, str]]:
+        """(index, section id, fingerprint) of the sections of a checkpointed stage."""
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        cursor = collection.find(
+            {"document_id": document_id, "stage": stage, "kind": "section"},
+            projection={"index": 1, "fingerprint": 1, "data.section_id": 1},
+        )
+        return [
+            (
+                checkpoint["index"],
+                checkpoint["data"]["section_id"],
+                checkpoint.get("fingerprint", ""),
+            )
+            async for checkpoint in cursor
+        ]
+
+    async def has_stage_checkpoint(self, document_id: str, stage: str) -> bool:
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        return (
+            await collection.find_one(
+                {"document_id": document_id, "stage": stage, "kind": "book"},
+                projection={"_id": 1},
+            )
+            is not None
+        )
+
+    async def delete_stage_checkpoints(self, document_id: str) -> None:
+        collection = self.mongodb_client.get_collection("pdf_processing_checkpoints")
+        await collection.delete_many({"document_id": document_id})
+
+    async def _neo4j_merge_book(
         self, tx: AsyncManagedTransaction, processed_document: ProcessedBook
     ) -> None:
         """
-        Merge the main Book node and related data (Sections, Paragraphs, Concepts, etc.) into Neo4j.
+        Merge the main Book node with the book metadata.
         """
         await tx.run(
             """
-            MERGE (book:Book {name: $title, document_id: $document_id})
-            SET book += $book_data
-            
-            WITH book
-            CALL apoc.periodic.iterate(
-            "UNWIND $sections AS section RETURN section",
-            "
-            MERGE (s:Section {name: section.section_name})
-            SET s.section_text = section.section_text
-            MERGE (book)-[:HAS_SECTION]->(s)
-
-            WITH s, section
-            UNWIND section.section_paragraphs_data AS paragraph
-            MERGE (p:Paragraph {text: paragraph.text})
-            ON CREATE SET p += paragraph, p.name = paragraph.text[..20]
-            MERGE (s)-[:HAS_PARAGRAPH]->(p)
-
-            WITH s, section
-            UNWIND section.concepts AS section_concept
-            MERGE (sc:Concept {name: section_concept.name})
-            SET sc.embedding = section_concept.embedding
-            MERGE (s)-[:HAS_CONCEPT]->(sc)
-            ",
-            {batchSize: 100, iterateList: true, params: {sections: $sections}, logProgress: true, logBatchProgress: true}
-            ) YIELD batches, total, errorMessages
-
-            WITH book
-            UNWIND $book_concepts AS book_concept
-            MERGE (bc:Concept {name: book_concept})
-            MERGE (book)-[:HAS_CONCEPT]->(bc)
+            MERGE (book:Book {document_id: $document_id})
+            SET book += $book_data, book.name = $title
             """,
             {
                 "document_id": processed_document.document_id,
                 "title": processed_document.title,
                 "book_data": processed_document.model_dump(
-                    exclude={"sections", "status", "id"}
+                    exclude={"sections", "concepts", "status", "id"}
                 ),
-                "sections": [
-                    section.model_dump() for section in processed_document.sections
-                ],
-                "book_concepts": processed_document.concepts,
             },
         )
 
+    async def _neo4j_set_book_concepts(
+        self, tx: AsyncManagedTransaction, document_id: str
+    ) -> None:
+        """
+        Store the names of the concepts of the book on the Book node.
+        """
+        # Concepts of sections removed or changed by an update of the book
+        await tx.run(
+            """
+            MATCH (book:Book {document_id: $document_id})-[r:HAS_CONCEPT]->(c:Concept)
+            WHERE NOT EXISTS {
+                MATCH (book)-[:HAS_SECTION]->(:Section)-[:HAS_CONCEPT]->(c)
+            }
+            DELETE r
+            """,
+            {"document_id": document_id},
+        )
+        await tx.run(
+            """
+            MATCH (book:Book {document_id: $document_id})
+            OPTIONAL MATCH (book)-[:HAS_CONCEPT]->(c:Concept)
+            WITH book, collect(c.name) AS concepts
+            SET book.concepts = concepts
+            """,
+            {"document_id": document_id},
+        )
+
+    # Sections are keyed by their id, their names aren't unique in a book.
+    # Sections without concepts have no embedding
+    CYPHER_MERGE_SECTIONS = """
+    MATCH (book:Book {document_id: $document_id})
+    UNWIND $rows AS row
+    MERGE (s:Section {document_id: $document_id, section_id: row.section_id})
+    SET s.name = row.section_name, s.parent_name = row.parent_section
+    MERGE (book)-[:HAS_SECTION]->(s)
+    WITH s, row
+    WHERE row.embedding IS NOT NULL
+    CALL db.create.setNodeVectorProperty(s, 'embedding', row.embedding)
+    """
+
+    # Paragraph nodes only hold the text, where it appears is stored on the
+    # HAS_PARAGRAPH relationships
+    CYPHER_MERGE_PARAGRAPHS = """
+    UNWIND $rows AS row
+    MERGE (p:Paragraph {text_hash: row.id})
+    ON CREATE SET p.text = row.text
+    """
+
+    # Concepts merged into an existing canonical concept have no embedding.
+    # Embeddings are stored as float32 arrays, half the size of a float list
+    CYPHER_MERGE_CONCEPTS = """
+    UNWIND $rows AS row
+    MERGE (c:Concept {name: row.name})
+    SET c.aliases = reduce(
+            aliases = coalesce(c.aliases, []), alias IN row.aliases |
+            CASE WHEN alias IN aliases THEN aliases ELSE aliases + alias END
+        )
+    WITH c, row
+    WHERE row.embedding IS NOT NULL
+    CALL db.create.setNodeVectorProperty(c, 'embedding', row.embedding)
+    """
+
+    # Nearest concept of the library for each row, from the vector index
+    CYPHER_FIND_SIMILAR_CONCEPTS = """
+    UNWIND $rows AS row
+    CALL db.index.vector.queryNodes('conceptEmbeddingIndex', 1, row.embedding)
+    YIELD node, score
+    RETURN row.name AS name, node.name AS similar_name, score
+    """
+
+    # A paragraph repeated in a section (a recurring note, an empty table)
+    # has one relationship per position
+    CYPHER_MERGE_SECTION_PARAGRAPHS = """
+    UNWIND $rows AS row
+    MATCH (s:Section {document_id: $document_id, section_id: row.section_id})
+    MATCH (p:Paragraph {text_hash: row.id})
+    MERGE (s)-[r:HAS_PARAGRAPH {position: row.position}]->(p)
+    SET r.page = row.page, r.level = row.level
+    """
+
+    CYPHER_MERGE_SECTION_CONCEPTS = """
+    MATCH (book:Book {document_id: $document_id})
+    UNWIND $rows AS row
+    MATCH (s:Section {document_id: $document_id, section_id: row.section_id})
+    MATCH (c:Concept {name: row.concept_name})
+    MERGE (s)-[:HAS_CONCEPT]->(c)
+    MERGE (book)-[:HAS_CONCEPT]->(c)
+    """
+
+    # Written last: a section with a fingerprint is completely stored
+    CYPHER_SET_SECTION_FINGERPRINTS = """
+    UNWIND $rows AS row
+    MATCH (s:Section {document_id: $document_id, section_id: row.section_id})
+    SET s.fingerprint = row.fingerprint
+    """
+
+    CYPHER_GET_SECTION_FINGERPRINTS = """
+    MATCH (s:Section {document_id: $document_id})
+    RETURN s.section_id AS section_id, s.fingerprint AS fingerprint
+    """
+
+    # Paragraphs are shared by the books quoting the same text, only the ones
+    # left without any section are deleted
+    CYPHER_DELETE_SECTIONS = """
+    UNWIND $rows AS row
+    MATCH (s:Section {document_id: $document_id, section_id: row.section_id})
+    OPTIONAL MATCH (s)-[:HAS_PARAGRAPH]->(p:Paragraph)
+    WITH s, collect(p) AS paragraphs
+    DETACH DELETE s
+    WITH paragraphs
+    UNWIND paragraphs AS p
+    WITH DISTINCT p
+    WHERE NOT EXISTS { MATCH (:Section)-[:HAS_PARAGRAPH]->(p) }
+    DELETE p
+    """
+
+    # Changed sections are stored again from scratch, without their fingerprint
+    CYPHER_CLEAR_SECTIONS = """
+    UNWIND $rows AS row
+    MATCH (s:Section {document_id: $document_id, section_id: row.section_id})
+    OPTIONAL MATCH (s)-[r:HAS_PARAGRAPH|HAS_CONCEPT]->(n)
+    WITH s, collect(r) AS relationships,
+        [n IN collect(n) WHERE n:Paragraph] AS paragraphs
+    REMOVE s.fingerprint, s.embedding
+    FOREACH (r IN relationships | DELETE r)
+    WITH paragraphs
+    UNWIND paragraphs AS p
+    WITH DISTINCT p
+    WHERE NOT EXISTS { MATCH (:Section)-[:HAS_PARAGRAPH]->(p) }
+    DELETE p
+    """
+
+    # Concepts of the book no section mentions anymore, after an update
+    CYPHER_GET_ORPHAN_BOOK_CONCEPTS = """
+    MATCH (:Book {document_id: $document_id})-[:HAS_CONCEPT]->(c:Concept)
+    WHERE NOT EXISTS { MATCH (:Section)-[:HAS_CONCEPT]->(c) }
+    RETURN c.name AS name
+    """
+
+    # Checked again, another book may have mentioned them since
+    CYPHER_DELETE_ORPHAN_CONCEPTS = """
+    UNWIND $rows AS row
+    MATCH (c:Concept {name: row.name})
+    WHERE NOT EXISTS { MATCH (:Section)-[:HAS_CONCEPT]->(c) }
+    DETACH DELETE c
+    """
+
+    # Section embeddings of the book, weighted by their number of concepts
+    CYPHER_GET_SECTION_EMBEDDINGS = """
+    MATCH (:Book {document_id: $document_id})-[:HAS_SECTION]->(s:Section)
+    WHERE s.embedding IS NOT NULL
+    RETURN s.embedding AS embedding, COUNT { (s)-[:HAS_CONCEPT]->() } AS concepts
+    """
+
+    CYPHER_SET_BOOK_EMBEDDING = """
+    MATCH (book:Book {document_id: $document_id})
+    CALL db.create.setNodeVectorProperty(book, 'embedding', $embedding)
+    """
+
+    CYPHER_REMOVE_BOOK_EMBEDDING = """
+    MATCH (book:Book {document_id: $document_id})
+    REMOVE book.embedding
+    """
+
+    async def store_book_in_neo4j(self, processed_document: ProcessedBook) -> None:
+        """
+        Create the Book node, before its sections are stored.
+        """
+        # The MERGE queries rely on the schema constraints, make sure they exist
+        await ensure_neo4j_schema(self.neo4j_async_driver)
+        async with self.neo4j_async_driver.session() as session:
+            await session.execute_write(self._neo4j_merge_book, processed_document)
+
+    async def _neo4j_set_book_embedding(
+        self, tx: AsyncManagedTransaction, document_id: str
+    ) -> None:
+        """
+        Store the centroid of the section embeddings on the Book node, each
+        section weighing as many concepts as it mentions.
+        """
+        result = await tx.run(
+            self.CYPHER_GET_SECTION_EMBEDDINGS, {"document_id": document_id}
+        )
+        records = await result.data()
+        if not records:
+            await tx.run(
+                self.CYPHER_REMOVE_BOOK_EMBEDDING, {"document_id": document_id}
+            )
+            return
+        embedding = centroid(
+            [record["embedding"] for record in records],
+            weights=[record["concepts"] for record in records],
+        )
+        await tx.run(
+            self.CYPHER_SET_BOOK_EMBEDDING,
+            {"document_id": document_id, "embedding": embedding},
+        )
+
+    async def store_sections_in_neo4j(
+        self, document_id: str, sections: list[SectionData]
+    ) -> list[BatchWriteStats]:
+        """
+        Store sections of a book already created with `store_book_in_neo4j`.
+
+        Nodes and relationships are written with separate UNWIND queries, in
+        batches of short transactions, so the size of a transaction doesn't
+        grow with the size of the book.
+        """
+        section_rows = [
+            {
+                "section_id": section.section_id,
+                "section_name": section.section_name,
+                "parent_section": section.parent_section,
+                "embedding": section.embedding if len(section.embedding) else None,
+            }
+            for section in sections
+        ]
+        # Texts are sent once, the relationships only reference them by id
+        paragraph_rows = list(
+            {
+                paragraph.id: {"id": paragraph.id, "text": paragraph.text}
+                for section in sections
+                for paragraph in section.section_paragraphs_data
+            }.values()
+        )
+        section_paragraph_rows = [
+            {"section_id": section.section_id, **paragraph.model_dump(exclude={"text"})}
+            for section in sections
+            for paragraph in section.section_paragraphs_data
+        ]
+        concept_rows = {}
+        for section in sections:
+            for concept in section.concepts:
+                row = concept_rows.setdefault(
+                    concept.name,
+                    {"name": concept.name, "embedding": None, "aliases": []},
+                )
+                if row["embedding"] is None and len(concept.embedding):
+                    # NumPy arrays are sent as lists by the Neo4j driver
+                    row["embedding"] = concept.embedding
+                row["aliases"] = sorted(set(row["aliases"]) | set(concept.aliases))
+        concept_rows = list(concept_rows.values())
+        section_concept_rows = [
+            {"section_id": section.section_id, "concept_name": concept.name}
+            for section in sections
+            for concept in section.concepts
+        ]
+        fingerprint_rows = [
+            {
+                "section_id": section.section_id,
+                "fingerprint": section_fingerprint(section),
+            }
+            for section in sections
+        ]
+
+        try:
+            stats = []
+            for name, query, rows in [
+                ("sections", self.CYPHER_MERGE_SECTIONS, section_rows),
+                ("paragraphs", self.CYPHER_MERGE_PARAGRAPHS, paragraph_rows),
+                ("concepts", self.CYPHER_MERGE_CONCEPTS, concept_rows),
+                (
+                    "section_paragraphs",
+                    self.CYPHER_MERGE_SECTION_PARAGRAPHS,
+                    section_paragraph_rows,
+                ),
+                (
+                    "section_concepts",
+                    self.CYPHER_MERGE_SECTION_CONCEPTS,
+                    section_concept_rows,
+                ),
+                (
+                    "section_fingerprints",
+                    self.CYPHER_SET_SECTION_FINGERPRINTS,
+                    fingerprint_rows,
+                ),
+            ]:
+                stats.extend(
+                    await self.neo4j_writer.write(
+                        name, query, rows, document_id=document_id
+                    )
+                )
+        except Exception as e:
+            logging.error(f"Error storing sections of book {document_id} into Neo4j: {e}")
+            raise
+
+        total_rows = sum(batch.rows for batch in stats)
+        total_seconds = sum(batch.seconds for batch in stats)
+        logging.info(
+            f"Stored {len(sections)} sections of book {document_id} into Neo4j: "
+            f"{total_rows} rows in {len(stats)} batches, {total_seconds:.2f}s "
+            f"({total_rows / total_seconds if total_seconds else 0:.0f} rows/s)"
+        )
+        return stats
+
+    async def _get_section_fingerprints(
+        self, tx: AsyncManagedTransaction, document_id: str
+    ) -> list[dict[str, Any]]:
+        result = await tx.run(
+            self.CYPHER_GET_SECTION_FINGERPRINTS, {"document_id": document_id}
+        )
+        return await result.data()
+
+    async def get_stored_section_fingerprints(self, document_id: str) -> dict[str, str]:
+        """
+        Fingerprint of every section of the book stored in Neo4j, by section id.
+        Empty for sections not completely stored.
+        """
+        async with self.neo4j_async_driver.session() as session:
+            records = await session.execute_read(
+                self._get_section_fingerprints, document_id
+            )
+        return {
+            record["section_id"]: record["fingerprint"] or "" for record in records
+        }
+
+    async def delete_sections_in_neo4j(
+        self, document_id: str, section_ids: list[str]
+    ) -> list[BatchWriteStats]:
+        """Delete sections of a book, in batches, with their orphan paragraphs."""
+        return await self.neo4j_writer.write(
+            "delete_sections",
+            self.CYPHER_DELETE_SECTIONS,
+            [{"section_id": section_id} for section_id in section_ids],
+            document_id=document_id,
+        )
+
+    async def clear_sections_in_neo4j(
+        self, document_id: str, section_ids: list[str]
+    ) -> list[BatchWriteStats]:
+        """
+        Detach sections of a book from their paragraphs and concepts, in
+        batches, so they can be stored again with `store_sections_in_neo4j`.
+        """
+        return await self.neo4j_writer.write(
+            "clear_sections",
+            self.CYPHER_CLEAR_SECTIONS,
+            [{"section_id": section_id} for section_id in section_ids],
+            document_id=document_id,
+        )
+
+    async def _find_similar_concepts(
+        self, tx: AsyncManagedTransaction, rows: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        result = await tx.run(self.CYPHER_FIND_SIMILAR_CONCEPTS, {"rows": rows})
+        return await result.data()
+
+    async def find_similar_concepts(
+        self, rows: list[dict[str, Any]]
+    ) -> dict[str, tuple[str, float]]:
+        """Nearest library concept (name, cosine) of each `name`, `embedding` row."""
+        if not rows:
+            return {}
+        await ensure_neo4j_schema(self.neo4j_async_driver)
+        async with self.neo4j_async_driver.session() as session:
+            records = await session.execute_read(self._find_similar_concepts, rows)
+        # The vector index scores cosine similarity as (1 + cosine) / 2
+        return {
+            record["name"]: (record["similar_name"], 2 * record["score"] - 1)
+            for record in records
+        }
+
+    async def _get_orphan_book_concepts(
+        self, tx: AsyncManagedTransaction, document_id: str
+    ) -> list[str]:
+        result = await tx.run(
+            self.CYPHER_GET_ORPHAN_BOOK_CONCEPTS, {"document_id": document_id}
+        )
+        return [record["name"] async for record in result]
+
+    async def finalize_book_in_neo4j(self, document_id: str) -> list[str]:
+        """
+        Store the concepts and the embedding of the book on its node, and
+        delete, in batches, the concepts that the sections removed or changed
+        by an update were the last to mention.
+
+        Returns the names of the concepts deleted. The ones deleted by an
+        interrupted attempt are not returned again, the API processes drop
+        them from their ANN index when they next sync it.
+        """
+        async with self.neo4j_async_driver.session() as session:
+            orphan_concepts = await session.execute_read(
+                self._get_orphan_book_concepts, document_id
+            )
+        if orphan_concepts:
+            await self.neo4j_writer.write(
+                "orphan_concepts",
+                self.CYPHER_DELETE_ORPHAN_CONCEPTS,
+                [{"name": name} for name in orphan_concepts],
+                document_id=document_id,
+            )
+            logging.info(
+                f"Deleted {len(orphan_concepts)} concepts no longer mentioned "
+                f"after the update of book {document_id}"
+            )
+        async with self.neo4j_async_driver.session() as session:
+            await session.execute_write(self._neo4j_set_book_concepts, document_id)
+            await session.execute_write(self._neo4j_set_book_embedding, document_id)
+        return orphan_concepts
+
     async def store_features_in_neo4j(self, processed_document: ProcessedBook) -> None:
         """
         High-level function that creates required indexes and stores extracted features into Neo4j.
         """
         try:
-            async with self.neo4j_async_driver.session() as session:
-                # 1) Create indexes
-                tx = await session.begin_transaction()
-                await self._neo4j_create_indexes(tx)
-                await tx.commit()
-
-                # 2) Merge the graph data
-                tx = await session.begin_transaction()
-                await self._neo4j_add_book_data(tx, processed_document)
-                await tx.commit()
+            await self.store_book_in_neo4j(processed_document)
+            await self.store_sections_in_neo4j(
+                processed_document.document_id, processed_document.sections
+            )
+            await self.finalize_book_in_neo4j(processed_document.document_id)
 
             logging.info(
                 f"Stored book {processed_document.document_id} into Neo4j successfully."
@@ -189,3 +775,4 @@ class PDFProcessingRepository:
             logging.error(
                 f"Error storing book {processed_document.document_id} into Neo4j: {e}"
             )
+            raise
@@ -1,11 +1,30 @@
+import re
+from typing import Any
+
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from neo4j import AsyncDriver
+from neo4j._async.work.transaction import AsyncManagedTransaction
+from src.config.settings import app_settings
 from src.schemas.retrieval import SearchResults, SearchResult
 
 
+# Characters with a meaning in the Lucene query syntax of the fulltext indexes
+LUCENE_SPECIAL_CHARACTERS = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+
+def escape_lucene_query(user_query: str) -> str:
+    """Escape a user query so that its terms are searched literally."""
+    return LUCENE_SPECIAL_CHARACTERS.sub(r"\\\1", user_query)
+
+
 class RetrievalRepository:
     """Repository for retrieving data from MongoDB and Neo4j"""
 
+    # Paragraphs of a section read to build its excerpt
+    EXCERPT_PARAGRAPHS = 3
+    # Paragraphs of each matched section kept by the vector search of paragraphs
+    SECTION_PARAGRAPHS = 3
+
     CYPHER_GET_BOOK_KNOWLEDGE_GRAPH = """
     MATCH (b: Book {id: $document_id})-[:HAS_SECTION]-(s: Section)<-[:MENTIONS]-(c: Concept)
     RETURN s, c
@@ -16,12 +35,174 @@ class RetrievalRepository:
     RETURN s, c
     """
 
-    CYPHER_GET_RELEVANT_BOOKS = """
-    MATCH (b: Book) WHERE b.embedding IS NOT NULL
-    WITH b, gds.alpha.similarity.cosine(b.embedding, $query_embedding) as similarity
-    RETURN b.id, b.title, b.embedding, similarity
-    ORDER BY similarity DESC
+    # Sections mentioning the matched `concept`s (with their `score`), ranked
+    # by their best matching concept, then by the sum of their matches. The
+    # excerpt only reads the first paragraphs of the sections
+    CYPHER_RANK_SECTIONS = """
+    MATCH (book:Book)-[:HAS_SECTION]->(section:Section)-[:HAS_CONCEPT]->(concept)
+    WITH book, section, max(score) AS relevance, sum(score) AS total_score
+    ORDER BY relevance DESC, total_score DESC
     SKIP $skip LIMIT $limit
+    CALL {
+        WITH section
+        OPTIONAL MATCH (section)-[occurrence:HAS_PARAGRAPH]->(paragraph:Paragraph)
+        WITH occurrence, paragraph
+        ORDER BY occurrence.position
+        LIMIT $excerpt_paragraphs
+        RETURN min(coalesce(occurrence.page, paragraph.page)) AS page,
+            collect(paragraph.text) AS texts
+    }
+    RETURN
+        elementId(section) AS id,
+        section.name AS title,
+        book.title AS book,
+        book.author AS author,
+        coalesce(page, 0) AS page,
+        relevance,
+        left(
+            reduce(text = section.name, paragraph IN texts | text + "\n" + paragraph),
+            $excerpt_length
+        ) AS excerpt
+    ORDER BY relevance DESC, total_score DESC
+    """
+
+    # Nearest concepts from the Neo4j vector index
+    CYPHER_VECTOR_SEARCH_SECTIONS = (
+        """
+    CALL db.index.vector.queryNodes('conceptEmbeddingIndex', $k, $query_embedding)
+    YIELD node AS concept, score
+    """
+        + CYPHER_RANK_SECTIONS
+    )
+
+    # Nearest concepts found beforehand, by the local ANN index
+    CYPHER_SCORED_CONCEPTS_SECTIONS = (
+        """
+    UNWIND $concepts AS candidate
+    MATCH (concept:Concept {name: candidate.name})
+    WITH concept, candidate.score AS score
+    """
+        + CYPHER_RANK_SECTIONS
+    )
+
+    # Second stage of the two-stage search: the nearest concepts of the
+    # `candidate` sections, scored like the vector index does
+    CYPHER_RANK_CANDIDATE_SECTIONS = (
+        """
+    MATCH (candidate)-[:HAS_CONCEPT]->(concept:Concept)
+    WHERE concept.embedding IS NOT NULL
+    WITH candidate AS section, concept,
+        vector.similarity.cosine(concept.embedding, $query_embedding) AS score
+    ORDER BY score DESC
+    LIMIT $k
+    """
+        + CYPHER_RANK_SECTIONS
+    )
+
+    # Sections nearest to the query among those of the nearest books, by the
+    # centroids of their concepts
+    CYPHER_TWO_STAGE_SEARCH_SECTIONS = (
+        """
+    CALL db.index.vector.queryNodes('bookEmbeddingIndex', $books, $query_embedding)
+    YIELD node AS candidate_book
+    MATCH (candidate_book)-[:HAS_SECTION]->(candidate:Section)
+    WHERE candidate.embedding IS NOT NULL
+    WITH candidate
+    ORDER BY vector.similarity.cosine(candidate.embedding, $query_embedding) DESC
+    LIMIT $sections
+    """
+        + CYPHER_RANK_CANDIDATE_SECTIONS
+    )
+
+    # Sections nearest to the query in the whole library
+    CYPHER_SECTION_INDEX_SEARCH_SECTIONS = (
+        """
+    CALL db.index.vector.queryNodes('sectionEmbeddingIndex', $sections, $query_embedding)
+    YIELD node AS candidate
+    """
+        + CYPHER_RANK_CANDIDATE_SECTIONS
+    )
+
+    PARAGRAPH_COLUMNS = """
+    RETURN
+        elementId(paragraph) AS id,
+        elementId(section) AS section_id,
+        section.name AS title,
+        book.title AS book,
+        book.author AS author,
+        coalesce(occurrence.page, paragraph.page, 0) AS page,
+        score AS relevance,
+        left(paragraph.text, $excerpt_length) AS excerpt
+    ORDER BY relevance DESC, occurrence.position
+    """
+
+    # First paragraphs of the sections mentioning the matched `concept`s,
+    # scored by the best matching concept of their section. Concepts are
+    # ideas rather than words of the text, paragraphs aren't matched by name
+    CYPHER_RANK_CONCEPT_PARAGRAPHS = (
+        """
+    MATCH (book:Book)-[:HAS_SECTION]->(section:Section)-[:HAS_CONCEPT]->(concept)
+    WITH book, section, max(score) AS score
+    ORDER BY score DESC
+    LIMIT $limit
+    CALL {
+        WITH section
+        MATCH (section)-[occurrence:HAS_PARAGRAPH]->(paragraph:Paragraph)
+        WITH occurrence, paragraph
+        ORDER BY occurrence.position
+        LIMIT $section_paragraphs
+        RETURN occurrence, paragraph
+    }
+    WITH book, section, occurrence, paragraph, score
+    ORDER BY score DESC, occurrence.position
+    LIMIT $limit
+    """
+        + PARAGRAPH_COLUMNS
+    )
+
+    CYPHER_VECTOR_SEARCH_PARAGRAPHS = (
+        """
+    CALL db.index.vector.queryNodes('conceptEmbeddingIndex', $k, $query_embedding)
+    YIELD node AS concept, score
+    """
+        + CYPHER_RANK_CONCEPT_PARAGRAPHS
+    )
+
+    CYPHER_SCORED_CONCEPTS_PARAGRAPHS = (
+        """
+    UNWIND $concepts AS candidate
+    MATCH (concept:Concept {name: candidate.name})
+    WITH concept, candidate.score AS score
+    """
+        + CYPHER_RANK_CONCEPT_PARAGRAPHS
+    )
+
+    # Paragraphs matching the query terms, from the fulltext index
+    CYPHER_FULLTEXT_SEARCH_PARAGRAPHS = (
+        """
+    CALL db.index.fulltext.queryNodes('paragraphTextIndex', $lucene_query, {limit: $limit})
+    YIELD node AS paragraph, score
+    MATCH (book:Book)-[:HAS_SECTION]->(section:Section)
+        -[occurrence:HAS_PARAGRAPH]->(paragraph)
+    """
+        + PARAGRAPH_COLUMNS
+    )
+
+    CYPHER_GET_CONCEPT_NAMES = """
+    MATCH (c:Concept) WHERE c.embedding IS NOT NULL
+    RETURN c.name AS name
+    """
+
+    CYPHER_GET_CONCEPT_EMBEDDINGS = """
+    UNWIND $names AS name
+    MATCH (c:Concept {name: name}) WHERE c.embedding IS NOT NULL
+    RETURN c.name AS name, c.embedding AS embedding
+    """
+
+    CYPHER_GET_BOOK_CONCEPT_EMBEDDINGS = """
+    MATCH (:Book {document_id: $document_id})-[:HAS_CONCEPT]->(c:Concept)
+    WHERE c.embedding IS NOT NULL
+    RETURN c.name AS name, c.embedding AS embedding
     """
 
     def __init__(
@@ -30,30 +211,165 @@ class RetrievalRepository:
         self.neo4j_async_driver = neo4j_async_driver
         self.mongodb_client = mongodb_client
 
+    @staticmethod
+    async def _fetch_records(
+        tx: AsyncManagedTransaction, query: str, parameters: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        result = await tx.run(query, parameters)
+        return await result.data()
+
+    @staticmethod
+    def to_search_result(
+        record: dict[str, Any], relevance: float | None = None
+    ) -> SearchResult:
+        return SearchResult(
+            id=record["id"],
+            title=record["title"] or "",
+            book=record["book"] or "Untitled",
+            author=record["author"] or "Unknown",
+            page=record["page"],
+            relevance=record["relevance"] if relevance is None else relevance,
+            excerpt=record["excerpt"] or "",
+        )
+
+    @staticmethod
+    def get_candidates_count(page: int, per_page: int) -> int:
+        """Number of nearest concepts to fetch to fill the requested page."""
+        return max(app_settings.VECTOR_SEARCH_CANDIDATES, page * per_page)
+
+    async def _get_ranked_sections(
+        self, query: str, page: int, per_page: int, **parameters: Any
+    ) -> SearchResults:
+        parameters.update(
+            skip=(page - 1) * per_page,
+            limit=per_page,
+            excerpt_length=app_settings.SEARCH_EXCERPT_LENGTH,
+            excerpt_paragraphs=self.EXCERPT_PARAGRAPHS,
+        )
+        async with self.neo4j_async_driver.session() as session:
+            records = await session.execute_read(self._fetch_records, query, parameters)
+        return SearchResults(results=[self.to_search_result(record) for record in records])
+
     async def get_search_results(
         self, query_embedding: list[float], page: int = 1, per_page: int = 10
     ) -> SearchResults:
-        """Search for documents matching a query"""
+        """
+        Search the sections matching a query embedding.
+
+        The concepts nearest to the query are read from the vector index, so
+        the cost of a search depends on the number of candidates instead of
+        the size of the library.
+        """
+        return await self._get_ranked_sections(
+            self.CYPHER_VECTOR_SEARCH_SECTIONS,
+            page,
+            per_page,
+            query_embedding=query_embedding,
+            k=self.get_candidates_count(page, per_page),
+        )
+
+    async def get_two_stage_search_results(
+        self, query_embedding: list[float], page: int = 1, per_page: int = 10
+    ) -> SearchResults:
+        """
+        Search the sections matching a query embedding, coarse to fine.
+
+        The books, then the sections, nearest to the query are found first by
+        the centroids of their concepts, only the concepts of these sections
+        are then compared with the query. Without candidate books, the
+        sections are read from the section vector index instead.
+        """
+        parameters = {
+            "query_embedding": query_embedding,
+            "sections": max(app_settings.SEARCH_SECTION_CANDIDATES, page * per_page),
+            "k": self.get_candidates_count(page, per_page),
+        }
+        if app_settings.SEARCH_BOOK_CANDIDATES > 0:
+            query = self.CYPHER_TWO_STAGE_SEARCH_SECTIONS
+            parameters["books"] = app_settings.SEARCH_BOOK_CANDIDATES
+        else:
+            query = self.CYPHER_SECTION_INDEX_SEARCH_SECTIONS
+        return await self._get_ranked_sections(query, page, per_page, **parameters)
+
+    async def get_search_results_for_concepts(
+        self, concept_scores: list[tuple[str, float]], page: int = 1, per_page: int = 10
+    ) -> SearchResults:
+        """Rank the sections mentioning concepts already matched with a query."""
+        return await self._get_ranked_sections(
+            self.CYPHER_SCORED_CONCEPTS_SECTIONS,
+            page,
+            per_page,
+            concepts=[{"name": name, "score": score} for name, score in concept_scores],
+        )
+
+    async def _get_paragraphs(
+        self, query: str, limit: int, **parameters: Any
+    ) -> list[dict[str, Any]]:
+        parameters.update(limit=limit, excerpt_length=app_settings.SEARCH_EXCERPT_LENGTH)
+        async with self.neo4j_async_driver.session() as session:
+            return await session.execute_read(self._fetch_records, query, parameters)
+
+    async def get_fulltext_paragraphs(
+        self, user_query: str, limit: int
+    ) -> list[dict[str, Any]]:
+        """Paragraphs matching the terms of the query, best first."""
+        lucene_query = escape_lucene_query(user_query)
+        if not lucene_query.strip():
+            return []
+        return await self._get_paragraphs(
+            self.CYPHER_FULLTEXT_SEARCH_PARAGRAPHS, limit, lucene_query=lucene_query
+        )
+
+    async def get_vector_paragraphs(
+        self, query_embedding: list[float], limit: int
+    ) -> list[dict[str, Any]]:
+        """First paragraphs of the sections of the nearest concepts, best first."""
+        return await self._get_paragraphs(
+            self.CYPHER_VECTOR_SEARCH_PARAGRAPHS,
+            limit,
+            query_embedding=query_embedding,
+            k=limit,
+            section_paragraphs=self.SECTION_PARAGRAPHS,
+        )
+
+    async def get_paragraphs_for_concepts(
+        self, concept_scores: list[tuple[str, float]], limit: int
+    ) -> list[dict[str, Any]]:
+        """Paragraphs of the sections of concepts matched with a query, best first."""
+        return await self._get_paragraphs(
+            self.CYPHER_SCORED_CONCEPTS_PARAGRAPHS,
+            limit,
+            concepts=[{"name": name, "score": score} for name, score in concept_scores],
+            section_paragraphs=self.SECTION_PARAGRAPHS,
+        )
+
+    async def get_concept_names(self) -> list[str]:
+        """Names of all the concepts having an embedding."""
+        async with self.neo4j_async_driver.session() as session:
+            records = await session.execute_read(
+                self._fetch_records, self.CYPHER_GET_CONCEPT_NAMES, {}
+            )
+        return [record["name"] for record in records]
+
+    async def get_concept_embeddings(
+        self, names: list[str]
+    ) -> list[tuple[str, list[float]]]:
+        async with self.neo4j_async_driver.session() as session:
+            records = await session.execute_read(
+                self._fetch_records, self.CYPHER_GET_CONCEPT_EMBEDDINGS, {"names": names}
+            )
+        return [(record["name"], record["embedding"]) for record in records]
+
+    async def get_book_concept_embeddings(
+        self, document_id: str
+    ) -> list[tuple[str, list[float]]]:
         async with self.neo4j_async_driver.session() as session:
-            tx = await session.begin_transaction()
-            result = await tx.run(
-                self.CYPHER_GET_RELEVANT_BOOKS,
-                query_embedding=query_embedding,
-                skip=(page - 1) * per_page,
-                limit=per_page,
+            records = await session.execute_read(
+                self._fetch_records,
+                self.CYPHER_GET_BOOK_CONCEPT_EMBEDDINGS,
+                {"document_id": document_id},
             )
-            return [
-                SearchResult(
-                    id=record["b.id"],
-                    title=record["b.title"],
-                    book=record["b.title"],
-                    author=record["b.author"],
-                    page=record["b.page"],
-                    relevance=record["similarity"],
-                    excerpt=record["b.excerpt"],
-                )
-                for record in result
-            ]
+        return [(record["name"], record["embedding"]) for record in records]
 
     # TODO: implement these methods
     # async def get_book_knowledge_graph(self, document_id: str) -> list[Section]:
@@ -0,0 +1,107 @@
+import logging
+import unicodedata
+
+import numpy as np
+from redis.asyncio import Redis
+from src.repository.llm_cache import LLMCacheRepository
+from src.schemas.retrieval import SearchResults
+from src.utils.events import LIBRARY_VERSION_KEY
+
+
+class SearchCache:
+    """
+    Redis cache of the search query embeddings and results.
+
+    Embeddings are keyed by the embedding model and the normalized query.
+    Results are also keyed by the search parameters and the library version,
+    bumped whenever a book finishes ingestion: results cached before are not
+    read anymore and expire with their TTL. Redis errors are logged and
+    treated as cache misses, searches don't depend on the cache.
+    """
+
+    EMBEDDING_KEY_PREFIX = "ai-library:search-embedding:"
+    RESULTS_KEY_PREFIX = "ai-library:search-results:"
+
+    def __init__(
+        self, redis_client: Redis, embedding_ttl: int, results_ttl: int
+    ) -> None:
+        self.redis_client = redis_client
+        self.embedding_ttl = embedding_ttl
+        self.results_ttl = results_ttl
+
+    @staticmethod
+    def normalize_query(user_query: str) -> str:
+        """Fold the case, the Unicode forms and the whitespace of a query."""
+        return " ".join(unicodedata.normalize("NFKC", user_query).split()).casefold()
+
+    async def get_library_version(self) -> int | None:
+        try:
+            version = await self.redis_client.get(LIBRARY_VERSION_KEY)
+        except Exception as e:
+            logging.warning(f"Failed to read the library version: {e}")
+            return None
+        return int(version) if version is not None else 0
+
+    def _embedding_key(self, model: str, normalized_query: str) -> str:
+        return self.EMBEDDING_KEY_PREFIX + LLMCacheRepository.make_key(
+            model, normalized_query
+        )
+
+    def _results_key(
+        self, normalized_query: str, library_version: int, **parameters: object
+    ) -> str:
+        return self.RESULTS_KEY_PREFIX + LLMCacheRepository.make_key(
+            normalized_query,
+            str(library_version),
+            *(f"{name}={parameters[name]}" for name in sorted(parameters)),
+        )
+
+    async def get_embedding(
+        self, model: str, normalized_query: str
+    ) -> list[float] | None:
+        try:
+            value = await self.redis_client.get(self._embedding_key(model, normalized_query))
+        except Exception as e:
+            logging.warning(f"Failed to read the search embedding cache: {e}")
+            return None
+        return np.frombuffer(value, dtype=np.float32).tolist() if value else None
+
+    async def set_embedding(
+        self, model: str, normalized_query: str, embedding: list[float]
+    ) -> None:
+        try:
+            await self.redis_client.set(
+                self._embedding_key(model, normalized_query),
+                np.asarray(embedding, dtype=np.float32).tobytes(),
+                ex=self.embedding_ttl,
+            )
+        except Exception as e:
+            logging.warning(f"Failed to write the search embedding cache: {e}")
+
+    async def get_results(
+        self, normalized_query: str, library_version: int, **parameters: object
+    ) -> SearchResults | None:
+        try:
+            value = await self.redis_client.get(
+                self._results_key(normalized_query, library_version, **parameters)
+            )
+        except Exception as e:
+            logging.warning(f"Failed to read the search results cache: {e}")
+            return None
+        return SearchResults.model_validate_json(value) if value else None
+
+    async def set_results(
+        self,
+        normalized_query: str,
+        library_version: int,
+        search_results: SearchResults,
+        **parameters: object,
+    ) -> None:
+        try:
+            await self.redis_client.set(
+                self._results_key(normalized_query, library_version, **parameters),
+                search_results.model_dump_json(),
+                ex=self.results_ttl,
+            )
+        except Exception as e:
+            logging.warning(f"Failed to write the search results cache: {e}")
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from neo4j import AsyncDriver, Driver
+from src.config.settings import app_settings
+from src.database.mongodb import get_mongodb
+from src.database.neo4j import get_neo4j_async, get_neo4j_sync
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.schemas.bulk_import import BulkImportJob, BulkImportProgress, BulkImportRequest
+from src.services.bulk_import import BulkImportService, collect_pdf_paths
+from src.tasks import enqueue_pdf_processing, import_library_task
+
+router = APIRouter(prefix="/v1")
+
+# Documentation
+BASE_DOCS_PATH = Path("src/docs")
+
+
+def get_bulk_import_service(
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongodb),
+    neo4j_sync_driver: Driver = Depends(get_neo4j_sync),
+    neo4j_async_driver: AsyncDriver = Depends(get_neo4j_async),
+) -> BulkImportService:
+    return BulkImportService(
+        processing_repository=PDFProcessingRepository(
+            neo4j_async_driver=neo4j_async_driver,
+            neo4j_sync_driver=neo4j_sync_driver,
+            mongodb_client=mongo_db,
+        ),
+        enqueue=enqueue_pdf_processing,
+        hashing_concurrency=app_settings.IMPORT_HASHING_CONCURRENCY,
+    )
+
+
+@router.post(
+    "/import",
+    tags=["features extraction"],
+    response_model=BulkImportJob,
+    description=(BASE_DOCS_PATH / "bulk_import_router.md").read_text(),
+)
+async def import_library(
+    import_request: BulkImportRequest,
+    bulk_import_service: BulkImportService = Depends(get_bulk_import_service),
+):
+    if not app_settings.IMPORT_ROOT:
+        raise HTTPException(403, "Imports are disabled, IMPORT_ROOT is not set")
+    try:
+        # Walking a large directory must not block the event loop
+        paths = await asyncio.to_thread(
+            collect_pdf_paths,
+            import_request.directory,
+            import_request.paths,
+            root=app_settings.IMPORT_ROOT,
+        )
+    except PermissionError as e:
+        raise HTTPException(403, str(e))
+    except ValueError as e:
+        raise HTTPException(404, str(e))
+    if not paths:
+        raise HTTPException(422, "No PDF file to import")
+
+    try:
+        import_job = await bulk_import_service.create_import(paths)
+        # Hashing thousands of files is left to the workers
+        import_library_task.delay(import_job.import_id, paths)
+        return import_job
+    except Exception as e:
+        logging.error(f"Import failed: {e}")
+        raise HTTPException(500, "Library import failed")
+
+
+@router.get(
+    "/import/{import_id}",
+    tags=["features extraction"],
+    response_model=BulkImportProgress,
+)
+async def get_import_progress(
+    import_id: str,
+    bulk_import_service: BulkImportService = Depends(get_bulk_import_service),
+):
+    """Progress, throughput (per minute) and estimated time left of an import."""
+    progress = await bulk_import_service.get_progress(import_id)
+    if progress is None:
+        raise HTTPException(404, "Import not found")
+    return progress
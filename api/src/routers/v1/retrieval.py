@@ -3,17 +3,19 @@ import json
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from neo4j import AsyncDriver
 from ollama import AsyncClient
+from redis.asyncio import Redis
 from src.schemas.retrieval import QueryRequest, SearchResults
-from functools import lru_cache
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
 from src.repository.retrieval import RetrievalRepository
+from src.services.concept_index import ConceptIndexService, get_concept_index_service
 from src.services.retrieval import RetrievalService
 
 from src.utils.ollama_client import get_ollama_client
 from src.database.mongodb import get_mongodb
 from src.database.neo4j import get_neo4j_async
+from src.database.redis import get_redis
 
 router = APIRouter(prefix="/v1")
 
@@ -21,7 +23,6 @@ router = APIRouter(prefix="/v1")
 BASE_DOCS_PATH = Path("src/docs")
 
 
-@lru_cache(maxsize=50)
 @router.post(
     "/search-concept",
     tags=["retrieval"],
@@ -35,14 +36,26 @@ async def search_concept(
     ollama_client: AsyncClient = Depends(get_ollama_client),
     mongo_db: AsyncIOMotorDatabase = Depends(get_mongodb),
     neo4j_async_driver: AsyncDriver = Depends(get_neo4j_async),
+    redis_client: Redis = Depends(get_redis),
+    concept_index_service: ConceptIndexService | None = Depends(
+        get_concept_index_service
+    ),
 ):
     try:
         retrieval_service = RetrievalService(
             ollama_client=ollama_client,
             neo4j_async_driver=neo4j_async_driver,
             mongo_db=mongo_db,
+            redis_client=redis_client,
+            concept_index=(
+                concept_index_service.concept_index if concept_index_service else None
+            ),
+        )
+        return await retrieval_service.search(
+            query_request.query,
+            page=query_request.page,
+            per_page=query_request.per_page,
+            mode=query_request.mode,
         )
-        results = await retrieval_service.get_search_results(query_request.query)
-        return SearchResults(**results.model_dump())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
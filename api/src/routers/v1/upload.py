@@ -1,11 +1,9 @@
 import json
 
-from llmsherpa.readers import LayoutPDFReader
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from neo4j import AsyncDriver, Driver
-from ollama import AsyncClient
-from src.schemas.upload import ProcessedBook, ProcessedBookMongoDB
-from functools import lru_cache
+from src.schemas.upload import ProcessedBookMongoDB
+import hashlib
 from pathlib import Path
 from bson import ObjectId
 
@@ -15,16 +13,16 @@ from fastapi import (
     File,
     HTTPException,
     UploadFile,
-    BackgroundTasks,
 )
 from src.repository.pdf_processing import PDFProcessingRepository
 import logging
 
-from src.services.pdf_processing import PDFProcessorService
-from src.utils.ollama_client import get_ollama_client
-from src.utils.pdf_reader import get_pdf_reader
+from src.config.settings import app_settings
+from src.services.pdf_processing import CHECKPOINT_STAGES
+from src.tasks import enqueue_pdf_processing
 from src.database.mongodb import get_mongodb
 from src.database.neo4j import get_neo4j_sync, get_neo4j_async
+from src.utils.pdf_reader import PDF_SIGNATURE
 
 router = APIRouter(prefix="/v1")
 
@@ -36,7 +34,34 @@ UPLOAD_DIRECTORY_NEO4J = Path("/neo4j_import")
 UPLOAD_DIRECTORY_PDF = Path("src/pdf_uploads")
 
 
-@lru_cache(maxsize=50)
+async def save_upload(upload: UploadFile, destination: Path) -> str:
+    """
+    Stream an uploaded PDF to `destination` chunk by chunk, without holding
+    it in memory, and return its SHA-256 checksum.
+    """
+    if upload.size is not None and upload.size > app_settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(413, "PDF file is too large")
+
+    checksum = hashlib.sha256()
+    size = 0
+    try:
+        with open(destination, "wb") as file_object:
+            while chunk := await upload.read(app_settings.UPLOAD_CHUNK_SIZE):
+                if size == 0 and not chunk.startswith(PDF_SIGNATURE):
+                    raise HTTPException(422, "Invalid PDF file")
+                size += len(chunk)
+                if size > app_settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(413, "PDF file is too large")
+                checksum.update(chunk)
+                file_object.write(chunk)
+        if size == 0:
+            raise HTTPException(422, "Invalid PDF file")
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return checksum.hexdigest()
+
+
 @router.post(
     "/upload",
     tags=["features extraction"],
@@ -46,36 +71,49 @@ UPLOAD_DIRECTORY_PDF = Path("src/pdf_uploads")
     responses=json.loads((BASE_DOCS_PATH / "examples_responses.json").read_text()),
 )
 async def upload_pdf(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(
         ..., example=json.loads((BASE_DOCS_PATH / "examples_requests.json").read_text())
     ),
-    ollama_client: AsyncClient = Depends(get_ollama_client),
     mongo_db: AsyncIOMotorDatabase = Depends(get_mongodb),
     neo4j_sync_driver: Driver = Depends(get_neo4j_sync),
     neo4j_async_driver: AsyncDriver = Depends(get_neo4j_async),
-    pdf_reader: LayoutPDFReader = Depends(get_pdf_reader),
 ):
     document_id = str(ObjectId())
+    file_location = UPLOAD_DIRECTORY_PDF / f"{document_id}.pdf"
+    checksum = await save_upload(file, file_location)
 
     try:
-        file_location = str(UPLOAD_DIRECTORY_PDF / f"{document_id}.pdf")
-        with open(file_location, "wb+") as file_object:
-            file_object.write(await file.read())
-
-        background_tasks.add_task(
-            perform_processing,
-            file_location,
-            document_id,
-            ollama_client,
-            mongo_db,
-            neo4j_sync_driver,
-            neo4j_async_driver,
-            pdf_reader,
+        pdf_processing_repository = PDFProcessingRepository(
+            neo4j_async_driver=neo4j_async_driver,
+            neo4j_sync_driver=neo4j_sync_driver,
+            mongodb_client=mongo_db,
         )
 
+        # The same file is already processed or queued: don't run it again
+        existing_document = await pdf_processing_repository.get_processing_by_checksum(
+            checksum
+        )
+        if existing_document is not None:
+            file_location.unlink(missing_ok=True)
+            logging.info(
+                f"Upload is a duplicate of document {existing_document['document_id']}"
+            )
+            return ProcessedBookMongoDB(**existing_document)
+
+        await pdf_processing_repository.save_pdf_processing_metadata(
+            ProcessedBookMongoDB(
+                document_id=document_id,
+                status="QUEUED",
+                file_location=str(file_location),
+                checksum=checksum,
+            )
+        )
+
+        # Processing runs on the Celery workers, the API only enqueues it
+        enqueue_pdf_processing(str(file_location), document_id)
+
         return ProcessedBookMongoDB(
-            document_id=document_id, sections=[], status="PROCESSING"
+            document_id=document_id, status="QUEUED", checksum=checksum
         )
 
     except Exception as e:
@@ -83,6 +121,78 @@ async def upload_pdf(
         raise HTTPException(500, "PDF processing failed")
 
 
+@router.post(
+    "/upload/{document_id}",
+    response_model=ProcessedBookMongoDB,
+    tags=["features extraction"],
+)
+async def update_pdf(
+    document_id: str,
+    file: UploadFile = File(...),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongodb),
+    neo4j_sync_driver: Driver = Depends(get_neo4j_sync),
+    neo4j_async_driver: AsyncDriver = Depends(get_neo4j_async),
+):
+    """
+    Replace a book with a new edition. Only the sections whose name or text
+    changed are processed again, removed sections are deleted.
+    """
+    pdf_processing_repository = PDFProcessingRepository(
+        neo4j_async_driver=neo4j_async_driver,
+        neo4j_sync_driver=neo4j_sync_driver,
+        mongodb_client=mongo_db,
+    )
+    processed_document_status = await pdf_processing_repository.get_processing_status(
+        document_id
+    )
+    if processed_document_status is None:
+        raise HTTPException(404, "Document not found")
+    if processed_document_status["status"] in ("QUEUED", "PROCESSING"):
+        raise HTTPException(
+            409, f"Document is already {processed_document_status['status']}"
+        )
+
+    file_location = UPLOAD_DIRECTORY_PDF / f"{document_id}.pdf"
+    checksum = await save_upload(file, file_location)
+    if (
+        checksum == processed_document_status.get("checksum")
+        and processed_document_status["status"] == "COMPLETED"
+    ):
+        file_location.unlink(missing_ok=True)
+        logging.info(f"Upload is the current edition of document {document_id}")
+        return ProcessedBookMongoDB(**processed_document_status)
+
+    try:
+        # Checkpoints of a previous attempt belong to the previous edition
+        await pdf_processing_repository.delete_stage_checkpoints(document_id)
+        await pdf_processing_repository.update_pdf_processing_metadata(
+            ProcessedBookMongoDB(
+                document_id=document_id,
+                status="QUEUED",
+                stage="",
+                last_completed_stage="",
+                file_location=str(file_location),
+                checksum=checksum,
+                keep_file=False,
+                sections_total=0,
+                sections_processed=0,
+                sections_unchanged=0,
+                sections_removed=0,
+                concepts_extracted=0,
+                completed_at=None,
+                metrics={},
+            )
+        )
+        enqueue_pdf_processing(str(file_location), document_id)
+        logging.info(f"Updating document {document_id} to a new edition")
+        return ProcessedBookMongoDB(
+            document_id=document_id, status="QUEUED", checksum=checksum
+        )
+    except Exception as e:
+        logging.error(f"Update failed: {e}")
+        raise HTTPException(500, "PDF processing failed")
+
+
 @router.get(
     "/status/{document_id}",
     response_model=ProcessedBookMongoDB,
@@ -109,25 +219,57 @@ async def get_status(
         raise HTTPException(500, "PDF processing failed")
 
 
-async def perform_processing(
-    file_location: str,
+@router.post(
+    "/reprocess/{document_id}",
+    response_model=ProcessedBookMongoDB,
+    tags=["features extraction"],
+)
+async def reprocess_pdf(
     document_id: str,
-    ollama_client: AsyncClient,
-    mongo_db: AsyncIOMotorDatabase,
-    neo4j_sync_driver: Driver,
-    neo4j_async_driver: AsyncDriver,
-    pdf_reader: LayoutPDFReader,
+    neo4j_async_driver: AsyncDriver = Depends(get_neo4j_async),
+    neo4j_sync_driver: Driver = Depends(get_neo4j_sync),
+    mongo_db: AsyncIOMotorDatabase = Depends(get_mongodb),
 ):
-    pdf_processor_service = PDFProcessorService(
-        ollama_client=ollama_client,
-        mongo_db=mongo_db,
-        neo4j_sync_driver=neo4j_sync_driver,
+    """Restart a failed processing from its last completed (checkpointed) stage."""
+    pdf_processing_repository = PDFProcessingRepository(
         neo4j_async_driver=neo4j_async_driver,
-        pdf_reader=pdf_reader,
+        neo4j_sync_driver=neo4j_sync_driver,
+        mongodb_client=mongo_db,
     )
-    processed_document = await pdf_processor_service.process_pdf(
-        file_location, document_id
+    processed_document_status = await pdf_processing_repository.get_processing_status(
+        document_id
     )
-    processed_document.status = "COMPLETED"
-    logging.info(f"Processing completed for document {document_id}")
-    return processed_document
+    if processed_document_status is None:
+        raise HTTPException(404, "Document not found")
+    if processed_document_status["status"] in ("QUEUED", "PROCESSING", "COMPLETED"):
+        raise HTTPException(
+            409, f"Document is already {processed_document_status['status']}"
+        )
+
+    try:
+        resume_from = ""
+        last_completed_stage = processed_document_status.get("last_completed_stage")
+        if last_completed_stage in CHECKPOINT_STAGES and (
+            await pdf_processing_repository.has_stage_checkpoint(
+                document_id, last_completed_stage
+            )
+        ):
+            resume_from = last_completed_stage
+
+        await pdf_processing_repository.update_pdf_processing_metadata(
+            ProcessedBookMongoDB(document_id=document_id, status="QUEUED")
+        )
+        enqueue_pdf_processing(
+            processed_document_status["file_location"], document_id, resume_from
+        )
+        logging.info(
+            f"Reprocessing document {document_id} after stage '{resume_from or 'NONE'}'"
+        )
+        return ProcessedBookMongoDB(
+            document_id=document_id,
+            status="QUEUED",
+            last_completed_stage=resume_from,
+        )
+    except Exception as e:
+        logging.error(f"Reprocessing failed: {e}")
+        raise HTTPException(500, "PDF processing failed")
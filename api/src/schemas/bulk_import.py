@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+
+class BulkImportRequest(BaseModel):
+    # PDFs found recursively in a directory, or listed in a manifest of paths,
+    # as seen by the API and the workers
+    directory: str = ""
+    paths: list[str] = []
+
+
+class BulkImportJob(BaseModel):
+    import_id: str = Field(...)
+    # ENQUEUEING while the files are hashed and queued, then ENQUEUED
+    status: str = ""
+    created_at: datetime | None = None
+    files_total: int = 0
+    documents_queued: int = 0
+    duplicates: int = 0
+    errors: list[str] = []
+
+
+class BulkImportProgress(BulkImportJob):
+    # Number of documents per processing status
+    documents: dict[str, int] = {}
+    pages_processed: int = 0
+    sections_processed: int = 0
+    concepts_extracted: int = 0
+    elapsed_seconds: float = 0.0
+    documents_per_minute: float = 0.0
+    pages_per_minute: float = 0.0
+    sections_per_minute: float = 0.0
+    concepts_per_minute: float = 0.0
+    # Estimated from the documents completed so far
+    eta_seconds: float | None = None
@@ -1,8 +1,13 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, Field
 
 
 class QueryRequest(BaseModel):
     query: str
+    page: int = Field(default=1, ge=1)
+    per_page: int = Field(default=10, ge=1, le=100)
+    mode: Literal["vector", "hybrid", "two_stage"] = "vector"
 
 
 class SearchResult(BaseModel):
@@ -17,3 +22,5 @@ class SearchResult(BaseModel):
 
 class SearchResults(BaseModel):
     results: list[SearchResult]
+    # Milliseconds spent on each stage of the search
+    timings: dict[str, float] = {}
@@ -1,25 +1,62 @@
 from datetime import datetime
-from pydantic import BaseModel, Field
+from typing import Annotated
+
+import numpy as np
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, PlainSerializer
+from src.utils.vectors import as_embedding, empty_embedding
+
+# float32 vector, serialized to a list of floats in JSON
+Embedding = Annotated[
+    np.ndarray,
+    BeforeValidator(as_embedding),
+    PlainSerializer(lambda embedding: embedding.tolist(), when_used="json"),
+]
 
 
 class SectionParagraphData(BaseModel):
+    # Hash of the text, the key of the Paragraph node shared by identical texts
+    id: str
+    # Position of the paragraph in its section
+    position: int
     level: int
     text: str
     page: int
-    parent_text: str
-    parent_chain: list
 
 
 class Concepts(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     name: str
-    embedding: list[float] = []
+    # Empty until embedded
+    embedding: Embedding = Field(default_factory=empty_embedding)
+    # Names merged into this canonical concept
+    aliases: list[str] = []
 
 
 class SectionData(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # Key of the section in its book, section names aren't unique
+    section_id: str
     section_name: str
+    # Name of the enclosing section, empty for top-level sections
+    parent_section: str = ""
+    # Paragraphs directly under the section, those of subsections aren't repeated
     section_paragraphs_data: list[SectionParagraphData]
-    section_text: str
     concepts: list[Concepts] = []
+    # Centroid of the concept embeddings, empty until embedded. Only stored
+    # in Neo4j, not in the checkpoints
+    embedding: Embedding = Field(default_factory=empty_embedding, exclude=True)
+
+    @property
+    def section_text(self) -> str:
+        """Text of the section, rebuilt from its title and paragraphs."""
+        return "\n".join(
+            [
+                self.section_name,
+                *(paragraph.text for paragraph in self.section_paragraphs_data),
+            ]
+        )
 
 
 class SectionsFeatures(BaseModel):
@@ -31,7 +68,7 @@ class ProcessedBook(BaseModel):
     title: str = "Untitled"
     author: str = "Unknown"
     pages: int = 0
-    published_date: datetime = None
+    published_date: datetime | None = None
     added_date: datetime = datetime.now()
     cover_image: str = ""
     description: str = ""
@@ -42,7 +79,27 @@ class ProcessedBook(BaseModel):
 
 class ProcessedBookMongoDB(BaseModel):
     document_id: str = Field(...)
-    status: str
+    status: str = ""
+    stage: str = ""
+    last_completed_stage: str = ""
+    file_location: str = ""
+    checksum: str = ""
+    # Imported files are left in place once processed, uploads are deleted
+    keep_file: bool = False
+    import_id: str = ""
+    pages: int = 0
+    sections_total: int = 0
+    sections_processed: int = 0
+    # Sections left as stored, and removed, by the update to a new edition
+    sections_unchanged: int = 0
+    sections_removed: int = 0
+    concepts_extracted: int = 0
+    completed_at: datetime | None = None
+    # Set while the document waits for an ingestion slot, out of the broker
+    waiting_since: datetime | None = None
+    # Ingestion metrics summed over all the stages, by group, label and field
+    # (e.g. metrics["ollama"][model]["prompt_tokens"])
+    metrics: dict[str, dict[str, dict[str, float]]] = {}
 
 
 class ExtractedConcepts(BaseModel):
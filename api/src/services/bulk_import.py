@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from bson import ObjectId
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.schemas.bulk_import import BulkImportJob, BulkImportProgress
+from src.schemas.upload import ProcessedBookMongoDB
+from src.utils.pdf_reader import PDF_SIGNATURE
+
+# Bytes read at once when hashing a file
+HASHING_CHUNK_SIZE = 1024 * 1024
+
+
+def read_manifest(manifest_path: str | Path) -> list[str]:
+    """Paths listed in a manifest file, one per line, `#` starting comments."""
+    lines = Path(manifest_path).read_text().splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+
+
+def collect_pdf_paths(
+    directory: str = "",
+    paths: list[str] | None = None,
+    root: str | Path | None = None,
+) -> list[str]:
+    """
+    Absolute paths of the PDFs found in `directory` and of the listed `paths`.
+
+    With a `root`, paths resolving outside of it (symbolic links included)
+    raise a `PermissionError` before anything is read from the directory, so
+    the errors don't tell what exists outside of the root.
+    """
+    resolved_root = Path(root).resolve() if root is not None else None
+
+    def check_root(path: Path) -> Path:
+        resolved_path = path.resolve()
+        if resolved_root is not None and not resolved_path.is_relative_to(
+            resolved_root
+        ):
+            raise PermissionError(f"Path outside of the import root: {path}")
+        return resolved_path
+
+    listed_paths = [check_root(Path(path)) for path in paths or []]
+    pdf_paths = []
+    if directory:
+        resolved_directory = check_root(Path(directory))
+        if not resolved_directory.is_dir():
+            raise ValueError(f"Directory not found: {directory}")
+        # Links found in the directory can still point outside of the root
+        pdf_paths.extend(
+            check_root(path)
+            for path in sorted(resolved_directory.rglob("*"))
+            if path.suffix.lower() == ".pdf" and path.is_file()
+        )
+    pdf_paths.extend(listed_paths)
+    return [str(path) for path in dict.fromkeys(pdf_paths)]
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 checksum of a PDF file, `ValueError` if it isn't a PDF."""
+    checksum = hashlib.sha256()
+    with open(path, "rb") as file_object:
+        first_chunk = True
+        while chunk := file_object.read(HASHING_CHUNK_SIZE):
+            if first_chunk and not chunk.startswith(PDF_SIGNATURE):
+                raise ValueError("Invalid PDF file")
+            first_chunk = False
+            checksum.update(chunk)
+    if first_chunk:
+        raise ValueError("Invalid PDF file")
+    return checksum.hexdigest()
+
+
+def as_utc(value: datetime) -> datetime:
+    # MongoDB returns naive UTC datetimes
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class BulkImportService:
+    """
+    Import a library of PDFs already on disk.
+
+    Files are hashed, the ones already processed, queued or listed twice are
+    skipped, and the others queued for processing like uploads. The number of
+    documents processed at once is bounded by the ingestion semaphore shared
+    by the workers, not by the import.
+    """
+
+    def __init__(
+        self,
+        processing_repository: PDFProcessingRepository,
+        enqueue: Callable[[str, str], Any],
+        hashing_concurrency: int = 4,
+    ) -> None:
+        self.processing_repository = processing_repository
+        self.enqueue = enqueue
+        self.hashing_concurrency = hashing_concurrency
+
+    async def create_import(self, paths: list[str]) -> BulkImportJob:
+        import_job = BulkImportJob(
+            import_id=str(ObjectId()),
+            status="ENQUEUEING",
+            created_at=datetime.now(timezone.utc),
+            files_total=len(paths),
+        )
+        await self.processing_repository.save_import_job(import_job)
+        return import_job
+
+    async def enqueue_files(self, import_id: str, paths: list[str]) -> BulkImportJob:
+        """Queue the processing of the files of an import, skipping duplicates."""
+        hashing_slots = asyncio.Semaphore(self.hashing_concurrency)
+        checksums = set()
+        results = {"queued": 0, "duplicates": 0}
+        errors = []
+
+        async def enqueue_file(path: str) -> None:
+            try:
+                async with hashing_slots:
+                    checksum = await asyncio.to_thread(file_checksum, path)
+                if checksum in checksums:
+                    results["duplicates"] += 1
+                    return
+                checksums.add(checksum)
+
+                # Also skips the files queued by a previous run of the same import
+                if await self.processing_repository.get_processing_by_checksum(checksum):
+                    results["duplicates"] += 1
+                    return
+
+                document_id = str(ObjectId())
+                await self.processing_repository.save_pdf_processing_metadata(
+                    ProcessedBookMongoDB(
+                        document_id=document_id,
+                        status="QUEUED",
+                        file_location=path,
+                        checksum=checksum,
+                        keep_file=True,
+                        import_id=import_id,
+                    )
+                )
+                self.enqueue(path, document_id)
+                results["queued"] += 1
+            except Exception as e:
+                logging.error(f"Failed to import {path}: {e}")
+                errors.append(f"{path}: {e}")
+
+        await asyncio.gather(*(enqueue_file(path) for path in paths))
+
+        import_job = BulkImportJob(
+            import_id=import_id,
+            status="ENQUEUED",
+            documents_queued=results["queued"],
+            duplicates=results["duplicates"],
+            errors=errors,
+        )
+        await self.processing_repository.update_import_job(import_job)
+        logging.info(
+            f"Import {import_id}: {results['queued']} documents queued, "
+            f"{results['duplicates']} duplicates, {len(errors)} errors"
+        )
+        return import_job
+
+    async def get_progress(self, import_id: str) -> BulkImportProgress | None:
+        """Aggregate throughput of an import and estimated time to complete it."""
+        import_job = await self.processing_repository.get_import_job(import_id)
+        if import_job is None:
+            return None
+        progress = BulkImportProgress(**{**import_job, "import_id": import_id})
+
+        stats = await self.processing_repository.get_import_documents_stats(import_id)
+        progress.documents = {row["_id"]: row["documents"] for row in stats}
+        progress.pages_processed = sum(row["pages"] for row in stats)
+        progress.sections_processed = sum(row["sections_processed"] for row in stats)
+        progress.concepts_extracted = sum(row["concepts_extracted"] for row in stats)
+
+        completed = progress.documents.get("COMPLETED", 0)
+        remaining = progress.documents.get("QUEUED", 0) + progress.documents.get(
+            "PROCESSING", 0
+        )
+        if progress.status == "ENQUEUEING":
+            remaining = max(
+                remaining, progress.files_total - sum(progress.documents.values())
+            )
+
+        # A finished import is measured up to its last completed document
+        end_time = datetime.now(timezone.utc)
+        last_completed = [row["last_completed_at"] for row in stats if row["last_completed_at"]]
+        if not remaining and last_completed:
+            end_time = as_utc(max(last_completed))
+        progress.elapsed_seconds = max(
+            (end_time - as_utc(progress.created_at)).total_seconds(), 0.0
+        )
+
+        if progress.elapsed_seconds:
+            minutes = progress.elapsed_seconds / 60
+            progress.documents_per_minute = completed / minutes
+            progress.pages_per_minute = progress.pages_processed / minutes
+            progress.sections_per_minute = progress.sections_processed / minutes
+            progress.concepts_per_minute = progress.concepts_extracted / minutes
+        if completed:
+            progress.eta_seconds = remaining * progress.elapsed_seconds / completed
+        return progress
@@ -0,0 +1,170 @@
+import logging
+from collections import Counter
+
+import numpy as np
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.schemas.upload import Concepts, SectionData
+from src.utils.concept_names import normalize_concept_name
+from src.utils.vectors import empty_embedding, normalize
+
+
+class ConceptCanonicalizer:
+    """
+    Merge the near-duplicate concepts of a book into canonical concepts.
+
+    Names are normalized first (case, whitespace, plurals). The concepts left
+    are merged, by cosine similarity of their embeddings above `threshold`,
+    into the concepts already seen in the book, then into the concepts of the
+    library (through the Neo4j vector index), then with each other, the most
+    mentioned one becoming canonical. Merged names are kept as aliases.
+
+    One instance is used per book, windows of sections are canonicalized in
+    order so that later windows reuse the canonical concepts of earlier ones.
+    """
+
+    def __init__(
+        self, processing_repository: PDFProcessingRepository, threshold: float
+    ) -> None:
+        self.processing_repository = processing_repository
+        self.threshold = threshold
+        # Canonical concept of every normalized name seen in the book
+        self.canonical_names: dict[str, str] = {}
+        # Canonical concepts of the book and their normalized embeddings
+        self.vocabulary: list[str] = []
+        self.vocabulary_vectors: np.ndarray | None = None
+        # Embeddings of the canonical concepts new to the library
+        self.embeddings: dict[str, np.ndarray] = {}
+
+    def _add_to_vocabulary(self, names: list[str], vectors: np.ndarray) -> None:
+        self.vocabulary.extend(names)
+        self.vocabulary_vectors = (
+            vectors
+            if self.vocabulary_vectors is None
+            else np.vstack([self.vocabulary_vectors, vectors])
+        )
+
+    async def _map_new_names(
+        self, names: list[str], embeddings: dict[str, np.ndarray]
+    ) -> dict[str, str]:
+        """Canonical concept of each of the normalized `names`, by similarity."""
+        mapping = {}
+        if self.threshold > 1:
+            # Merging by similarity is disabled, only names are normalized
+            for name in names:
+                mapping[name] = name
+                self.embeddings[name] = embeddings[name]
+            return mapping
+
+        vectors = normalize(np.stack([embeddings[name] for name in names]))
+        matched = np.zeros(len(names), dtype=bool)
+
+        if self.vocabulary:
+            similarities = vectors @ self.vocabulary_vectors.T
+            best = similarities.argmax(axis=1)
+            for index in np.flatnonzero(
+                similarities[np.arange(len(names)), best] >= self.threshold
+            ):
+                mapping[names[index]] = self.vocabulary[best[index]]
+                matched[index] = True
+
+        unmatched = [index for index in range(len(names)) if not matched[index]]
+        library_matches = (
+            await self.processing_repository.find_similar_concepts(
+                [
+                    {"name": names[index], "embedding": embeddings[names[index]]}
+                    for index in unmatched
+                ]
+            )
+            if unmatched
+            else {}
+        )
+        library_names, library_indexes = [], []
+        for index in unmatched:
+            match = library_matches.get(names[index])
+            if match is not None and match[1] >= self.threshold:
+                mapping[names[index]] = match[0]
+                matched[index] = True
+                if match[0] not in library_names:
+                    # The first member stands in for the embedding of the
+                    # library concept, which is not fetched
+                    library_names.append(match[0])
+                    library_indexes.append(index)
+        if library_names:
+            self._add_to_vocabulary(library_names, vectors[library_indexes])
+
+        # Greedy clustering of the names left, in the order given
+        remaining = np.flatnonzero(~matched)
+        similarities = vectors[remaining] @ vectors[remaining].T
+        canonical_indexes = []
+        for position, index in enumerate(remaining):
+            if names[index] in mapping:
+                continue
+            mapping[names[index]] = names[index]
+            self.embeddings[names[index]] = embeddings[names[index]]
+            canonical_indexes.append(index)
+            for other in np.flatnonzero(similarities[position] >= self.threshold):
+                mapping.setdefault(names[remaining[other]], names[index])
+        if canonical_indexes:
+            self._add_to_vocabulary(
+                [names[index] for index in canonical_indexes],
+                vectors[canonical_indexes],
+            )
+        return mapping
+
+    async def canonicalize(self, sections: list[SectionData]) -> list[SectionData]:
+        """Replace the concepts of embedded `sections` by their canonical concepts."""
+        mentions = Counter()
+        embeddings = {}
+        for section in sections:
+            for concept in section.concepts:
+                name = normalize_concept_name(concept.name)
+                if name and len(concept.embedding):
+                    mentions[name] += 1
+                    embeddings.setdefault(name, concept.embedding)
+
+        # Most mentioned names first, they become the canonical concepts
+        new_names = [
+            name
+            for name, _ in mentions.most_common()
+            if name not in self.canonical_names
+        ]
+        if new_names:
+            self.canonical_names.update(
+                await self._map_new_names(new_names, embeddings)
+            )
+
+        canonicalized_sections = []
+        merged = 0
+        for section in sections:
+            aliases: dict[str, set[str]] = {}
+            for concept in section.concepts:
+                name = normalize_concept_name(concept.name)
+                if name not in self.canonical_names:
+                    continue
+                canonical_name = self.canonical_names[name]
+                aliases.setdefault(canonical_name, set())
+                if concept.name != canonical_name:
+                    aliases[canonical_name].add(concept.name)
+            merged += len(section.concepts) - len(aliases)
+            canonicalized_sections.append(
+                section.model_copy(
+                    update={
+                        "concepts": [
+                            Concepts(
+                                name=canonical_name,
+                                # Empty for the concepts already in the library
+                                embedding=self.embeddings.get(
+                                    canonical_name, empty_embedding()
+                                ),
+                                aliases=sorted(names),
+                            )
+                            for canonical_name, names in aliases.items()
+                        ]
+                    }
+                )
+            )
+        logging.info(
+            f"Canonicalized concepts of {len(sections)} sections: {merged} merged, "
+            f"{len(self.vocabulary)} canonical concepts in the book"
+        )
+        return canonicalized_sections
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+from functools import lru_cache
+
+import numpy as np
+from src.config.settings import app_settings
+from src.database.mongodb import get_mongodb
+from src.database.neo4j import get_neo4j_async
+from src.repository.retrieval import RetrievalRepository
+from src.utils.ann_index import ConceptANNIndex
+from src.utils.events import BOOK_INGESTED_CHANNEL, listen_library_events
+
+# Seconds to wait before subscribing again to the ingestion events
+RECONNECT_DELAY = 5.0
+
+
+class ConceptIndexService:
+    """
+    Keep the local ANN index in sync with the Concept nodes stored in Neo4j.
+
+    The index is loaded from disk (or built from Neo4j) at startup, then the
+    concepts of every ingested book are added, and the concepts deleted by
+    updates removed, as the Celery workers publish them. Neo4j is only used
+    to hydrate the search results.
+    """
+
+    def __init__(
+        self,
+        concept_index: ConceptANNIndex,
+        retrieval_repository: RetrievalRepository,
+        fetch_batch_size: int = 5000,
+        retrain_growth: float = 2.0,
+    ) -> None:
+        self.concept_index = concept_index
+        self.retrieval_repository = retrieval_repository
+        self.fetch_batch_size = fetch_batch_size
+        self.retrain_growth = retrain_growth
+        self._lock = asyncio.Lock()
+
+    async def _fetch_embeddings(
+        self, names: list[str]
+    ) -> tuple[list[str], np.ndarray]:
+        fetched_names = []
+        embeddings = []
+        for start in range(0, len(names), self.fetch_batch_size):
+            rows = await self.retrieval_repository.get_concept_embeddings(
+                names[start : start + self.fetch_batch_size]
+            )
+            for name, embedding in rows:
+                fetched_names.append(name)
+                embeddings.append(embedding)
+        return fetched_names, np.asarray(embeddings, dtype=np.float32)
+
+    async def _build(self, names: list[str], embeddings: np.ndarray) -> None:
+        # Clustering is CPU bound, searches keep using the current state meanwhile
+        state = await asyncio.to_thread(self.concept_index.build, names, embeddings)
+        self.concept_index.set_state(state)
+
+    async def _add(self, names: list[str], embeddings: np.ndarray) -> None:
+        if not names:
+            return
+        if self.concept_index.state is None:
+            await self._build(names, embeddings)
+            return
+
+        # The index files are locked while another process writes them
+        added = await asyncio.to_thread(self.concept_index.add, names, embeddings)
+        logging.info(f"Added {added} concepts to the ANN index")
+        # Retrain the clusters once the index outgrew the data they were fit
+        # on, the vectors of removed concepts are dropped meanwhile
+        stored_size = len(self.concept_index.state.names)
+        if stored_size > self.retrain_growth * self.concept_index.trained_size:
+            state = await asyncio.to_thread(self.concept_index.rebuild)
+            self.concept_index.set_state(state)
+
+    async def sync(self) -> None:
+        """
+        Load the index, add the concepts stored in Neo4j since it was saved and
+        remove the ones deleted since.
+        """
+        async with self._lock:
+            if self.concept_index.state is None:
+                await asyncio.to_thread(self.concept_index.load)
+            names = await self.retrieval_repository.get_concept_names()
+            stored_names = set(names)
+            deleted_names = [
+                name for name in self.concept_index.names() if name not in stored_names
+            ]
+            await asyncio.to_thread(self.concept_index.remove, deleted_names)
+            missing_names = [name for name in names if name not in self.concept_index]
+            await self._add(*await self._fetch_embeddings(missing_names))
+            logging.info(f"ANN index in sync: {len(self.concept_index)} concepts")
+
+    async def add_book(self, document_id: str) -> None:
+        """Index the concepts of a book just stored in Neo4j."""
+        async with self._lock:
+            rows = await self.retrieval_repository.get_book_concept_embeddings(
+                document_id
+            )
+            names = [name for name, _ in rows]
+            await self._add(names, np.asarray([e for _, e in rows], dtype=np.float32))
+
+    async def remove_concepts(self, names: list[str]) -> None:
+        """Stop returning concepts deleted from Neo4j."""
+        async with self._lock:
+            removed = await asyncio.to_thread(self.concept_index.remove, names)
+        logging.info(f"Removed {removed} concepts from the ANN index")
+
+    async def listen(self) -> None:
+        """Apply the library events as they are published, until cancelled."""
+        while True:
+            try:
+                async for channel, data in listen_library_events():
+                    if channel == BOOK_INGESTED_CHANNEL:
+                        await self.add_book(data)
+                    else:
+                        await self.remove_concepts(json.loads(data))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"ANN index updates interrupted: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+                # Catch up with the books ingested while disconnected
+                try:
+                    await self.sync()
+                except Exception as e:
+                    logging.error(f"Failed to sync the ANN index: {e}")
+
+
+@lru_cache()
+def get_concept_index_service() -> ConceptIndexService | None:
+    """The process-wide ANN index service, None when the local index is disabled."""
+    if not app_settings.ANN_INDEX_ENABLED:
+        return None
+    return ConceptIndexService(
+        concept_index=ConceptANNIndex(
+            app_settings.ANN_INDEX_PATH,
+            n_probe=app_settings.ANN_INDEX_N_PROBE,
+            quantization=app_settings.ANN_INDEX_QUANTIZATION,
+            rerank_factor=app_settings.ANN_INDEX_RERANK_FACTOR,
+        ),
+        retrieval_repository=RetrievalRepository(
+            neo4j_async_driver=get_neo4j_async(), mongodb_client=get_mongodb()
+        ),
+        retrain_growth=app_settings.ANN_INDEX_RETRAIN_GROWTH,
+    )
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+
+import numpy as np
+from ollama import AsyncClient
+from src.repository.llm_cache import EmbeddingCache
+from src.utils.llm_scheduler import LLMScheduler, Priority
+from src.utils.vectors import as_embeddings
+
+
+class EmbeddingService:
+    """
+    Deduplicating, cached and batched access to Ollama embeddings.
+
+    Texts are deduplicated, looked up in the embedding cache and only the
+    missing ones are sent to Ollama, `batch_size` texts per request.
+    Embeddings are float32 vectors, the ones of a batch are rows of a single
+    array.
+    """
+
+    def __init__(
+        self,
+        ollama_client: AsyncClient,
+        embedding_cache: EmbeddingCache,
+        llm_scheduler: LLMScheduler,
+        model: str,
+        batch_size: int,
+    ) -> None:
+        self.ollama_client = ollama_client
+        self.llm_scheduler = llm_scheduler
+        self.embedding_cache = embedding_cache
+        self.model = model
+        self.batch_size = batch_size
+        self.requests_count = 0
+
+    async def _embed_batch(
+        self, texts: list[str], priority: Priority
+    ) -> dict[str, np.ndarray]:
+        response = await self.llm_scheduler.submit(
+            self.model,
+            lambda: self.ollama_client.embed(model=self.model, input=texts),
+            priority,
+        )
+        self.requests_count += 1
+        batch_embeddings = dict(zip(texts, as_embeddings(response.embeddings)))
+        await self.embedding_cache.set_embeddings(self.model, batch_embeddings)
+        return batch_embeddings
+
+    async def embed_texts(
+        self, texts: list[str], priority: Priority = Priority.BULK
+    ) -> dict[str, np.ndarray]:
+        """Return the embedding of every text, indexed by text."""
+        unique_texts = list(dict.fromkeys(text for text in texts if text))
+        embeddings = await self.embedding_cache.get_embeddings(self.model, unique_texts)
+
+        missing_texts = [text for text in unique_texts if text not in embeddings]
+        # The scheduler bounds how many of the batches are in flight at once
+        batches_embeddings = await asyncio.gather(
+            *(
+                self._embed_batch(missing_texts[start : start + self.batch_size], priority)
+                for start in range(0, len(missing_texts), self.batch_size)
+            )
+        )
+        for batch_embeddings in batches_embeddings:
+            embeddings.update(batch_embeddings)
+
+        logging.info(
+            f"Embedded {len(unique_texts)} unique texts "
+            f"({len(missing_texts)} not cached) in "
+            f"{-(-len(missing_texts) // self.batch_size)} requests"
+        )
+        return embeddings
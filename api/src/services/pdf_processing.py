@@ -1,16 +1,28 @@
 import gc
 import json
-import re
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from llmsherpa.readers import LayoutPDFReader
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from neo4j import Driver, AsyncDriver
-import tiktoken
+import numpy as np
 import torch
+from src.config.settings import app_settings
+from src.repository.llm_cache import ConceptExtractionCache, EmbeddingCache
 from src.repository.pdf_processing import PDFProcessingRepository
+from src.services.concept_canonicalization import ConceptCanonicalizer
+from src.services.embeddings import EmbeddingService
+from src.utils.chunking import TokenChunker
+from src.utils.events import publish_book_ingested
+from src.utils.llm_scheduler import Priority, get_llm_scheduler
+from src.utils.metrics import IngestionMetrics, collect_metrics, get_current_metrics
+from src.utils.pdf_reader import get_pdf_parsing_executor, parse_pdf
+from src.utils.vectors import empty_embedding, group_centroids
 import asyncio
 import logging
 import time
 from ollama import AsyncClient
+from pydantic import ValidationError
 from src.schemas.upload import (
     Concepts,
     ProcessedBookMongoDB,
@@ -19,8 +31,8 @@ from src.schemas.upload import (
     ExtractedConcepts,
     SectionParagraphData,
 )
+from datetime import datetime, timezone
 from pathlib import Path
-from PyPDF2 import PdfReader
 from tqdm.asyncio import tqdm_asyncio
 import os
 from dotenv import load_dotenv
@@ -35,6 +47,14 @@ logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# Concept extraction prompt. Bump the version whenever the prompt or the
+# generation options change, so cached extractions are not reused.
+CONCEPT_EXTRACTION_PROMPT = "Extract main ideas described in the text below. The output should be a JSON `{'concepts': ['idea1', 'idea2']}`."
+CONCEPT_EXTRACTION_PROMPT_VERSION = "1"
+
+# Stages whose output is checkpointed, in pipeline order
+CHECKPOINT_STAGES = ["PARSED", "SECTIONS_STORED"]
+
 
 class PDFProcessorService:
     def __init__(
@@ -55,12 +75,31 @@ class PDFProcessorService:
             neo4j_sync_driver=neo4j_sync_driver,
             mongodb_client=mongo_db,
         )
+        self.llm_scheduler = get_llm_scheduler()
+        self.concept_cache = ConceptExtractionCache(
+            mongodb_client=mongo_db,
+            max_entries=app_settings.CONCEPT_CACHE_MAX_ENTRIES,
+        )
+        self.embedding_service = EmbeddingService(
+            ollama_client=ollama_client,
+            embedding_cache=EmbeddingCache(
+                mongodb_client=mongo_db,
+                max_entries=app_settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            ),
+            llm_scheduler=self.llm_scheduler,
+            model=EMBEDDING_MODEL,
+            batch_size=app_settings.EMBEDDING_BATCH_SIZE,
+        )
 
         # Initialize memory management
         self.device = self._setup_gpu_memory()
 
         # Set chunk size based on model
         self.max_chunk_size = 4000
+        self.chunker = TokenChunker(
+            max_tokens=self.max_chunk_size,
+            overlap_tokens=app_settings.CHUNK_OVERLAP_TOKENS,
+        )
 
     def _setup_gpu_memory(self):
         """Configure GPU memory for optimal performance"""
@@ -81,109 +120,6 @@ class PDFProcessorService:
             gc.collect()
             torch.cuda.empty_cache()
 
-    async def _get_embedding(self, section_data: SectionData) -> SectionData:
-        section_data = section_data.model_copy()
-        if not section_data.concepts:
-            return section_data
-        section_concepts = section_data.concepts
-        tasks = [
-            self._get_embedding_for_concept(concept.name)
-            for concept in section_concepts
-        ]
-        results = await asyncio.gather(*tasks)
-        section_data.concepts = [
-            Concepts(name=concept.name, embedding=embedding)
-            for concept, embedding in zip(section_concepts, results)
-        ]
-        return section_data
-
-    async def _get_embedding_for_concept(self, concept: str) -> list[float]:
-        results = await self.ollama_client.embed(model=EMBEDDING_MODEL, input=concept)
-        return results.embeddings[0]
-
-    def _split_text_by_size(self, text: str, max_tokens: int) -> list[str]:
-        encoding = tiktoken.get_encoding("o200k_base")
-        if not text.strip():
-            return []
-        # Split text into sentences (this regex splits on punctuation followed by whitespace)
-        sentences = re.split(r"(?<=[.!?])\s+", text)
-        chunks = []
-        current_chunk = ""
-        current_chunk_tokens = 0
-
-        for sentence in sentences:
-            sentence_tokens = len(encoding.encode(sentence))
-            # If the sentence alone exceeds max_tokens, split it further by words.
-            if sentence_tokens > max_tokens:
-                words = sentence.split()
-                sub_chunk = ""
-                sub_chunk_tokens = 0
-                for word in words:
-                    word_tokens = len(encoding.encode(word))
-                    # Add a space if sub_chunk is not empty.
-                    space_tokens = len(encoding.encode(" ")) if sub_chunk else 0
-                    if sub_chunk_tokens + space_tokens + word_tokens <= max_tokens:
-                        sub_chunk += (" " if sub_chunk else "") + word
-                        sub_chunk_tokens += space_tokens + word_tokens
-                    else:
-                        # Try to add the finished sub_chunk to the current chunk if it fits.
-                        if current_chunk:
-                            space_tokens_chunk = len(encoding.encode(" "))
-                            if (
-                                current_chunk_tokens
-                                + space_tokens_chunk
-                                + sub_chunk_tokens
-                                <= max_tokens
-                            ):
-                                current_chunk += " " + sub_chunk
-                                current_chunk_tokens += (
-                                    space_tokens_chunk + sub_chunk_tokens
-                                )
-                            else:
-                                chunks.append(current_chunk)
-                                current_chunk = sub_chunk
-                                current_chunk_tokens = sub_chunk_tokens
-                        else:
-                            chunks.append(sub_chunk)
-                        sub_chunk = word
-                        sub_chunk_tokens = word_tokens
-                # Append any remaining sub_chunk.
-                if sub_chunk:
-                    if current_chunk:
-                        space_tokens_chunk = len(encoding.encode(" "))
-                        if (
-                            current_chunk_tokens + space_tokens_chunk + sub_chunk_tokens
-                            <= max_tokens
-                        ):
-                            current_chunk += " " + sub_chunk
-                            current_chunk_tokens += (
-                                space_tokens_chunk + sub_chunk_tokens
-                            )
-                        else:
-                            chunks.append(current_chunk)
-                            current_chunk = sub_chunk
-                            current_chunk_tokens = sub_chunk_tokens
-                    else:
-                        current_chunk = sub_chunk
-                        current_chunk_tokens = sub_chunk_tokens
-            else:
-                # If sentence fits as a whole, add a space if needed.
-                space_tokens = len(encoding.encode(" ")) if current_chunk else 0
-                if current_chunk_tokens + space_tokens + sentence_tokens <= max_tokens:
-                    current_chunk += (" " if current_chunk else "") + sentence
-                    current_chunk_tokens += space_tokens + sentence_tokens
-                else:
-                    # Flush the current chunk and start a new one with the sentence.
-                    if current_chunk:
-                        chunks.append(current_chunk)
-                    current_chunk = sentence
-                    current_chunk_tokens = sentence_tokens
-
-        if current_chunk:
-            chunks.append(current_chunk)
-
-        return chunks
-
     async def _extract_concepts_from_section(
         self, section_data: SectionData
     ) -> SectionData:
@@ -193,98 +129,124 @@ class PDFProcessorService:
         if not text:
             return section_data
 
-        chunks = self._split_text_by_size(text, self.max_chunk_size)
-
-        PROMPT = "Extract main ideas described in the text below. The output should be a JSON `{'concepts': ['idea1', 'idea2']}`."
+        chunks = self.chunker.split(text)
+        cached_chunks = 0
 
         # Function to process a single chunk
         async def process_chunk(chunk: str) -> list[str]:
-            try:
-                response = await self.ollama_client.chat(
+            nonlocal cached_chunks
+            cached_concepts = await self.concept_cache.get_concepts(
+                GENERATION_MODEL, CONCEPT_EXTRACTION_PROMPT_VERSION, chunk
+            )
+            if cached_concepts is not None:
+                cached_chunks += 1
+                return cached_concepts
+
+            # Transient Ollama errors are retried by the scheduler, the ones
+            # left fail the stage instead of silently dropping the chunk
+            response = await self.llm_scheduler.submit(
+                GENERATION_MODEL,
+                lambda: self.ollama_client.chat(
                     model=GENERATION_MODEL,
-                    messages=[{"role": "user", "content": f"{PROMPT}\n\n{chunk}"}],
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": f"{CONCEPT_EXTRACTION_PROMPT}\n\n{chunk}",
+                        }
+                    ],
                     format=ExtractedConcepts.model_json_schema(),
                     options={"num_ctx": 8000},
-                )
+                ),
+                Priority.BULK,
+            )
+            try:
                 extracted_result = ExtractedConcepts.model_validate_json(
                     response.message.content
                 )
-                return extracted_result.concepts
-            except Exception as e:
+            except ValidationError as e:
                 logging.error(f"Error parsing concepts from chunk: {e}")
                 return []
 
-        # Run all chunk processing tasks concurrently
+            await self.concept_cache.set_concepts(
+                GENERATION_MODEL,
+                CONCEPT_EXTRACTION_PROMPT_VERSION,
+                chunk,
+                extracted_result.concepts,
+            )
+            return extracted_result.concepts
+
+        # Run all chunk processing tasks, the scheduler bounds the requests in flight
         results = await asyncio.gather(*(process_chunk(chunk) for chunk in chunks))
+        get_current_metrics().record_chunks(
+            GENERATION_MODEL, len(chunks), cached_chunks
+        )
         if not results:
             return section_data
 
-        flattened_results = [item for sublist in results for item in sublist]
+        # The LLM can answer blank names, they can't be embedded
+        flattened_results = [
+            item.strip() for sublist in results for item in sublist if item.strip()
+        ]
         section_data.concepts = [
             Concepts(name=concept) for concept in list(set(flattened_results))
         ]
         return section_data
 
     async def _get_embeddings(self, sections: list[SectionData]) -> list[SectionData]:
-        tasks = [self._get_embedding(section) for section in sections]
-        results = await asyncio.gather(*tasks)
-        return results
+        # Every concept is embedded once per book, whatever the number of
+        # sections mentioning it
+        concept_names = [
+            concept.name for section in sections for concept in section.concepts
+        ]
+        embeddings = await self.embedding_service.embed_texts(concept_names)
+        # Each section is embedded as the centroid of its concepts, all the
+        # window at once, before they are merged into canonical concepts
+        section_embeddings = (
+            group_centroids(
+                np.stack([embeddings[name] for name in concept_names]),
+                np.repeat(
+                    np.arange(len(sections)),
+                    [len(section.concepts) for section in sections],
+                ),
+                len(sections),
+            )
+            if concept_names
+            else None
+        )
+        return [
+            section.model_copy(
+                update={
+                    "concepts": [
+                        Concepts(name=concept.name, embedding=embeddings[concept.name])
+                        for concept in section.concepts
+                    ],
+                    "embedding": (
+                        section_embeddings[index]
+                        if section.concepts
+                        else empty_embedding()
+                    ),
+                }
+            )
+            for index, section in enumerate(sections)
+        ]
 
     async def _read_pdf(self, pdf_url: str, document_id: str) -> ProcessedBook:
-        doc = self.pdf_reader.read_pdf(pdf_url)
-
-        # Get metadata
-        metadata_reader = PdfReader(pdf_url)
-        metadata = metadata_reader.metadata
-
-        title = metadata.title
-        author = metadata.author
-        pages = len(metadata_reader.pages)
-        published_date = metadata.creation_date
+        # Parsing is blocking and CPU heavy, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        parsed_pdf = await loop.run_in_executor(
+            get_pdf_parsing_executor(),
+            parse_pdf,
+            pdf_url,
+            self.pdf_reader.parser_api_url,
+        )
 
         # TODO: Get cover image
         cover_image = ""
 
-        sections_with_all_paragraphs = []
-        for section in doc.sections():
-            section_paragraphs = section.paragraphs()
-            section_extracted_paragraphs_dataset = []
-            for section_paragraph in section_paragraphs:
-                section_paragraphs_data = {
-                    "level": section_paragraph.level,
-                    "text": section_paragraph.to_text(
-                        include_children=True, recurse=True
-                    ),
-                    "page": section_paragraph.page_idx + 1,
-                    "parent_text": section_paragraph.parent_text(),
-                    "parent_chain": list(
-                        set(
-                            [
-                                item.to_text()
-                                for item in section_paragraph.parent_chain()
-                                if item.to_text() not in ["", None]
-                            ]
-                        )
-                    ),
-                }
-                section_extracted_paragraphs_dataset.append(section_paragraphs_data)
-
-            section_data = SectionData(
-                section_name=section.title,
-                section_paragraphs_data=section_extracted_paragraphs_dataset,
-                section_text=section.to_text(include_children=True, recurse=True),
-            )
-
-            sections_with_all_paragraphs.append(section_data)
-
         processed_document = ProcessedBook(
             document_id=document_id,
-            title=title,
-            author=author,
-            pages=pages,
-            published_date=published_date,
             cover_image=cover_image,
-            sections=sections_with_all_paragraphs,
+            **parsed_pdf,
         )
 
         return processed_document
@@ -310,55 +272,236 @@ class PDFProcessorService:
             return sections_features
         return results
 
-    async def process_pdf(self, pdf_url: str, document_id: str) -> ProcessedBook:
-        try:
-            # Save processing status
-            await self.processing_repository.save_pdf_processing_metadata(
-                ProcessedBookMongoDB(document_id=document_id, status="PROCESSING")
+    async def _set_stage(self, document_id: str, stage: str) -> None:
+        await self.processing_repository.update_pdf_processing_metadata(
+            ProcessedBookMongoDB(
+                document_id=document_id, status="PROCESSING", stage=stage
             )
-            start_time = time.time()
+        )
 
-            # Read PDF
-            logging.info(f"Step 1/3: Reading and parsing PDF: {pdf_url}")
+    @asynccontextmanager
+    async def _run_stage(
+        self, document_id: str, stage: str
+    ) -> AsyncIterator[IngestionMetrics]:
+        """
+        Mark `stage` as running and measure it. The metrics are added to the
+        document even when the stage fails, retries included.
+        """
+        await self._set_stage(document_id, stage)
+        metrics = IngestionMetrics()
+        start_time = time.perf_counter()
+        try:
+            with collect_metrics(metrics):
+                yield metrics
+        finally:
+            metrics.record_stage(stage, time.perf_counter() - start_time)
+            try:
+                await self.processing_repository.increment_processing_metrics(
+                    document_id, metrics.as_increments()
+                )
+            except Exception as e:
+                logging.warning(
+                    f"Failed to store {stage} metrics of {document_id}: {e}"
+                )
+
+    async def parse_stage(self, pdf_url: str, document_id: str) -> None:
+        """Stage 1: read and parse the PDF into sections."""
+        async with self._run_stage(document_id, "PARSING"):
+            logging.info(f"Reading and parsing PDF: {pdf_url}")
             processed_document = await self._read_pdf(pdf_url, document_id)
-            sections_features = processed_document.sections
+            await self.processing_repository.save_stage_checkpoint(
+                processed_document, "PARSED"
+            )
+            await self.processing_repository.update_pdf_processing_metadata(
+                ProcessedBookMongoDB(
+                    document_id=document_id, pages=processed_document.pages
+                )
+            )
 
-            # Clear GPU memory before LLM processing
-            self._manage_gpu_memory(force=True)
+        # Clear GPU memory before LLM processing
+        self._manage_gpu_memory(force=True)
+
+    async def _store_sections_window(
+        self, document_id: str, indexes: list[int], sections: list[SectionData]
+    ) -> None:
+        stats = await self.processing_repository.store_sections_in_neo4j(
+            document_id, sections
+        )
+        get_current_metrics().record_neo4j_batches(stats)
+        await self.processing_repository.mark_sections_checkpoint(
+            document_id, "STORED", indexes
+        )
+        await self.processing_repository.increment_processing_progress(
+            document_id,
+            sections=len(indexes),
+            concepts=sum(len(section.concepts) for section in sections),
+        )
+
+    async def _diff_sections(self, document_id: str) -> None:
+        """
+        Compare the parsed sections of a book already stored in Neo4j (an update
+        to a new edition) with the stored ones of the same section id, by
+        fingerprint.
+
+        Unchanged sections are marked as stored, changed sections are detached
+        from their paragraphs and concepts to be stored again, and sections no
+        longer in the book are deleted, so an update only processes the diff.
+        """
+        stored_fingerprints = (
+            await self.processing_repository.get_stored_section_fingerprints(
+                document_id
+            )
+        )
+        if not stored_fingerprints:
+            return
 
-            # Extract concepts
-            logging.info("Step 2/3: Extracting concepts")
-            sections_with_concepts = await self._extract_concepts(
-                sections_features[200:202]
+        parsed_sections = (
+            await self.processing_repository.get_checkpoint_section_fingerprints(
+                document_id, "PARSED"
             )
-            processed_document.sections = sections_with_concepts
-            # Flatten concepts per book
-            flatten_concepts_per_book = [
-                concept.name
-                for sublist in sections_with_concepts
-                for concept in sublist.concepts
-            ]
-            processed_document.concepts = list(set(flatten_concepts_per_book))
-
-            logging.info("Concepts extracted")
-
-            # Get embeddings for sections' concepts
-            logging.info("Step 3/3: Getting embeddings for sections' concepts")
-            sections_with_concepts_with_embeddings = await self._get_embeddings(
-                processed_document.sections
+        )
+        stored_indexes = (
+            await self.processing_repository.get_checkpoint_section_indexes(
+                document_id, "STORED"
             )
-            processed_document.sections = sections_with_concepts_with_embeddings
+        )
+        # Sections are matched by their id, sections sharing a name are diffed
+        # independently
+        fingerprints = {
+            section_id: fingerprint for _, section_id, fingerprint in parsed_sections
+        }
+        unchanged_ids = {
+            section_id
+            for section_id, fingerprint in fingerprints.items()
+            if stored_fingerprints.get(section_id) == fingerprint
+        }
+        unchanged_indexes = [
+            index
+            for index, section_id, _ in parsed_sections
+            if section_id in unchanged_ids and index not in stored_indexes
+        ]
+        changed_ids = [
+            section_id
+            for section_id in fingerprints
+            if section_id in stored_fingerprints and section_id not in unchanged_ids
+        ]
+        removed_ids = [
+            section_id
+            for section_id in stored_fingerprints
+            if section_id not in fingerprints
+        ]
 
-            # Store into Neo4j
-            logging.info("Step 4/4: Storing extracted features into Neo4j")
-            await self.processing_repository.store_features_in_neo4j(processed_document)
+        get_current_metrics().record_neo4j_batches(
+            await self.processing_repository.delete_sections_in_neo4j(
+                document_id, removed_ids
+            )
+        )
+        get_current_metrics().record_neo4j_batches(
+            await self.processing_repository.clear_sections_in_neo4j(
+                document_id, changed_ids
+            )
+        )
+        if unchanged_indexes:
+            await self.processing_repository.mark_sections_checkpoint(
+                document_id, "STORED", unchanged_indexes
+            )
+            await self.processing_repository.increment_processing_progress(
+                document_id, sections=len(unchanged_indexes), concepts=0
+            )
+        logging.info(
+            f"Updating book {document_id}: {len(unchanged_ids)} sections "
+            f"unchanged, {len(changed_ids)} changed, "
+            f"{len(fingerprints) - len(unchanged_ids) - len(changed_ids)} added, "
+            f"{len(removed_ids)} removed"
+        )
+        if stored_indexes:
+            # Counted by the first attempt of the stage already
+            return
+        await self.processing_repository.update_pdf_processing_metadata(
+            ProcessedBookMongoDB(
+                document_id=document_id,
+                sections_unchanged=len(unchanged_ids),
+                sections_removed=len(removed_ids),
+            )
+        )
 
-            end_time = time.time()
+    async def sections_stage(self, document_id: str) -> None:
+        """
+        Stage 2: stream the parsed sections through concept extraction, embedding
+        and Neo4j storage, one window of sections at a time.
+
+        Only a window of sections is held in memory, sections are searchable as
+        soon as their window is stored, and sections already stored by a
+        previous attempt, or unchanged since the previous edition, are skipped.
+        """
+        async with self._run_stage(document_id, "PROCESSING_SECTIONS"):
+            processed_document = (
+                await self.processing_repository.load_book_checkpoint(
+                    document_id, "PARSED"
+                )
+            )
+            if processed_document is None:
+                raise ValueError(
+                    f"No PARSED checkpoint found for document {document_id}"
+                )
+            await self.processing_repository.store_book_in_neo4j(processed_document)
+            await self._diff_sections(document_id)
 
-            logging.info(
-                f"Time spent on features extraction: {end_time - start_time:.2f} seconds"
+            stored_indexes = (
+                await self.processing_repository.get_checkpoint_section_indexes(
+                    document_id, "STORED"
+                )
+            )
+            sections_windows = self.processing_repository.iter_checkpoint_sections(
+                document_id,
+                "PARSED",
+                window_size=app_settings.INGESTION_WINDOW_SIZE,
+                exclude_indexes=stored_indexes,
+            )
+
+            # Concepts are merged into canonical ones across the windows of the book
+            concept_canonicalizer = ConceptCanonicalizer(
+                self.processing_repository,
+                threshold=app_settings.CONCEPT_MERGE_THRESHOLD,
             )
 
+            # The Neo4j write of a window overlaps the LLM work of the next one
+            pending_write: asyncio.Task | None = None
+            try:
+                async for window in sections_windows:
+                    indexes = [index for index, _ in window]
+                    sections = await self._extract_concepts(
+                        [section for _, section in window]
+                    )
+                    sections = await self._get_embeddings(sections)
+                    sections = await concept_canonicalizer.canonicalize(sections)
+                    if pending_write is not None:
+                        await pending_write
+                    pending_write = asyncio.create_task(
+                        self._store_sections_window(document_id, indexes, sections)
+                    )
+            finally:
+                if pending_write is not None:
+                    await pending_write
+
+            await self.processing_repository.update_pdf_processing_metadata(
+                ProcessedBookMongoDB(
+                    document_id=document_id, last_completed_stage="SECTIONS_STORED"
+                )
+            )
+            logging.info(f"Concept cache usage: {self.concept_cache.stats()}")
+
+    async def finalize_stage(
+        self, document_id: str, pdf_url: str
+    ) -> ProcessedBookMongoDB:
+        """Stage 3: finalize the book in Neo4j and mark it completed."""
+        async with self._run_stage(document_id, "FINALIZING"):
+            removed_concepts = await self.processing_repository.finalize_book_in_neo4j(
+                document_id
+            )
+            # Let the API processes index the concepts of the book
+            await publish_book_ingested(document_id, removed_concepts)
+
             # Clear GPU memory
             self._manage_gpu_memory(force=True)
 
@@ -368,21 +511,52 @@ class PDFProcessorService:
                     ProcessedBookMongoDB(
                         document_id=document_id,
                         status="COMPLETED",
+                        stage="",
+                        completed_at=datetime.now(timezone.utc),
                     )
                 )
             )
 
-            # Remove temp PDF file after processing
+            # Checkpoints are only needed to resume unfinished books
+            await self.processing_repository.delete_stage_checkpoints(document_id)
+
+            # Remove temp PDF file after processing, imported files are left in place
             file_path = Path(pdf_url)
-            if file_path.exists():
+            if not updated_document.get("keep_file") and file_path.exists():
                 file_path.unlink()
 
             return ProcessedBookMongoDB(**updated_document)
-        except Exception as e:
-            logging.error(f"Processing failed: {e}")
-            updated_document = (
-                await self.processing_repository.update_pdf_processing_metadata(
-                    ProcessedBookMongoDB(document_id=document_id, status="FAILED")
+
+    async def mark_failed(self, document_id: str) -> ProcessedBookMongoDB:
+        updated_document = (
+            await self.processing_repository.update_pdf_processing_metadata(
+                ProcessedBookMongoDB(document_id=document_id, status="FAILED")
+            )
+        )
+        return ProcessedBookMongoDB(**updated_document)
+
+    async def process_pdf(self, pdf_url: str, document_id: str) -> ProcessedBookMongoDB:
+        """Run all processing stages in the current process."""
+        try:
+            # Save processing status
+            await self.processing_repository.save_pdf_processing_metadata(
+                ProcessedBookMongoDB(
+                    document_id=document_id,
+                    status="PROCESSING",
+                    file_location=pdf_url,
                 )
             )
-            return ProcessedBookMongoDB(**updated_document)
+            start_time = time.time()
+
+            await self.parse_stage(pdf_url, document_id)
+            await self.sections_stage(document_id)
+            result = await self.finalize_stage(document_id, pdf_url)
+
+            end_time = time.time()
+            logging.info(
+                f"Time spent on features extraction: {end_time - start_time:.2f} seconds"
+            )
+            return result
+        except Exception as e:
+            logging.error(f"Processing failed: {e}")
+            return await self.mark_failed(document_id)
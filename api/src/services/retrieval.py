@@ -1,10 +1,23 @@
+import asyncio
 import logging
+import time
+from typing import Any
 from ollama import AsyncClient
 import os
+from src.config.settings import app_settings
 from src.schemas.retrieval import SearchResults
 from src.repository.retrieval import RetrievalRepository
+from src.repository.search_cache import SearchCache
 from neo4j import AsyncDriver
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from redis.asyncio import Redis
+from src.utils.ann_index import ConceptANNIndex
+from src.utils.llm_scheduler import Priority, get_llm_scheduler
+from src.utils.ranking import reciprocal_rank_fusion
+
+
+def elapsed_ms(start_time: float) -> float:
+    return round((time.perf_counter() - start_time) * 1000, 2)
 
 
 class RetrievalService:
@@ -15,24 +28,203 @@ class RetrievalService:
         ollama_client: AsyncClient,
         neo4j_async_driver: AsyncDriver,
         mongo_db: AsyncIOMotorDatabase,
+        redis_client: Redis,
+        concept_index: ConceptANNIndex | None = None,
     ):
         self.ollama_client = ollama_client
+        self.concept_index = concept_index
+        self.llm_scheduler = get_llm_scheduler()
         self.retrieval_repository = RetrievalRepository(
             neo4j_async_driver=neo4j_async_driver, mongodb_client=mongo_db
         )
+        self.search_cache = SearchCache(
+            redis_client,
+            embedding_ttl=app_settings.SEARCH_EMBEDDING_CACHE_TTL,
+            results_ttl=app_settings.SEARCH_RESULTS_CACHE_TTL,
+        )
+
+    def _use_concept_index(self) -> bool:
+        # The local index is used once enabled and built
+        return self.concept_index is not None and len(self.concept_index) > 0
 
     async def _get_embedding(self, user_query: str) -> list[float]:
-        embedding = await self.ollama_client.embed(
-            model=self.EMBEDDING_MODEL, input=user_query
+        normalized_query = self.search_cache.normalize_query(user_query)
+        cached_embedding = await self.search_cache.get_embedding(
+            self.EMBEDDING_MODEL, normalized_query
         )
-        logging.info(f"Search Embedding: {embedding}")
-        return embedding.embeddings[0] if embedding is not None else []
+        if cached_embedding is not None:
+            return cached_embedding
 
-    async def get_search_results(self, user_query: str) -> SearchResults:
-        # Convert query into embedding using ollama client
+        # Search requests are served before the bulk ingestion ones
+        embedding = await self.llm_scheduler.submit(
+            self.EMBEDDING_MODEL,
+            lambda: self.ollama_client.embed(
+                model=self.EMBEDDING_MODEL, input=normalized_query
+            ),
+            Priority.INTERACTIVE,
+        )
+        logging.debug(f"Search Embedding: {embedding}")
+        await self.search_cache.set_embedding(
+            self.EMBEDDING_MODEL, normalized_query, embedding.embeddings[0]
+        )
+        return embedding.embeddings[0]
+
+    async def _get_timed_embedding(
+        self, user_query: str, timings: dict[str, float]
+    ) -> list[float]:
+        start_time = time.perf_counter()
         query_embedding = await self._get_embedding(user_query)
+        timings["embedding"] = elapsed_ms(start_time)
+        return query_embedding
+
+    async def _get_vector_paragraphs(
+        self, user_query: str, limit: int, timings: dict[str, float]
+    ) -> list[dict[str, Any]]:
+        query_embedding = await self._get_timed_embedding(user_query, timings)
+
+        start_time = time.perf_counter()
+        if self._use_concept_index():
+            concept_scores = self.concept_index.search(query_embedding, limit)
+            paragraphs = await self.retrieval_repository.get_paragraphs_for_concepts(
+                concept_scores, limit
+            )
+        else:
+            paragraphs = await self.retrieval_repository.get_vector_paragraphs(
+                query_embedding, limit
+            )
+        timings["vector"] = elapsed_ms(start_time)
+        return paragraphs
+
+    async def _get_lexical_paragraphs(
+        self, user_query: str, limit: int, timings: dict[str, float]
+    ) -> list[dict[str, Any]]:
+        start_time = time.perf_counter()
+        paragraphs = await self.retrieval_repository.get_fulltext_paragraphs(
+            user_query, limit
+        )
+        timings["lexical"] = elapsed_ms(start_time)
+        return paragraphs
+
+    async def get_hybrid_search_results(
+        self, user_query: str, page: int = 1, per_page: int = 10
+    ) -> SearchResults:
+        """
+        Search paragraphs by query terms and by concept similarity at once, and
+        fuse both rankings with reciprocal rank fusion.
+        """
+        start_time = time.perf_counter()
+        timings = {}
+        limit = self.retrieval_repository.get_candidates_count(page, per_page)
+        # The fulltext search doesn't wait for the query embedding
+        lexical_paragraphs, vector_paragraphs = await asyncio.gather(
+            self._get_lexical_paragraphs(user_query, limit, timings),
+            self._get_vector_paragraphs(user_query, limit, timings),
+        )
+
+        fusion_start_time = time.perf_counter()
+        paragraphs = {}
+        rankings = []
+        for ranked_paragraphs in (lexical_paragraphs, vector_paragraphs):
+            ranking = []
+            for record in ranked_paragraphs:
+                # Paragraphs are shared by identical texts, rank them per section
+                key = (record["id"], record["section_id"])
+                paragraphs.setdefault(key, record)
+                ranking.append(key)
+            rankings.append(ranking)
+        fused = reciprocal_rank_fusion(rankings)
+        results = [
+            self.retrieval_repository.to_search_result(paragraphs[key], relevance=score)
+            for key, score in fused[(page - 1) * per_page : page * per_page]
+        ]
+        timings["fusion"] = elapsed_ms(fusion_start_time)
+        timings["total"] = elapsed_ms(start_time)
+        return SearchResults(results=results, timings=timings)
+
+    async def get_search_results(
+        self, user_query: str, page: int = 1, per_page: int = 10
+    ) -> SearchResults:
+        start_time = time.perf_counter()
+        timings = {}
+        # Convert query into embedding using ollama client
+        query_embedding = await self._get_timed_embedding(user_query, timings)
+
+        search_start_time = time.perf_counter()
+        # Match the concepts locally when the ANN index is enabled and built,
+        # Neo4j only hydrates the sections
+        if self._use_concept_index():
+            concept_scores = self.concept_index.search(
+                query_embedding,
+                self.retrieval_repository.get_candidates_count(page, per_page),
+            )
+            search_results = (
+                await self.retrieval_repository.get_search_results_for_concepts(
+                    concept_scores, page=page, per_page=per_page
+                )
+            )
+        else:
+            search_results = await self.retrieval_repository.get_search_results(
+                query_embedding, page=page, per_page=per_page
+            )
+        timings["vector"] = elapsed_ms(search_start_time)
+        timings["total"] = elapsed_ms(start_time)
+        search_results.timings = timings
+        return search_results
+
+    async def get_two_stage_search_results(
+        self, user_query: str, page: int = 1, per_page: int = 10
+    ) -> SearchResults:
+        start_time = time.perf_counter()
+        timings = {}
+        query_embedding = await self._get_timed_embedding(user_query, timings)
+
+        search_start_time = time.perf_counter()
+        search_results = await self.retrieval_repository.get_two_stage_search_results(
+            query_embedding, page=page, per_page=per_page
+        )
+        timings["vector"] = elapsed_ms(search_start_time)
+        timings["total"] = elapsed_ms(start_time)
+        search_results.timings = timings
+        return search_results
+
+    async def search(
+        self, user_query: str, page: int = 1, per_page: int = 10, mode: str = "vector"
+    ) -> SearchResults:
+        """Search the library, serving repeated searches from the cache."""
+        start_time = time.perf_counter()
+        normalized_query = self.search_cache.normalize_query(user_query)
+        parameters = {"mode": mode, "page": page, "per_page": per_page}
+        if self.concept_index is not None and mode != "two_stage":
+            # The library version is bumped before the API processes index the
+            # book: results of the previous index must not be cached under it
+            parameters["ann_index"] = self.concept_index.generation
+        library_version = await self.search_cache.get_library_version()
+        if library_version is not None:
+            cached_results = await self.search_cache.get_results(
+                normalized_query, library_version, **parameters
+            )
+            if cached_results is not None:
+                cached_results.timings = {
+                    "cache": elapsed_ms(start_time),
+                    "total": elapsed_ms(start_time),
+                }
+                return cached_results
 
-        # Assuming you want to perform a search and get the knowledge graph
-        results = await self.retrieval_repository.get_search_results(query_embedding)
+        if mode == "hybrid":
+            search_results = await self.get_hybrid_search_results(
+                normalized_query, page=page, per_page=per_page
+            )
+        elif mode == "two_stage":
+            search_results = await self.get_two_stage_search_results(
+                normalized_query, page=page, per_page=per_page
+            )
+        else:
+            search_results = await self.get_search_results(
+                normalized_query, page=page, per_page=per_page
+            )
 
-        return SearchResults(sections=results)
+        if library_version is not None:
+            await self.search_cache.set_results(
+                normalized_query, library_version, search_results, **parameters
+            )
+        return search_results
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Coroutine
+
+from celery import Task, chain
+from celery.exceptions import Ignore
+from celery.result import AsyncResult
+from celery.signals import worker_process_shutdown
+from src.config.settings import app_settings
+from src.database.connections import close_connections
+from src.database.mongodb import get_mongodb
+from src.database.neo4j import get_neo4j_async, get_neo4j_sync
+from src.services.bulk_import import BulkImportService
+from src.services.pdf_processing import PDFProcessorService
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.utils.distributed_semaphore import RedisSemaphore, get_ingestion_semaphore
+from src.utils.ollama_client import get_ollama_client
+from src.utils.pdf_reader import get_pdf_reader
+from src.worker import celery_app
+
+_event_loop: asyncio.AbstractEventLoop | None = None
+
+
+def run_async(coroutine: Coroutine) -> Any:
+    """Run a coroutine on the event loop owned by the current worker process.
+
+    The loop is reused across tasks so that the async database and Ollama
+    clients created for the worker stay bound to a single loop.
+    """
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_event_loop)
+    return _event_loop.run_until_complete(coroutine)
+
+
+@lru_cache()
+def get_pdf_processor_service() -> PDFProcessorService:
+    return PDFProcessorService(
+        ollama_client=get_ollama_client(),
+        mongo_db=get_mongodb(),
+        neo4j_sync_driver=get_neo4j_sync(),
+        neo4j_async_driver=get_neo4j_async(),
+        pdf_reader=get_pdf_reader(),
+    )
+
+
+@worker_process_shutdown.connect
+def close_worker_connections(**kwargs: Any) -> None:
+    """Close the clients of the worker process, on the loop they are bound to."""
+    if _event_loop is not None and not _event_loop.is_closed():
+        run_async(close_connections())
+        _event_loop.close()
+
+
+async def dispatch_waiting_documents(
+    semaphore: RedisSemaphore,
+    processing_repository: PDFProcessingRepository,
+    enqueue: Callable[..., Any],
+) -> int:
+    """
+    Queue again the documents waiting for an ingestion slot, the longest
+    waiting first, as many as there are free slots. Return how many were.
+    """
+    if semaphore.limit <= 0:
+        return 0
+    free_slots = semaphore.limit - await semaphore.holders_count()
+    dispatched = 0
+    while dispatched < free_slots:
+        document = await processing_repository.pop_waiting_document()
+        if document is None:
+            break
+        enqueue(
+            document["file_location"],
+            str(document["_id"]),
+            resume_from=document.get("last_completed_stage", ""),
+        )
+        dispatched += 1
+    if dispatched:
+        logging.info(f"Dispatched {dispatched} documents waiting for a slot")
+    return dispatched
+
+
+async def _dispatch_waiting_documents() -> int:
+    return await dispatch_waiting_documents(
+        get_ingestion_semaphore(),
+        get_pdf_processor_service().processing_repository,
+        enqueue_pdf_processing,
+    )
+
+
+async def _in_ingestion_slot(document_id: str, coroutine: Coroutine) -> Any:
+    """Run a stage of the document, renewing the lease of its slot meanwhile."""
+    async with get_ingestion_semaphore().keep_lease(document_id):
+        return await coroutine
+
+
+async def release_ingestion_slot(document_id: str) -> None:
+    """Free the slot of the document and hand it to a waiting document."""
+    await get_ingestion_semaphore().release(document_id)
+    await _dispatch_waiting_documents()
+
+
+class PDFProcessingTask(Task):
+    """Base task for the PDF processing stages.
+
+    Every stage is retried with exponential backoff. Tasks are acknowledged
+    only after they finish, so a stage interrupted by a worker restart is
+    redelivered instead of being lost.
+    """
+
+    autoretry_for = (Exception,)
+    max_retries = 3
+    retry_backoff = True
+    retry_backoff_max = 600
+    retry_jitter = True
+    acks_late = True
+    reject_on_worker_lost = True
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo) -> None:
+        document_id = kwargs.get("document_id")
+        logging.error(f"Task {self.name} failed for document {document_id}: {exc}")
+        if document_id:
+            run_async(get_pdf_processor_service().mark_failed(document_id))
+            run_async(release_ingestion_slot(document_id))
+
+    def wait_for_ingestion_slot(self, document_id: str) -> None:
+        """
+        Take (or renew) the ingestion slot of the document, or drop the task
+        when all the slots are taken by other documents.
+
+        Waiting documents are kept in MongoDB rather than in the broker, they
+        are queued again from their last completed stage when a slot is
+        released, so thousands of imported books don't hold worker memory.
+        """
+        if not run_async(get_ingestion_semaphore().acquire(document_id)):
+            logging.info(f"No ingestion slot free for document {document_id}, waiting")
+            run_async(
+                get_pdf_processor_service().processing_repository.mark_waiting_for_slot(
+                    document_id
+                )
+            )
+            # A slot released since the acquire would have found no waiting document
+            run_async(_dispatch_waiting_documents())
+            raise Ignore()
+
+
+async def _parse(pdf_url: str, document_id: str) -> None:
+    service = get_pdf_processor_service()
+    # A redelivered task whose output was already checkpointed is skipped
+    if await service.processing_repository.has_stage_checkpoint(document_id, "PARSED"):
+        logging.info(f"Stage PARSED already completed for document {document_id}")
+        return
+    await service.parse_stage(pdf_url, document_id)
+
+
+async def _finalize(pdf_url: str, document_id: str) -> dict[str, Any]:
+    service = get_pdf_processor_service()
+    result = await service.finalize_stage(document_id, pdf_url)
+    return result.model_dump(mode="json")
+
+
+@celery_app.task(bind=True, base=PDFProcessingTask, name="pdf_processing.parse")
+def parse_pdf_task(self: PDFProcessingTask, pdf_url: str, document_id: str) -> None:
+    self.wait_for_ingestion_slot(document_id)
+    run_async(_in_ingestion_slot(document_id, _parse(pdf_url, document_id)))
+
+
+@celery_app.task(bind=True, base=PDFProcessingTask, name="pdf_processing.sections")
+def process_sections_task(self: PDFProcessingTask, document_id: str) -> None:
+    self.wait_for_ingestion_slot(document_id)
+    # Sections stored by a previous attempt are skipped by the stage itself
+    run_async(
+        _in_ingestion_slot(
+            document_id, get_pdf_processor_service().sections_stage(document_id)
+        )
+    )
+
+
+@celery_app.task(bind=True, base=PDFProcessingTask, name="pdf_processing.finalize")
+def finalize_pdf_task(
+    self: PDFProcessingTask, pdf_url: str, document_id: str
+) -> dict[str, Any]:
+    self.wait_for_ingestion_slot(document_id)
+    result = run_async(
+        _in_ingestion_slot(document_id, _finalize(pdf_url, document_id))
+    )
+    run_async(release_ingestion_slot(document_id))
+    logging.info(f"Processing completed for document {document_id}")
+    return result
+
+
+@celery_app.task(name="pdf_processing.dispatch_waiting")
+def dispatch_waiting_documents_task() -> int:
+    """Hand the slots freed by expired leases to the waiting documents."""
+    return run_async(_dispatch_waiting_documents())
+
+
+def enqueue_pdf_processing(
+    pdf_url: str, document_id: str, resume_from: str = ""
+) -> AsyncResult:
+    """
+    Queue the parse -> process sections -> finalize pipeline for a PDF.
+
+    Stages up to and including `resume_from` (a checkpointed stage) are skipped.
+    """
+    stages = [
+        ("PARSED", parse_pdf_task.si(pdf_url=pdf_url, document_id=document_id)),
+        ("SECTIONS_STORED", process_sections_task.si(document_id=document_id)),
+        ("COMPLETED", finalize_pdf_task.si(pdf_url=pdf_url, document_id=document_id)),
+    ]
+    if resume_from:
+        stage_names = [stage for stage, _ in stages]
+        stages = stages[stage_names.index(resume_from) + 1 :]
+    return chain(*(signature for _, signature in stages)).apply_async()
+
+
+def get_bulk_import_service() -> BulkImportService:
+    service = get_pdf_processor_service()
+    return BulkImportService(
+        processing_repository=service.processing_repository,
+        enqueue=enqueue_pdf_processing,
+        hashing_concurrency=app_settings.IMPORT_HASHING_CONCURRENCY,
+    )
+
+
+@celery_app.task(name="pdf_processing.import", acks_late=True)
+def import_library_task(import_id: str, paths: list[str]) -> dict[str, Any]:
+    """Hash and queue the files of a bulk import, skipping duplicates."""
+    import_job = run_async(get_bulk_import_service().enqueue_files(import_id, paths))
+    return import_job.model_dump(mode="json")
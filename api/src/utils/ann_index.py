@@ -0,0 +1,520 @@
+import fcntl
+import json
+import logging
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+from src.utils.vectors import normalize
+
+VECTORS_FILE = "vectors.f32"
+ASSIGNMENTS_FILE = "assignments.i32"
+NAMES_FILE = "names.jsonl"
+CENTROIDS_FILE = "centroids.npy"
+META_FILE = "meta.json"
+SCALES_FILE = "scales.f32"
+# Ids of the vectors of removed concepts
+REMOVED_FILE = "removed.i32"
+# Held by the process writing or loading the index files
+LOCK_FILE = "index.lock"
+# Compact codes of the vectors, by quantization
+CODES_FILES = {"float16": "codes.f16", "int8": "codes.i8"}
+CODES_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+# Vectors sampled per cluster to train the centroids
+TRAINING_SAMPLES_PER_CLUSTER = 64
+KMEANS_ITERATIONS = 10
+# Vectors compared with the centroids at once when assigning clusters
+ASSIGNMENT_BATCH_SIZE = 65536
+
+
+def train_centroids(
+    vectors: np.ndarray, n_clusters: int, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means on a sample of normalized `vectors`."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_clusters * TRAINING_SAMPLES_PER_CLUSTER)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, n_clusters, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        counts = np.bincount(assignments, minlength=n_clusters)
+        # Reseed empty clusters with random vectors of the sample
+        empty = counts == 0
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = normalize(sums)
+    return centroids
+
+
+def assign_clusters(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Return the index of the closest centroid of each normalized vector."""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGNMENT_BATCH_SIZE):
+        batch = np.asarray(vectors[start : start + ASSIGNMENT_BATCH_SIZE])
+        assignments[start : start + len(batch)] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compact codes of normalized vectors and the scale of each vector: float16
+    halves their size, int8 (scaled to the largest component) quarters it.
+    """
+    if quantization == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    scales = np.maximum(
+        np.abs(vectors).max(axis=1, initial=0.0) / 127, np.finfo(np.float32).tiny
+    ).astype(np.float32)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def approximate_scores(
+    codes: np.ndarray, scales: np.ndarray, query: np.ndarray
+) -> np.ndarray:
+    """Cosine similarities of a normalized query with quantized vectors."""
+    return (np.asarray(codes, dtype=np.float32) @ query) * scales
+
+
+@dataclass
+class IVFState:
+    """Snapshot of the index contents, replaced as a whole on rebuilds."""
+
+    names: list[str]
+    vectors: np.ndarray
+    centroids: np.ndarray
+    assignments: np.ndarray
+    inverted_lists: list[np.ndarray]
+    trained_size: int
+    # Quantized vectors and their scales, None without quantization
+    codes: np.ndarray | None = None
+    scales: np.ndarray | None = None
+    # Vectors of removed concepts, skipped by searches until the next rebuild.
+    # Derived from the names when None: only the last of duplicates is kept
+    removed: np.ndarray | None = None
+    # Incremented by every change of the index files, by any process
+    generation: int = 0
+
+
+def superseded(names: list[str]) -> np.ndarray:
+    """Mask of the names stored again later, only their last vector is current."""
+    last_ids = {name: index for index, name in enumerate(names)}
+    mask = np.ones(len(names), dtype=bool)
+    mask[list(last_ids.values())] = False
+    return mask
+
+
+def build_inverted_lists(assignments: np.ndarray, n_clusters: int) -> list[np.ndarray]:
+    order = np.argsort(assignments, kind="stable").astype(np.int32)
+    bounds = np.searchsorted(assignments[order], np.arange(n_clusters + 1))
+    return [order[bounds[i] : bounds[i + 1]] for i in range(n_clusters)]
+
+
+class ConceptANNIndex:
+    """
+    Inverted-file (IVF) approximate nearest neighbour index over concept embeddings.
+
+    Normalized vectors are grouped around k-means centroids: a search compares
+    the query with the centroids, then only with the vectors of the `n_probe`
+    closest clusters. Vectors are stored in a flat float32 file, memory-mapped
+    on load and appended to on additions, so restarts don't rebuild the index.
+    Removed concepts are only masked until the index is rebuilt.
+
+    The files can be shared by several processes: they are written under an
+    exclusive file lock, and a process reloads them before changing them when
+    another process changed them since (the generation stored with them moved).
+
+    With `quantization` ("float16" or "int8"), searches scan compact codes of
+    the vectors, 2 or 4 times smaller, and only read the float32 vectors of
+    the best `k * rerank_factor` candidates to re-rank them.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        n_probe: int = 8,
+        quantization: str = "none",
+        rerank_factor: int = 4,
+    ) -> None:
+        if quantization != "none" and quantization not in CODES_FILES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.directory = Path(directory)
+        self.n_probe = n_probe
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.state: IVFState | None = None
+        self._name_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._name_ids)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._name_ids
+
+    @property
+    def generation(self) -> int:
+        """
+        Identifies the contents of the index: stored with the files, it grows
+        with every build, addition and removal, whichever process made it.
+        """
+        return self.state.generation if self.state else 0
+
+    @property
+    def trained_size(self) -> int:
+        return self.state.trained_size if self.state else 0
+
+    def _path(self, file_name: str) -> Path:
+        return self.directory / file_name
+
+    @contextmanager
+    def _locked(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._path(LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_meta(self) -> dict | None:
+        if not self._path(META_FILE).exists():
+            return None
+        return json.loads(self._path(META_FILE).read_text())
+
+    def _write_meta(self, meta: dict) -> None:
+        # Written last, once the files it describes are
+        self._replace_file(
+            META_FILE, lambda file: file.write(json.dumps(meta).encode("utf-8"))
+        )
+
+    def _refresh(self) -> None:
+        """Reload the files changed by another process. Call with the lock held."""
+        meta = self._read_meta()
+        if meta is not None and meta.get("generation", 0) != self.generation:
+            self._load()
+
+    def _replace_file(self, file_name: str, write) -> None:
+        # Write aside and swap, memory maps of the previous file stay valid
+        temp_path = self._path(f"{file_name}.tmp")
+        with open(temp_path, "wb") as file:
+            write(file)
+        os.replace(temp_path, self._path(file_name))
+
+    def _open_vectors(self, count: int, dimension: int) -> np.ndarray:
+        if count == 0:
+            return np.empty((0, dimension), dtype=np.float32)
+        return np.memmap(
+            self._path(VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dimension)
+        )
+
+    def _open_codes(self, count: int, dimension: int) -> np.ndarray | None:
+        if self.quantization == "none":
+            return None
+        dtype = CODES_DTYPES[self.quantization]
+        if count == 0:
+            return np.empty((0, dimension), dtype=dtype)
+        return np.memmap(
+            self._path(CODES_FILES[self.quantization]),
+            dtype=dtype,
+            mode="r",
+            shape=(count, dimension),
+        )
+
+    def _load_scales(self, count: int) -> np.ndarray | None:
+        if self.quantization == "none":
+            return None
+        return np.fromfile(self._path(SCALES_FILE), dtype=np.float32, count=count)
+
+    def _write_codes(self, vectors: np.ndarray) -> None:
+        """Quantize `vectors` into the codes and scales files, in batches."""
+        if self.quantization == "none":
+            return
+        with open(self._path(f"{CODES_FILES[self.quantization]}.tmp"), "wb") as codes:
+            with open(self._path(f"{SCALES_FILE}.tmp"), "wb") as scales:
+                for start in range(0, len(vectors), ASSIGNMENT_BATCH_SIZE):
+                    batch_codes, batch_scales = quantize(
+                        np.asarray(vectors[start : start + ASSIGNMENT_BATCH_SIZE]),
+                        self.quantization,
+                    )
+                    codes.write(batch_codes.tobytes())
+                    scales.write(batch_scales.tobytes())
+        os.replace(
+            self._path(f"{CODES_FILES[self.quantization]}.tmp"),
+            self._path(CODES_FILES[self.quantization]),
+        )
+        os.replace(self._path(f"{SCALES_FILE}.tmp"), self._path(SCALES_FILE))
+
+    def build(self, names: list[str], embeddings: np.ndarray) -> IVFState:
+        """
+        Cluster `embeddings` and write the index files, replacing the current ones.
+
+        Returns the new state without installing it, so that it can run in a
+        worker thread while searches keep using the current state: install it
+        with `set_state`.
+        """
+        with self._locked():
+            return self._build(names, embeddings)
+
+    def rebuild(self) -> IVFState:
+        """
+        Build the index again from the concepts indexed by all the processes,
+        dropping the vectors of removed concepts. Install it with `set_state`.
+        """
+        with self._locked():
+            self._refresh()
+            return self._build(*self.live_items())
+
+    def _build(self, names: list[str], embeddings: np.ndarray) -> IVFState:
+        meta = self._read_meta() or {}
+        generation = meta.get("generation", 0) + 1
+        vectors = normalize(embeddings)
+        n_clusters = max(1, min(len(vectors), int(np.sqrt(len(vectors)))))
+        centroids = train_centroids(vectors, n_clusters)
+        assignments = assign_clusters(vectors, centroids)
+
+        self._replace_file(VECTORS_FILE, lambda file: file.write(vectors.tobytes()))
+        self._write_codes(vectors)
+        self._replace_file(ASSIGNMENTS_FILE, lambda file: file.write(assignments.tobytes()))
+        self._replace_file(CENTROIDS_FILE, lambda file: np.save(file, centroids))
+        self._replace_file(
+            NAMES_FILE,
+            lambda file: file.writelines(
+                (json.dumps(name) + "\n").encode("utf-8") for name in names
+            ),
+        )
+        self._replace_file(REMOVED_FILE, lambda file: None)
+        self._write_meta(
+            {
+                "dimension": vectors.shape[1],
+                "trained_size": len(vectors),
+                "quantization": self.quantization,
+                "generation": generation,
+            }
+        )
+        logging.info(f"Built ANN index: {len(vectors)} vectors in {n_clusters} clusters")
+
+        return IVFState(
+            names=list(names),
+            vectors=self._open_vectors(len(vectors), vectors.shape[1]),
+            centroids=centroids,
+            assignments=assignments,
+            inverted_lists=build_inverted_lists(assignments, n_clusters),
+            trained_size=len(vectors),
+            codes=self._open_codes(len(vectors), vectors.shape[1]),
+            scales=self._load_scales(len(vectors)),
+            generation=generation,
+        )
+
+    def set_state(self, state: IVFState) -> None:
+        if state.removed is None:
+            state.removed = superseded(state.names)
+        self.state = state
+        self._name_ids = {
+            name: index
+            for index, name in enumerate(state.names)
+            if not state.removed[index]
+        }
+
+    def names(self) -> list[str]:
+        """Names of the concepts indexed, removed ones excluded."""
+        return list(self._name_ids)
+
+    def live_items(self) -> tuple[list[str], np.ndarray]:
+        """Names and vectors of the concepts indexed, to rebuild the index."""
+        if self.state is None:
+            return [], np.empty((0, 0), dtype=np.float32)
+        ids = sorted(self._name_ids.values())
+        return [self.state.names[i] for i in ids], np.asarray(self.state.vectors[ids])
+
+    def remove(self, names: list[str]) -> int:
+        """Mask the vectors of the concepts `names`. Returns the number removed."""
+        with self._locked():
+            self._refresh()
+            ids = [
+                self._name_ids[name] for name in set(names) if name in self._name_ids
+            ]
+            if not ids:
+                return 0
+            with open(self._path(REMOVED_FILE), "ab") as file:
+                file.write(np.asarray(ids, dtype=np.int32).tobytes())
+            generation = self.generation + 1
+            self._write_meta({**self._read_meta(), "generation": generation})
+            removed = self.state.removed.copy()
+            removed[ids] = True
+            self.set_state(replace(self.state, removed=removed, generation=generation))
+            return len(ids)
+
+    def load(self) -> bool:
+        """Load the index files, if any. Returns whether an index was loaded."""
+        with self._locked():
+            return self._load()
+
+    def _load(self) -> bool:
+        meta = self._read_meta()
+        if meta is None:
+            return False
+
+        dimension = meta["dimension"]
+        with open(self._path(NAMES_FILE), encoding="utf-8") as file:
+            names = [json.loads(line) for line in file if line.endswith("\n")]
+        centroids = np.load(self._path(CENTROIDS_FILE))
+
+        # Additions are appended to the vectors, codes, scales, assignments then
+        # names files: drop the tail of an interrupted addition
+        vector_size = dimension * np.dtype(np.float32).itemsize
+        count = min(
+            len(names),
+            self._path(VECTORS_FILE).stat().st_size // vector_size,
+            self._path(ASSIGNMENTS_FILE).stat().st_size // np.dtype(np.int32).itemsize,
+        )
+        # Codes are written again when the quantization setting changed
+        quantized = meta.get("quantization", "none") == self.quantization
+        if quantized and self.quantization != "none":
+            code_size = dimension * np.dtype(CODES_DTYPES[self.quantization]).itemsize
+            count = min(
+                count,
+                self._path(CODES_FILES[self.quantization]).stat().st_size // code_size,
+                self._path(SCALES_FILE).stat().st_size // np.dtype(np.float32).itemsize,
+            )
+            os.truncate(self._path(CODES_FILES[self.quantization]), count * code_size)
+            os.truncate(self._path(SCALES_FILE), count * np.dtype(np.float32).itemsize)
+        os.truncate(self._path(VECTORS_FILE), count * vector_size)
+        os.truncate(self._path(ASSIGNMENTS_FILE), count * np.dtype(np.int32).itemsize)
+        if not quantized:
+            self._write_codes(self._open_vectors(count, dimension))
+            self._write_meta({**meta, "quantization": self.quantization})
+        if len(names) > count:
+            names = names[:count]
+            self._replace_file(
+                NAMES_FILE,
+                lambda file: file.writelines(
+                    (json.dumps(name) + "\n").encode("utf-8") for name in names
+                ),
+            )
+
+        assignments = np.fromfile(self._path(ASSIGNMENTS_FILE), dtype=np.int32)
+        removed = superseded(names)
+        if self._path(REMOVED_FILE).exists():
+            removed_ids = np.fromfile(self._path(REMOVED_FILE), dtype=np.int32)
+            removed[removed_ids[removed_ids < count]] = True
+        self.set_state(
+            IVFState(
+                names=names,
+                vectors=self._open_vectors(count, dimension),
+                centroids=centroids,
+                assignments=assignments,
+                inverted_lists=build_inverted_lists(assignments, len(centroids)),
+                trained_size=meta["trained_size"],
+                codes=self._open_codes(count, dimension),
+                scales=self._load_scales(count),
+                removed=removed,
+                generation=meta.get("generation", 0),
+            )
+        )
+        logging.info(f"Loaded ANN index: {count} vectors in {len(centroids)} clusters")
+        return True
+
+    def add(self, names: list[str], embeddings: np.ndarray) -> int:
+        """
+        Add the vectors of the concepts not indexed yet, in their closest cluster.
+
+        The centroids are not retrained: rebuild the index once it grew well
+        beyond `trained_size`. Returns the number of vectors added.
+        """
+        with self._locked():
+            self._refresh()
+            return self._add(names, embeddings)
+
+    def _add(self, names: list[str], embeddings: np.ndarray) -> int:
+        if self.state is None:
+            raise RuntimeError("The ANN index must be built before adding vectors")
+
+        new_positions: dict[str, int] = {}
+        for position, name in enumerate(names):
+            if name not in self._name_ids:
+                new_positions.setdefault(name, position)
+        if not new_positions:
+            return 0
+
+        new_names = list(new_positions)
+        vectors = normalize(np.asarray(embeddings)[list(new_positions.values())])
+        assignments = assign_clusters(vectors, self.state.centroids)
+
+        with open(self._path(VECTORS_FILE), "ab") as file:
+            file.write(vectors.tobytes())
+        if self.quantization != "none":
+            codes, scales = quantize(vectors, self.quantization)
+            with open(self._path(CODES_FILES[self.quantization]), "ab") as file:
+                file.write(codes.tobytes())
+            with open(self._path(SCALES_FILE), "ab") as file:
+                file.write(scales.tobytes())
+        with open(self._path(ASSIGNMENTS_FILE), "ab") as file:
+            file.write(assignments.tobytes())
+        with open(self._path(NAMES_FILE), "ab") as file:
+            file.writelines((json.dumps(name) + "\n").encode("utf-8") for name in new_names)
+        generation = self.generation + 1
+        self._write_meta({**self._read_meta(), "generation": generation})
+
+        state = self.state
+        first_id = len(state.names)
+        inverted_lists = list(state.inverted_lists)
+        for cluster in np.unique(assignments):
+            cluster_ids = first_id + np.flatnonzero(assignments == cluster)
+            inverted_lists[cluster] = np.concatenate(
+                [inverted_lists[cluster], cluster_ids.astype(np.int32)]
+            )
+        all_names = state.names + new_names
+        dimension = state.centroids.shape[1]
+        self.set_state(
+            IVFState(
+                names=all_names,
+                vectors=self._open_vectors(len(all_names), dimension),
+                centroids=state.centroids,
+                assignments=np.concatenate([state.assignments, assignments]),
+                inverted_lists=inverted_lists,
+                trained_size=state.trained_size,
+                codes=self._open_codes(len(all_names), dimension),
+                scales=(
+                    None
+                    if state.scales is None
+                    else np.concatenate([state.scales, scales])
+                ),
+                removed=np.concatenate(
+                    [state.removed, np.zeros(len(new_names), dtype=bool)]
+                ),
+                generation=generation,
+            )
+        )
+        return len(new_names)
+
+    def search(self, embedding: list[float], k: int) -> list[tuple[str, float]]:
+        """Return the names and cosine similarities of the `k` nearest concepts."""
+        state = self.state
+        if state is None or not state.names:
+            return []
+
+        query = normalize(embedding)
+        n_probe = min(self.n_probe, len(state.centroids))
+        probed = np.argpartition(-(state.centroids @ query), n_probe - 1)[:n_probe]
+        # Sorted ids read the memory-mapped vectors in file order
+        candidates = np.sort(np.concatenate([state.inverted_lists[c] for c in probed]))
+        candidates = candidates[~state.removed[candidates]]
+        if not len(candidates):
+            return []
+
+        if state.codes is not None:
+            # Shortlist with the codes, only the shortlist is read in float32
+            shortlist_size = min(len(candidates), k * self.rerank_factor)
+            approximate = approximate_scores(
+                state.codes[candidates], state.scales[candidates], query
+            )
+            shortlist = np.argpartition(-approximate, shortlist_size - 1)
+            candidates = np.sort(candidates[shortlist[:shortlist_size]])
+
+        scores = np.asarray(state.vectors[candidates]) @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(state.names[candidates[i]], float(scores[i])) for i in top]
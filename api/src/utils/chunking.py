@@ -0,0 +1,133 @@
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from itertools import accumulate
+
+import tiktoken
+
+DEFAULT_ENCODING = "o200k_base"
+
+# Chunks are cut before the whitespace following a sentence end, or a word
+# for sentences longer than a chunk
+SENTENCE_BOUNDARY = re.compile(rb"(?<=[.!?])\s+")
+WORD_BOUNDARY = re.compile(rb"\s+")
+
+
+@lru_cache()
+def get_encoding(encoding_name: str = DEFAULT_ENCODING) -> tiktoken.Encoding:
+    """Load a tiktoken encoding once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+class TokenChunker:
+    """
+    Split text into chunks of at most `max_tokens` tokens.
+
+    The text is encoded once and chunks are cut on the last sentence boundary
+    that fits (or word boundary for oversized sentences) by walking the token
+    byte offsets, so splitting is linear in the text size. Consecutive chunks
+    can share `overlap_tokens` tokens of context.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        overlap_tokens: int = 0,
+        encoding: tiktoken.Encoding | None = None,
+    ) -> None:
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be lower than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.encoding = encoding or get_encoding()
+
+    @staticmethod
+    def _token_boundaries(
+        pattern: re.Pattern, text: bytes, offsets: list[int]
+    ) -> tuple[list[int], dict[int, int]]:
+        """
+        Map the whitespace matched by `pattern` in `text` to token indices.
+
+        Returns the sorted token indices where a chunk can end and, for each
+        of them, the token index where the next chunk starts, past the
+        whitespace.
+        """
+        boundaries = []
+        next_starts = {}
+        for match in pattern.finditer(text):
+            token_index = bisect_left(offsets, match.start())
+            if boundaries and boundaries[-1] == token_index:
+                continue
+            boundaries.append(token_index)
+            next_starts[token_index] = max(
+                token_index, bisect_right(offsets, match.end()) - 1
+            )
+        return boundaries, next_starts
+
+    @staticmethod
+    def _last_boundary(boundaries: list[int], start: int, limit: int) -> int | None:
+        """Return the last boundary in (start, limit], if any."""
+        index = bisect_right(boundaries, limit) - 1
+        if index >= 0 and boundaries[index] > start:
+            return boundaries[index]
+        return None
+
+    def split(self, text: str) -> list[str]:
+        if not text.strip():
+            return []
+
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= self.max_tokens:
+            return [text.strip()]
+
+        # Work on UTF-8 bytes: token byte offsets are a cumulative sum of the
+        # token lengths, without decoding the tokens one by one
+        text_bytes = text.encode("utf-8")
+        offsets = list(
+            accumulate(map(len, self.encoding.decode_tokens_bytes(tokens)), initial=0)
+        )
+        sentence_boundaries, _ = self._token_boundaries(
+            SENTENCE_BOUNDARY, text_bytes, offsets
+        )
+        word_boundaries, next_starts = self._token_boundaries(
+            WORD_BOUNDARY, text_bytes, offsets
+        )
+
+        def chunk_text(start: int, end: int) -> str:
+            chunk_bytes = text_bytes[offsets[start] : offsets[end]]
+            return chunk_bytes.decode("utf-8", errors="ignore").strip()
+
+        chunks = []
+        start = 0
+        while start < len(tokens):
+            limit = start + self.max_tokens
+            if limit >= len(tokens):
+                end = len(tokens)
+            else:
+                end = (
+                    self._last_boundary(sentence_boundaries, start, limit)
+                    or self._last_boundary(word_boundaries, start, limit)
+                    or limit
+                )
+
+            chunk = chunk_text(start, end)
+            if chunk:
+                chunks.append(chunk)
+            if end >= len(tokens):
+                break
+
+            if self.overlap_tokens:
+                # Start the overlap on a word when possible
+                overlap_start = end - self.overlap_tokens
+                word_index = bisect_left(word_boundaries, overlap_start)
+                if (
+                    word_index < len(word_boundaries)
+                    and word_boundaries[word_index] < end
+                ):
+                    overlap_start = next_starts[word_boundaries[word_index]]
+                start = max(overlap_start, start + 1)
+            else:
+                # Sentence boundaries are whitespace, hence word boundaries too
+                start = next_starts.get(end, end)
+
+        return chunks
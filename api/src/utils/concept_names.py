@@ -0,0 +1,64 @@
+import re
+import unicodedata
+
+# Punctuation LLMs wrap concept names with
+EDGE_PUNCTUATION = " \t\n\"'`.,;:!?()[]{}*-_"
+WHITESPACE = re.compile(r"\s+")
+
+# Words whose plural form is irregular, or that only look like plurals
+SINGULAR_EXCEPTIONS = {
+    "analysis",
+    "basis",
+    "business",
+    "data",
+    "ethics",
+    "economics",
+    "mathematics",
+    "news",
+    "physics",
+    "politics",
+    "series",
+    "species",
+    "statistics",
+    "status",
+}
+IRREGULAR_PLURALS = {
+    "analyses": "analysis",
+    "children": "child",
+    "criteria": "criterion",
+    "hypotheses": "hypothesis",
+    "indices": "index",
+    "matrices": "matrix",
+    "men": "man",
+    "people": "person",
+    "phenomena": "phenomenon",
+    "women": "woman",
+}
+
+
+def singularize(word: str) -> str:
+    """Rule based singular of an English noun, conservative on short words."""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in SINGULAR_EXCEPTIONS or len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes", "zzes")):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is", "os")) or not word.endswith("s"):
+        return word
+    return word[:-1]
+
+
+def normalize_concept_name(name: str) -> str:
+    """
+    Normalized form of a concept name: Unicode-normalized, lowercased, without
+    surrounding punctuation nor repeated whitespace, last word in the singular.
+    """
+    normalized = unicodedata.normalize("NFKC", name).casefold()
+    normalized = WHITESPACE.sub(" ", normalized).strip(EDGE_PUNCTUATION)
+    if not normalized:
+        return ""
+    *words, last_word = normalized.split(" ")
+    return " ".join([*words, singularize(last_word)])
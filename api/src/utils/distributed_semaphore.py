@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+
+from redis.asyncio import Redis
+from src.config.settings import app_settings
+from src.database.redis import get_redis
+
+INGESTION_SEMAPHORE_KEY = "ai-library:ingestion-slots"
+
+
+class RedisSemaphore:
+    """
+    Counting semaphore shared by all the processes through Redis.
+
+    Holders are the members of a sorted set, scored by the expiry of their
+    lease: the slot of a holder that crashed without releasing it is freed
+    once its lease expires. Acquiring a slot already held renews its lease,
+    `keep_lease` renews it in the background while a long task runs.
+    """
+
+    # Drop the expired leases, then renew or take a slot atomically
+    ACQUIRE_SCRIPT = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    if redis.call('ZSCORE', KEYS[1], ARGV[3])
+        or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[4]) then
+        redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(
+        self, redis_client: Redis, key: str, limit: int, lease_seconds: float
+    ) -> None:
+        self.redis_client = redis_client
+        self.key = key
+        self.limit = limit
+        self.lease_seconds = lease_seconds
+
+    async def acquire(self, holder: str) -> bool:
+        """Take (or renew) a slot for `holder`, without waiting. 0 means no limit."""
+        if self.limit <= 0:
+            return True
+        now = time.time()
+        acquired = await self.redis_client.eval(
+            self.ACQUIRE_SCRIPT,
+            1,
+            self.key,
+            now,
+            now + self.lease_seconds,
+            holder,
+            self.limit,
+        )
+        return bool(acquired)
+
+    async def release(self, holder: str) -> None:
+        if self.limit > 0:
+            await self.redis_client.zrem(self.key, holder)
+
+    @asynccontextmanager
+    async def keep_lease(self, holder: str) -> AsyncIterator[None]:
+        """Renew the lease of `holder` every third of it while the block runs."""
+        heartbeat = asyncio.create_task(self._renew_lease(holder))
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+
+    async def _renew_lease(self, holder: str) -> None:
+        while self.limit > 0:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                if not await self.acquire(holder):
+                    logging.warning(f"Lease of {holder} expired, its slot was taken")
+            except Exception as e:
+                # Retried at the next renewal, before the lease expires
+                logging.warning(f"Lease of {holder} not renewed: {e}")
+
+    async def holders_count(self) -> int:
+        await self.redis_client.zremrangebyscore(self.key, "-inf", time.time())
+        return await self.redis_client.zcard(self.key)
+
+
+@lru_cache()
+def get_ingestion_semaphore() -> RedisSemaphore:
+    """Documents processed at once by all the workers, from parsing to finalizing."""
+    return RedisSemaphore(
+        get_redis(),
+        INGESTION_SEMAPHORE_KEY,
+        limit=app_settings.INGESTION_MAX_CONCURRENT_DOCUMENTS,
+        lease_seconds=app_settings.INGESTION_SLOT_LEASE,
+    )
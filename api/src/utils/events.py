@@ -0,0 +1,46 @@
+"""Library events published through Redis, from the Celery workers to the API."""
+
+import json
+import logging
+from typing import AsyncIterator
+
+from src.database.redis import get_redis
+
+BOOK_INGESTED_CHANNEL = "ai-library:book-ingested"
+# Concepts deleted from Neo4j, as a JSON list of names
+CONCEPTS_REMOVED_CHANNEL = "ai-library:concepts-removed"
+# Incremented on every ingested book, cached search results depend on it
+LIBRARY_VERSION_KEY = "ai-library:library-version"
+
+
+async def publish_book_ingested(
+    document_id: str, removed_concepts: list[str] | None = None
+) -> None:
+    """
+    Notify the API processes that a book is fully stored in Neo4j, with the
+    concepts its update deleted if any, and bump the library version.
+    """
+    try:
+        async with get_redis().pipeline(transaction=True) as pipeline:
+            pipeline.incr(LIBRARY_VERSION_KEY)
+            if removed_concepts:
+                pipeline.publish(CONCEPTS_REMOVED_CHANNEL, json.dumps(removed_concepts))
+            pipeline.publish(BOOK_INGESTED_CHANNEL, document_id)
+            await pipeline.execute()
+    except Exception as e:
+        # Subscribers catch up on reconnection, the book itself is stored
+        logging.warning(f"Failed to publish book ingestion of {document_id}: {e}")
+
+
+async def listen_library_events() -> AsyncIterator[tuple[str, str]]:
+    """Yield the (channel, data) of every library event published from now on."""
+    pubsub = get_redis().pubsub()
+    channels = [BOOK_INGESTED_CHANNEL, CONCEPTS_REMOVED_CHANNEL]
+    await pubsub.subscribe(*channels)
+    try:
+        async for message in pubsub.listen():
+            if message["type"] == "message":
+                yield message["channel"].decode(), message["data"].decode()
+    finally:
+        await pubsub.unsubscribe(*channels)
+        await pubsub.aclose()
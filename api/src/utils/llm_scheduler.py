@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from enum import IntEnum
+from functools import lru_cache
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+from ollama import ResponseError
+from src.config.settings import app_settings
+from src.utils.metrics import get_current_metrics
+
+T = TypeVar("T")
+
+# Ollama answers 503 when its request queue is full
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+class Priority(IntEnum):
+    """Request priority, lower values are served first."""
+
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class PriorityLimiter:
+    """Concurrency limiter handing free slots to the highest priority waiter."""
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: Priority = Priority.BULK) -> None:
+        # Released slots are handed over to live waiters first, so a free slot
+        # means nobody is waiting
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # The slot may have been handed over right before the cancellation
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot over, the number of requests in flight is unchanged
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class LLMScheduler:
+    """
+    Process-wide scheduler for the requests sent to Ollama.
+
+    Bounds the number of requests in flight per model, serves interactive
+    requests before bulk ones and retries timeouts and overloaded-server
+    errors with jittered exponential backoff. Answers, latencies and token
+    counts are recorded into the metrics of the running ingestion stage.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        model_max_in_flight: dict[str, int] | None = None,
+        request_timeout: float | None = None,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.model_max_in_flight = model_max_in_flight or {}
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._limiters: dict[str, PriorityLimiter] = {}
+
+    def get_limiter(self, model: str) -> PriorityLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = PriorityLimiter(
+                self.model_max_in_flight.get(model, self.max_in_flight)
+            )
+        return self._limiters[model]
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+            return True
+        if isinstance(error, (httpx.ConnectError, httpx.RemoteProtocolError)):
+            return True
+        return (
+            isinstance(error, ResponseError)
+            and error.status_code in RETRYABLE_STATUS_CODES
+        )
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: spread retries of concurrent requests over the window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def submit(
+        self,
+        model: str,
+        request: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.BULK,
+    ) -> T:
+        """Run `request` once a slot for `model` is free, retrying transient errors."""
+        limiter = self.get_limiter(model)
+        attempt = 0
+        while True:
+            await limiter.acquire(priority)
+            try:
+                start_time = time.perf_counter()
+                response = await asyncio.wait_for(request(), self.request_timeout)
+                get_current_metrics().record_ollama_request(
+                    model, time.perf_counter() - start_time, response
+                )
+                return response
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                get_current_metrics().record_ollama_retry(model)
+                delay = self._backoff_delay(attempt)
+                logging.warning(
+                    f"Ollama request to {model} failed ({e!r}), "
+                    f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s"
+                )
+            finally:
+                limiter.release()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+@lru_cache()
+def get_llm_scheduler() -> LLMScheduler:
+    return LLMScheduler(
+        max_in_flight=app_settings.OLLAMA_MAX_IN_FLIGHT,
+        model_max_in_flight=app_settings.OLLAMA_MODEL_MAX_IN_FLIGHT,
+        request_timeout=app_settings.OLLAMA_REQUEST_TIMEOUT,
+        max_retries=app_settings.OLLAMA_MAX_RETRIES,
+        backoff_base=app_settings.OLLAMA_RETRY_BACKOFF,
+        backoff_max=app_settings.OLLAMA_RETRY_BACKOFF_MAX,
+    )
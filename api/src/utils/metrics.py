@@ -0,0 +1,155 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from src.repository.neo4j_writer import BatchWriteStats
+
+# Label of the metrics of a group: the stage, the model or the Neo4j query
+# the metric is measured for
+METRIC_GROUPS = {
+    "stages": "stage",
+    "ollama": "model",
+    "concept_extraction": "model",
+    "neo4j": "query",
+}
+# Help text of the exported metrics, by (group, field)
+METRIC_HELP = {
+    ("stages", "runs"): "Ingestion stages run, retries included",
+    ("stages", "seconds"): "Seconds spent in the ingestion stages",
+    ("ollama", "requests"): "Requests answered by Ollama",
+    ("ollama", "retries"): "Ollama requests retried after a transient error",
+    ("ollama", "seconds"): "Seconds spent waiting for Ollama answers",
+    ("ollama", "prompt_tokens"): "Prompt tokens evaluated by Ollama",
+    ("ollama", "completion_tokens"): "Tokens generated by Ollama",
+    ("concept_extraction", "chunks"): "Chunks of text sent to concept extraction",
+    ("concept_extraction", "cached_chunks"): "Chunks whose concepts were cached",
+    ("neo4j", "batches"): "Batches written to Neo4j",
+    ("neo4j", "rows"): "Rows written to Neo4j",
+    ("neo4j", "seconds"): "Seconds spent writing batches to Neo4j",
+}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_current_metrics: ContextVar["IngestionMetrics | None"] = ContextVar(
+    "ingestion_metrics", default=None
+)
+
+
+def metric_key(label: str) -> str:
+    # Labels become MongoDB field names, which can't contain dots or start with $
+    return label.replace(".", "_").lstrip("$") or "unknown"
+
+
+class IngestionMetrics:
+    """
+    Counters measured while running an ingestion stage.
+
+    Counters are keyed `group.label.field` (e.g. `ollama.<model>.requests`)
+    and added to the `metrics` of the pdf_processing document once the stage
+    ends, so the metrics of a document sum all its stages and attempts.
+    """
+
+    def __init__(self) -> None:
+        self.counters: dict[str, float] = defaultdict(int)
+
+    def add(self, group: str, label: str, field: str, value: float = 1) -> None:
+        self.counters[f"{group}.{metric_key(label)}.{field}"] += value
+
+    def record_stage(self, stage: str, seconds: float) -> None:
+        self.add("stages", stage, "runs")
+        self.add("stages", stage, "seconds", seconds)
+
+    def record_ollama_request(self, model: str, seconds: float, response: Any) -> None:
+        self.add("ollama", model, "requests")
+        self.add("ollama", model, "seconds", seconds)
+        # Token counts reported by Ollama, missing for cached prompts
+        prompt_tokens = getattr(response, "prompt_eval_count", 0) or 0
+        completion_tokens = getattr(response, "eval_count", 0) or 0
+        self.add("ollama", model, "prompt_tokens", prompt_tokens)
+        self.add("ollama", model, "completion_tokens", completion_tokens)
+
+    def record_ollama_retry(self, model: str) -> None:
+        self.add("ollama", model, "retries")
+
+    def record_chunks(self, model: str, chunks: int, cached_chunks: int) -> None:
+        self.add("concept_extraction", model, "chunks", chunks)
+        self.add("concept_extraction", model, "cached_chunks", cached_chunks)
+
+    def record_neo4j_batches(self, stats: Iterable["BatchWriteStats"]) -> None:
+        for batch in stats:
+            self.add("neo4j", batch.name, "batches")
+            self.add("neo4j", batch.name, "rows", batch.rows)
+            self.add("neo4j", batch.name, "seconds", batch.seconds)
+
+    def as_increments(self) -> dict[str, float]:
+        """MongoDB `$inc` of the counters into the `metrics` of a document."""
+        return {f"metrics.{key}": value for key, value in self.counters.items()}
+
+
+def get_current_metrics() -> IngestionMetrics:
+    """
+    Metrics of the stage running in the current task, shared with the tasks it
+    starts. Outside of a stage the measures go to a throwaway instance.
+    """
+    metrics = _current_metrics.get()
+    return metrics if metrics is not None else IngestionMetrics()
+
+
+@contextmanager
+def collect_metrics(metrics: IngestionMetrics) -> Iterator[IngestionMetrics]:
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+def sum_metrics(documents_metrics: Iterable[dict[str, Any]]) -> dict[str, float]:
+    """Sum the nested `metrics` of documents, keyed `group.label.field`."""
+    totals: dict[str, float] = defaultdict(int)
+    for metrics in documents_metrics:
+        for group, labels in metrics.items():
+            for label, fields in labels.items():
+                for field, value in fields.items():
+                    totals[f"{group}.{label}.{field}"] += value
+    return totals
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_sample_value(value: float) -> str:
+    # Keep counts exact, %g would round large token counts
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(
+    metrics_totals: dict[str, float], documents_by_status: dict[str, int]
+) -> str:
+    """Render the ingestion metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP ai_library_documents Documents by processing status",
+        "# TYPE ai_library_documents gauge",
+    ]
+    for status, count in sorted(documents_by_status.items()):
+        status_label = escape_label_value(status or "UNKNOWN")
+        lines.append(f'ai_library_documents{{status="{status_label}"}} {count}')
+
+    samples = defaultdict(list)
+    for key, value in sorted(metrics_totals.items()):
+        group, label, field = key.split(".", 2)
+        samples[(group, field)].append((label, value))
+
+    for (group, field), help_text in METRIC_HELP.items():
+        name = f"ai_library_ingestion_{group}_{field}_total"
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for label, value in samples.get((group, field), []):
+            lines.append(
+                f'{name}{{{METRIC_GROUPS[group]}="{escape_label_value(label)}"}} '
+                f"{format_sample_value(value)}"
+            )
+    return "\n".join(lines) + "\n"
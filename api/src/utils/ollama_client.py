@@ -1,5 +1,26 @@
+from functools import lru_cache
+
+import httpx
 from ollama import AsyncClient
+from src.config.settings import app_settings
+
+
+@lru_cache()
+def get_ollama_client() -> AsyncClient:
+    """Get the Ollama client instance, shared by the process."""
+    return AsyncClient(
+        limits=httpx.Limits(
+            max_connections=app_settings.OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=app_settings.OLLAMA_MAX_CONNECTIONS,
+        )
+    )
+
+
+async def check_ollama() -> None:
+    await get_ollama_client().list()
 
 
-def get_ollama_client():
-    return AsyncClient()
+async def close_ollama_client() -> None:
+    if get_ollama_client.cache_info().currsize:
+        await get_ollama_client().close()
+        get_ollama_client.cache_clear()
@@ -1,9 +1,126 @@
-from llmsherpa.readers import LayoutPDFReader
+import hashlib
+import multiprocessing
+from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any
+
+from llmsherpa.readers import Document, LayoutPDFReader
+from PyPDF2 import PdfReader
+from src.config.settings import app_settings
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+# Every PDF file starts with this signature
+PDF_SIGNATURE = b"%PDF-"
+
+# Layout blocks stored as paragraphs, with the text of their children
+CONTENT_TAGS = ("para", "list_item", "table")
+
+
 def get_pdf_reader():
     return LayoutPDFReader(os.getenv("LLMSHERPA_API_URL"))
+
+
+@lru_cache()
+def get_pdf_parsing_executor() -> Executor:
+    """Executor used to parse PDFs off the event loop."""
+    max_workers = app_settings.PDF_PARSING_PROCESSES
+    # Daemonic processes (e.g. Celery prefork workers) can't have children,
+    # they already parse one PDF per process
+    if multiprocessing.current_process().daemon:
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+def parse_pdf(pdf_url: str, parser_api_url: str) -> dict[str, Any]:
+    """
+    Parse a PDF with LLMSherpa and flatten its sections and paragraphs.
+
+    Meant to run in a worker process: it only returns plain, picklable data
+    (the book metadata and its sections), not the LLMSherpa document tree.
+    """
+    doc = LayoutPDFReader(parser_api_url).read_pdf(pdf_url)
+
+    # Get metadata
+    metadata_reader = PdfReader(pdf_url)
+    metadata = metadata_reader.metadata
+    parsed_pdf = {
+        "pages": len(metadata_reader.pages),
+    }
+    if metadata is not None:
+        book_metadata = {
+            "title": metadata.title,
+            "author": metadata.author,
+            "published_date": metadata.creation_date,
+        }
+        parsed_pdf.update(
+            {key: value for key, value in book_metadata.items() if value is not None}
+        )
+
+    parsed_pdf["sections"] = flatten_sections(doc)
+    return parsed_pdf
+
+
+def paragraph_id(text: str) -> str:
+    """Stable id of a paragraph, the same for identical texts."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def section_id(parent_section: str, section_name: str, occurrence: int) -> str:
+    """
+    Stable id of a section in its book, from its name, the name of its parent
+    and the number of sections of the same name the parent has before it.
+    Inserting or removing other sections doesn't change it.
+    """
+    key = "\x1f".join([parent_section, section_name, str(occurrence)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def flatten_sections(doc: Document) -> list[dict[str, Any]]:
+    """
+    Flatten the sections of an LLMSherpa document and their paragraphs.
+
+    Every paragraph (list and table included) is kept once, under its
+    innermost section, with its position in the section. Ancestors are only
+    referenced by the name of the parent section, instead of repeating their
+    texts.
+    """
+    sections = []
+    occurrences = Counter()
+    for section in doc.sections():
+        section_extracted_paragraphs_dataset = []
+        # Blocks of subsections are children of the subsection headers
+        for section_paragraph in section.children:
+            if section_paragraph.tag not in CONTENT_TAGS:
+                continue
+            text = section_paragraph.to_text(include_children=True, recurse=True)
+            section_extracted_paragraphs_dataset.append(
+                {
+                    "id": paragraph_id(text),
+                    "position": len(section_extracted_paragraphs_dataset),
+                    "level": section_paragraph.level,
+                    "text": text,
+                    "page": section_paragraph.page_idx + 1,
+                }
+            )
+
+        parent = section.parent
+        is_subsection = parent is not None and parent.tag == "header"
+        parent_section = parent.title if is_subsection else ""
+        # Titles such as "Exercises" are repeated across a book
+        occurrence = occurrences[parent_section, section.title]
+        occurrences[parent_section, section.title] += 1
+        sections.append(
+            {
+                "section_id": section_id(parent_section, section.title, occurrence),
+                "section_name": section.title,
+                "parent_section": parent_section,
+                "section_paragraphs_data": section_extracted_paragraphs_dataset,
+            }
+        )
+
+    return sections
@@ -0,0 +1,24 @@
+from collections import defaultdict
+from typing import Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+# Constant of the reciprocal rank fusion, damping the weight of the top ranks
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[K]], k: int = RRF_K
+) -> list[tuple[K, float]]:
+    """
+    Fuse rankings of items into one, best first.
+
+    Every item scores the sum of 1 / (k + rank) over the rankings it appears
+    in, so the fusion only depends on ranks, not on the scales of the scores
+    of each ranking.
+    """
+    scores: dict[K, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
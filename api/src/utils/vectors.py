@@ -0,0 +1,64 @@
+"""float32 storage of the embedding vectors, from Ollama to the caches and Neo4j."""
+
+from typing import Any
+
+import numpy as np
+
+EMBEDDING_DTYPE = np.float32
+
+
+def as_embedding(value: Any) -> np.ndarray:
+    """
+    float32 vector of an embedding given as stored bytes, a list of floats or
+    an array. Bytes and float32 arrays are not copied.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return np.frombuffer(value, dtype=EMBEDDING_DTYPE)
+    return np.asarray(value, dtype=EMBEDDING_DTYPE)
+
+
+def as_embeddings(values: Any) -> np.ndarray:
+    """float32 matrix of a batch of embeddings, one row per embedding."""
+    return np.asarray(values, dtype=EMBEDDING_DTYPE).reshape(len(values), -1)
+
+
+def empty_embedding() -> np.ndarray:
+    return np.empty(0, dtype=EMBEDDING_DTYPE)
+
+
+def embedding_to_bytes(embedding: Any) -> bytes:
+    """Compact binary form of an embedding, 4 bytes per dimension."""
+    return as_embedding(embedding).tobytes()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors to unit length, so that dot products are cosine similarities."""
+    vectors = np.asarray(vectors, dtype=EMBEDDING_DTYPE)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(EMBEDDING_DTYPE).tiny)
+
+
+def group_centroids(
+    vectors: np.ndarray,
+    groups: np.ndarray,
+    n_groups: int,
+    weights: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Unit mean direction of the `vectors` of each group, `groups` giving the
+    group of every vector. Vectors count alike whatever their norm, times
+    their weight if any. Groups without vectors get a zero row.
+    """
+    vectors = normalize(vectors)
+    if weights is not None:
+        vectors *= np.asarray(weights, dtype=EMBEDDING_DTYPE)[:, None]
+    sums = np.zeros((n_groups, vectors.shape[-1]), dtype=EMBEDDING_DTYPE)
+    np.add.at(sums, groups, vectors)
+    return normalize(sums)
+
+
+def centroid(vectors: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+    """Unit mean direction of `vectors`, see `group_centroids`."""
+    vectors = as_embeddings(vectors)
+    groups = np.zeros(len(vectors), dtype=np.intp)
+    return group_centroids(vectors, groups, 1, weights)[0]
@@ -1,5 +1,4 @@
 import os
-import time
 
 from celery import Celery
 from dotenv import load_dotenv
@@ -11,6 +10,7 @@ celery_app = Celery(
     broker=os.getenv("CELERY_BROKER_URL"),
     backend=os.getenv("CELERY_RESULT_BACKEND"),
     broker_connection_retry_on_startup=True,
+    include=["src.tasks"],
 )
 
 celery_app.conf.update(
@@ -19,4 +19,19 @@ celery_app.conf.update(
     accept_content=["json"],
     timezone="UTC",
     enable_utc=True,
+    # Bound the number of books processed in parallel by a single worker node
+    worker_concurrency=int(os.getenv("CELERY_WORKER_CONCURRENCY", 2)),
+    # Long running tasks: don't reserve more than one task per process and
+    # only acknowledge a stage once it has finished
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    task_track_started=True,
+    # Hand the ingestion slots freed by expired leases to the waiting documents
+    beat_schedule={
+        "dispatch-waiting-documents": {
+            "task": "pdf_processing.dispatch_waiting",
+            "schedule": float(os.getenv("INGESTION_DISPATCH_INTERVAL", 60)),
+        }
+    },
 )
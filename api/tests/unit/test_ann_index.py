@@ -0,0 +1,208 @@
+import numpy as np
+
+from src.utils.ann_index import ConceptANNIndex, normalize, quantize
+
+DIMENSION = 16
+
+
+def make_embeddings(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def exact_neighbours(embeddings: np.ndarray, query: np.ndarray, k: int) -> list[int]:
+    scores = normalize(embeddings) @ normalize(query)
+    return list(np.argsort(-scores)[:k])
+
+
+def build_index(
+    tmp_path, names, embeddings, n_probe=8, quantization="none"
+) -> ConceptANNIndex:
+    index = ConceptANNIndex(tmp_path, n_probe=n_probe, quantization=quantization)
+    index.set_state(index.build(names, embeddings))
+    return index
+
+
+def test_search_finds_exact_neighbours_when_probing_every_cluster(tmp_path):
+    embeddings = make_embeddings(400)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings, n_probe=1000)
+
+    query = make_embeddings(1, seed=1)[0]
+    results = index.search(query.tolist(), k=5)
+
+    expected = exact_neighbours(embeddings, query, 5)
+    assert [name for name, _ in results] == [names[i] for i in expected]
+    assert [score for _, score in results] == sorted(
+        (score for _, score in results), reverse=True
+    )
+
+
+def test_search_returns_the_indexed_vector_first(tmp_path):
+    embeddings = make_embeddings(400)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings, n_probe=2)
+
+    name, score = index.search(embeddings[42].tolist(), k=1)[0]
+
+    assert name == "concept 42"
+    assert np.isclose(score, 1.0, atol=1e-5)
+
+
+def test_add_skips_indexed_concepts(tmp_path):
+    embeddings = make_embeddings(100)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings)
+
+    new_embeddings = make_embeddings(3, seed=2)
+    added = index.add(
+        ["concept 0", "new concept", "new concept", "other concept"],
+        np.vstack([embeddings[:1], new_embeddings]),
+    )
+
+    assert added == 2
+    assert len(index) == 102
+    assert index.search(new_embeddings[0].tolist(), k=1)[0][0] == "new concept"
+    assert index.search(new_embeddings[2].tolist(), k=1)[0][0] == "other concept"
+
+
+def test_load_restores_built_and_added_vectors(tmp_path):
+    embeddings = make_embeddings(100)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings)
+    new_embedding = make_embeddings(1, seed=3)
+    index.add(["new concept"], new_embedding)
+
+    reloaded = ConceptANNIndex(tmp_path)
+    assert reloaded.load()
+
+    assert len(reloaded) == 101
+    assert reloaded.trained_size == 100
+    assert reloaded.search(new_embedding[0].tolist(), k=1)[0][0] == "new concept"
+    assert reloaded.search(embeddings[7].tolist(), k=1)[0][0] == "concept 7"
+
+
+def test_load_drops_an_interrupted_addition(tmp_path):
+    embeddings = make_embeddings(50)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    build_index(tmp_path, names, embeddings)
+    # Vector written, but not its assignment nor its name
+    with open(tmp_path / "vectors.f32", "ab") as file:
+        file.write(make_embeddings(1, seed=4).tobytes())
+
+    reloaded = ConceptANNIndex(tmp_path)
+    assert reloaded.load()
+
+    assert len(reloaded) == 50
+    assert (tmp_path / "vectors.f32").stat().st_size == 50 * DIMENSION * 4
+
+
+def test_load_without_index_files(tmp_path):
+    index = ConceptANNIndex(tmp_path)
+
+    assert not index.load()
+    assert index.search([1.0] * DIMENSION, k=3) == []
+
+
+def test_quantized_search_reranks_candidates_in_full_precision(tmp_path):
+    embeddings = make_embeddings(400)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings, n_probe=1000, quantization="int8")
+    assert (tmp_path / "codes.i8").stat().st_size == 400 * DIMENSION
+
+    query = make_embeddings(1, seed=1)[0]
+    results = index.search(query.tolist(), k=5)
+
+    expected = exact_neighbours(embeddings, query, 5)
+    assert [name for name, _ in results] == [names[i] for i in expected]
+    exact_scores = normalize(embeddings[expected]) @ normalize(query)
+    assert np.allclose([score for _, score in results], exact_scores, atol=1e-6)
+
+
+def test_quantize_int8_keeps_the_cosine_similarities_close():
+    vectors = normalize(make_embeddings(50))
+    codes, scales = quantize(vectors, "int8")
+
+    assert codes.dtype == np.int8
+    assert np.allclose(codes * scales[:, None], vectors, atol=1 / 127)
+
+
+def test_load_quantizes_an_index_built_without_quantization(tmp_path):
+    embeddings = make_embeddings(100)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    build_index(tmp_path, names, embeddings)
+
+    reloaded = ConceptANNIndex(tmp_path, quantization="float16")
+    assert reloaded.load()
+    reloaded.add(["new concept"], make_embeddings(1, seed=3))
+
+    assert reloaded.state.codes.dtype == np.float16
+    assert len(reloaded.state.codes) == len(reloaded.state.scales) == 101
+    assert reloaded.search(embeddings[7].tolist(), k=1)[0][0] == "concept 7"
+    assert ConceptANNIndex(tmp_path, quantization="float16").load()
+
+
+def test_removed_concepts_are_not_returned_and_can_be_added_again(tmp_path):
+    embeddings = make_embeddings(100)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings, n_probe=1000)
+    generation = index.generation
+
+    assert index.remove(["concept 42", "unknown concept"]) == 1
+    assert len(index) == 99
+    assert "concept 42" not in index
+    assert index.generation != generation
+    assert index.search(embeddings[42].tolist(), k=1)[0][0] != "concept 42"
+
+    # Added again with a new vector, the removed one stays masked after a reload
+    new_embedding = make_embeddings(1, seed=3)
+    assert index.add(["concept 42"], new_embedding) == 1
+    reloaded = ConceptANNIndex(tmp_path, n_probe=1000)
+    reloaded.load()
+    assert len(reloaded) == 100
+    name, score = reloaded.search(new_embedding[0].tolist(), k=1)[0]
+    assert name == "concept 42" and np.isclose(score, 1.0, atol=1e-5)
+    assert reloaded.search(embeddings[42].tolist(), k=1)[0][0] != "concept 42"
+
+    live_names, live_vectors = reloaded.live_items()
+    assert len(live_names) == len(live_vectors) == 100
+
+
+def test_generation_grows_with_every_change_rebuilds_included(tmp_path):
+    embeddings = make_embeddings(100)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    index = build_index(tmp_path, names, embeddings)
+    generations = [index.generation]
+
+    index.add(["new concept"], make_embeddings(1, seed=3))
+    generations.append(index.generation)
+    index.remove(["concept 1", "concept 2"])
+    generations.append(index.generation)
+    # Fewer vectors once the removed ones are dropped, still a new generation
+    index.set_state(index.rebuild())
+    generations.append(index.generation)
+
+    assert generations == sorted(set(generations))
+    reloaded = ConceptANNIndex(tmp_path)
+    reloaded.load()
+    assert reloaded.generation == index.generation
+
+
+def test_processes_sharing_the_files_see_each_other_changes(tmp_path):
+    embeddings = make_embeddings(100)
+    names = [f"concept {i}" for i in range(len(embeddings))]
+    first = build_index(tmp_path, names, embeddings, n_probe=1000)
+    second = ConceptANNIndex(tmp_path, n_probe=1000)
+    second.load()
+
+    new_embedding = make_embeddings(1, seed=3)
+    assert first.add(["new concept"], new_embedding) == 1
+    assert first.remove(["concept 5"]) == 1
+    # The same event applied by the other process doesn't store it twice
+    assert second.add(["new concept"], new_embedding) == 0
+    assert second.generation == first.generation
+    assert "concept 5" not in second
+
+    reloaded = ConceptANNIndex(tmp_path, n_probe=1000)
+    reloaded.load()
+    assert len(reloaded.state.names) == 101
+    assert sorted(reloaded.names()) == sorted(second.names())
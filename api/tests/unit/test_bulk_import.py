@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.services.bulk_import import BulkImportService, collect_pdf_paths, file_checksum
+
+
+class FakeProcessingRepository:
+    def __init__(self, processed_checksums=(), documents_stats=()):
+        self.processed_checksums = set(processed_checksums)
+        self.documents = []
+        self.import_jobs = {}
+        self.documents_stats = list(documents_stats)
+
+    async def get_processing_by_checksum(self, checksum):
+        return {"checksum": checksum} if checksum in self.processed_checksums else None
+
+    async def save_pdf_processing_metadata(self, document):
+        self.documents.append(document)
+
+    async def save_import_job(self, import_job):
+        self.import_jobs[import_job.import_id] = import_job.model_dump()
+
+    async def update_import_job(self, import_job):
+        self.import_jobs[import_job.import_id].update(
+            import_job.model_dump(exclude_unset=True)
+        )
+
+    async def get_import_job(self, import_id):
+        return self.import_jobs.get(import_id)
+
+    async def get_import_documents_stats(self, import_id):
+        return self.documents_stats
+
+
+def write_pdf(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"%PDF-1.7\n" + content)
+    return path
+
+
+def test_collect_pdf_paths_finds_pdfs_recursively(tmp_path):
+    write_pdf(tmp_path / "b.pdf", b"b")
+    write_pdf(tmp_path / "nested" / "a.PDF", b"a")
+    (tmp_path / "notes.txt").write_text("not a pdf")
+
+    paths = collect_pdf_paths(str(tmp_path), [str(tmp_path / "b.pdf")])
+
+    assert paths == [str(tmp_path / "b.pdf"), str(tmp_path / "nested" / "a.PDF")]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_files_skips_duplicates(tmp_path):
+    first = write_pdf(tmp_path / "first.pdf", b"same")
+    copy = write_pdf(tmp_path / "copy.pdf", b"same")
+    processed = write_pdf(tmp_path / "processed.pdf", b"processed")
+    new = write_pdf(tmp_path / "new.pdf", b"new")
+    repository = FakeProcessingRepository(processed_checksums={file_checksum(processed)})
+    enqueued = []
+    service = BulkImportService(
+        repository, enqueue=lambda path, document_id: enqueued.append(path)
+    )
+
+    paths = [str(first), str(copy), str(processed), str(new), str(tmp_path / "missing.pdf")]
+    import_job = await service.create_import(paths)
+    import_job = await service.enqueue_files(import_job.import_id, paths)
+
+    assert import_job.documents_queued == 2
+    assert import_job.duplicates == 2
+    assert len(import_job.errors) == 1
+    assert sorted(enqueued) in ([str(first), str(new)], [str(copy), str(new)])
+    assert all(document.keep_file for document in repository.documents)
+    assert repository.import_jobs[import_job.import_id]["status"] == "ENQUEUED"
+
+
+@pytest.mark.asyncio
+async def test_get_progress_reports_throughput_and_eta():
+    started_at = datetime.now(timezone.utc) - timedelta(minutes=10)
+    repository = FakeProcessingRepository(
+        documents_stats=[
+            {
+                "_id": "COMPLETED",
+                "documents": 2,
+                "pages": 300,
+                "sections_processed": 40,
+                "concepts_extracted": 500,
+                "last_completed_at": started_at + timedelta(minutes=9),
+            },
+            {
+                "_id": "QUEUED",
+                "documents": 3,
+                "pages": 0,
+                "sections_processed": 0,
+                "concepts_extracted": 0,
+                "last_completed_at": None,
+            },
+        ]
+    )
+    service = BulkImportService(repository, enqueue=lambda path, document_id: None)
+    import_job = await service.create_import(["a.pdf"] * 5)
+    repository.import_jobs[import_job.import_id].update(
+        created_at=started_at.replace(tzinfo=None), status="ENQUEUED"
+    )
+
+    progress = await service.get_progress(import_job.import_id)
+
+    assert progress.documents == {"COMPLETED": 2, "QUEUED": 3}
+    assert progress.pages_per_minute == pytest.approx(30, rel=0.01)
+    assert progress.sections_per_minute == pytest.approx(4, rel=0.01)
+    assert progress.concepts_per_minute == pytest.approx(50, rel=0.01)
+    # 3 documents left at 2 documents per 10 minutes
+    assert progress.eta_seconds == pytest.approx(15 * 60, rel=0.01)
+
+
+def test_collect_pdf_paths_rejects_paths_outside_the_import_root(tmp_path):
+    root = tmp_path / "library"
+    inside = write_pdf(root / "inside.pdf", b"inside")
+    outside = write_pdf(tmp_path / "outside.pdf", b"outside")
+    (root / "link.pdf").symlink_to(outside)
+
+    assert collect_pdf_paths(paths=[str(inside)], root=root) == [str(inside)]
+    for path in (outside, root / ".." / "outside.pdf", root / "link.pdf"):
+        with pytest.raises(PermissionError):
+            collect_pdf_paths(paths=[str(path)], root=root)
+    # Missing and existing directories outside of the root can't be told apart
+    for directory in (tmp_path, tmp_path / "missing"):
+        with pytest.raises(PermissionError):
+            collect_pdf_paths(str(directory), root=root)
+
+
+def test_file_checksum_rejects_files_that_are_not_pdfs(tmp_path):
+    (tmp_path / "fake.pdf").write_bytes(b"<html></html>")
+    (tmp_path / "empty.pdf").write_bytes(b"")
+    for name in ("fake.pdf", "empty.pdf"):
+        with pytest.raises(ValueError):
+            file_checksum(str(tmp_path / name))
@@ -0,0 +1,89 @@
+import pytest
+
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.schemas.upload import ProcessedBook, SectionData
+
+DOCUMENT_ID = "0" * 24
+
+
+class FakeCollection:
+    def __init__(self, fail_insert_many=False):
+        self.documents = []
+        self.fail_insert_many = fail_insert_many
+
+    async def delete_many(self, query):
+        self.documents = [
+            document
+            for document in self.documents
+            if any(document.get(key) != value for key, value in query.items())
+        ]
+
+    async def insert_many(self, documents):
+        if self.fail_insert_many:
+            raise ConnectionError("Connection lost")
+        self.documents.extend(documents)
+
+    async def insert_one(self, document):
+        self.documents.append(document)
+
+    async def find_one(self, query, projection=None):
+        for document in self.documents:
+            if all(document.get(key) == value for key, value in query.items()):
+                return document
+        return None
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        return None
+
+
+class FakeMongoDB:
+    def __init__(self, checkpoints):
+        self.collections = {
+            "pdf_processing_checkpoints": checkpoints,
+            "pdf_processing": FakeCollection(),
+        }
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+
+def make_book():
+    return ProcessedBook(
+        document_id=DOCUMENT_ID,
+        title="Book",
+        sections=[
+            SectionData(
+                section_id=str(index),
+                section_name=f"Section {index}",
+                section_paragraphs_data=[],
+            )
+            for index in range(3)
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_book_checkpoint_is_written_after_its_sections():
+    checkpoints = FakeCollection()
+    repository = PDFProcessingRepository(None, None, FakeMongoDB(checkpoints))
+
+    await repository.save_stage_checkpoint(make_book(), "PARSED")
+
+    assert [document["kind"] for document in checkpoints.documents] == [
+        "section",
+        "section",
+        "section",
+        "book",
+    ]
+    assert await repository.has_stage_checkpoint(DOCUMENT_ID, "PARSED")
+
+
+@pytest.mark.asyncio
+async def test_interrupted_checkpoint_does_not_mark_the_stage_complete():
+    checkpoints = FakeCollection(fail_insert_many=True)
+    repository = PDFProcessingRepository(None, None, FakeMongoDB(checkpoints))
+
+    with pytest.raises(ConnectionError):
+        await repository.save_stage_checkpoint(make_book(), "PARSED")
+
+    assert not await repository.has_stage_checkpoint(DOCUMENT_ID, "PARSED")
@@ -0,0 +1,52 @@
+import tiktoken
+
+from src.utils.chunking import TokenChunker
+
+# Byte level encoding: one token per byte, no download required
+BYTE_ENCODING = tiktoken.Encoding(
+    name="bytes",
+    pat_str=r"\s+|\S+",
+    mergeable_ranks={bytes([byte]): byte for byte in range(256)},
+    special_tokens={},
+)
+
+
+def make_chunker(max_tokens: int, overlap_tokens: int = 0) -> TokenChunker:
+    return TokenChunker(
+        max_tokens=max_tokens, overlap_tokens=overlap_tokens, encoding=BYTE_ENCODING
+    )
+
+
+def test_short_text_is_a_single_chunk():
+    assert make_chunker(100).split("  One sentence. Two sentences.  ") == [
+        "One sentence. Two sentences."
+    ]
+
+
+def test_empty_text_has_no_chunks():
+    assert make_chunker(100).split(" \n ") == []
+
+
+def test_chunks_are_cut_on_sentence_boundaries():
+    text = "First sentence here. Second one! Third sentence is here? Last."
+    chunks = make_chunker(40).split(text)
+
+    assert chunks == ["First sentence here. Second one!", "Third sentence is here? Last."]
+    assert all(len(BYTE_ENCODING.encode(chunk)) <= 40 for chunk in chunks)
+
+
+def test_oversized_sentences_are_cut_on_word_boundaries():
+    text = "alpha beta gamma delta epsilon zeta eta theta"
+    chunks = make_chunker(12).split(text)
+
+    assert chunks == ["alpha beta", "gamma delta", "epsilon zeta", "eta theta"]
+
+
+def test_consecutive_chunks_overlap():
+    text = "one two three four five six seven eight nine ten"
+    chunks = make_chunker(20, overlap_tokens=6).split(text)
+
+    assert chunks[0] == "one two three four"
+    assert chunks[1].startswith("four")
+    assert chunks[-1].endswith("ten")
+    assert all(len(chunk) <= 20 for chunk in chunks)
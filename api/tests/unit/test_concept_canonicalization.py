@@ -0,0 +1,91 @@
+import pytest
+
+from src.schemas.upload import Concepts, SectionData
+from src.services.concept_canonicalization import ConceptCanonicalizer
+from src.utils.concept_names import normalize_concept_name
+
+
+class FakeProcessingRepository:
+    def __init__(self, library_matches):
+        self.library_matches = library_matches
+        self.lookups = []
+
+    async def find_similar_concepts(self, rows):
+        self.lookups.append([row["name"] for row in rows])
+        return {
+            row["name"]: self.library_matches[row["name"]]
+            for row in rows
+            if row["name"] in self.library_matches
+        }
+
+
+def make_section(concepts):
+    return SectionData(
+        section_id="section",
+        section_name="Section",
+        section_paragraphs_data=[],
+        concepts=[
+            Concepts(name=name, embedding=embedding) for name, embedding in concepts
+        ],
+    )
+
+
+def test_normalize_concept_name():
+    assert normalize_concept_name("  Neural   Networks. ") == "neural network"
+    assert normalize_concept_name('"Business Ethics"') == "business ethics"
+    assert normalize_concept_name("Hypotheses") == "hypothesis"
+    assert normalize_concept_name("Policies") == "policy"
+    assert normalize_concept_name("Boxes") == "box"
+    assert normalize_concept_name("Gas") == "gas"
+    assert normalize_concept_name("***") == ""
+
+
+@pytest.mark.asyncio
+async def test_canonicalizer_merges_near_duplicates():
+    repository = FakeProcessingRepository({"gradient descent": ("optimization", 0.95)})
+    canonicalizer = ConceptCanonicalizer(repository, threshold=0.9)
+
+    sections = await canonicalizer.canonicalize(
+        [
+            make_section(
+                [
+                    ("Neural Networks", [1.0, 0.0, 0.0]),
+                    ("neural network", [1.0, 0.0, 0.0]),
+                    ("Gradient Descent", [0.0, 1.0, 0.0]),
+                ]
+            ),
+            make_section(
+                [
+                    ("Neural network", [1.0, 0.0, 0.0]),
+                    ("Deep Nets", [0.99, 0.1, 0.0]),
+                    ("Tokenizer", [0.0, 0.0, 1.0]),
+                ]
+            ),
+        ]
+    )
+
+    first, second = sections
+    assert [concept.name for concept in first.concepts] == [
+        "neural network",
+        "optimization",
+    ]
+    assert first.concepts[0].aliases == ["Neural Networks"]
+    assert first.concepts[0].embedding.tolist() == [1.0, 0.0, 0.0]
+    # Concepts already in the library keep their stored embedding
+    assert first.concepts[1].aliases == ["Gradient Descent"]
+    assert len(first.concepts[1].embedding) == 0
+    # The most mentioned name of a cluster becomes the canonical concept
+    assert [concept.name for concept in second.concepts] == [
+        "neural network",
+        "tokenizer",
+    ]
+    assert second.concepts[0].aliases == ["Deep Nets", "Neural network"]
+
+    # Later windows reuse the canonical concepts of the book
+    (third,) = await canonicalizer.canonicalize(
+        [make_section([("Neural Nets", [0.98, 0.0, 0.05])])]
+    )
+    assert third.concepts[0].name == "neural network"
+    assert repository.lookups == [
+        ["neural network", "gradient descent", "deep net", "tokenizer"]
+    ]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.services.concept_index import ConceptIndexService
+from src.utils.ann_index import ConceptANNIndex
+
+
+def embedding(seed):
+    return np.random.default_rng(seed).normal(size=8).astype(np.float32)
+
+
+class FakeRetrievalRepository:
+    def __init__(self, concepts):
+        self.concepts = dict(concepts)
+
+    async def get_concept_names(self):
+        return list(self.concepts)
+
+    async def get_concept_embeddings(self, names):
+        return [(name, self.concepts[name]) for name in names]
+
+
+@pytest.mark.asyncio
+async def test_sync_adds_new_concepts_and_removes_deleted_ones(tmp_path):
+    repository = FakeRetrievalRepository(
+        {f"concept {i}": embedding(i) for i in range(20)}
+    )
+    service = ConceptIndexService(ConceptANNIndex(tmp_path, n_probe=100), repository)
+    await service.sync()
+    assert len(service.concept_index) == 20
+
+    # Concepts deleted by a book update while the API was down
+    del repository.concepts["concept 3"]
+    repository.concepts["concept 20"] = embedding(20)
+    service = ConceptIndexService(ConceptANNIndex(tmp_path, n_probe=100), repository)
+    await service.sync()
+
+    assert sorted(service.concept_index.names()) == sorted(repository.concepts)
+    assert service.concept_index.search(embedding(3).tolist(), k=1)[0][0] != "concept 3"
+
+    await service.remove_concepts(["concept 4"])
+    assert "concept 4" not in service.concept_index
@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.services.embeddings import EmbeddingService
+from src.utils.llm_scheduler import LLMScheduler
+
+
+class FakeOllamaClient:
+    def __init__(self):
+        self.requests = []
+
+    async def embed(self, model, input):
+        self.requests.append(list(input))
+        return SimpleNamespace(embeddings=[[float(len(text))] for text in input])
+
+
+class FakeEmbeddingCache:
+    def __init__(self, embeddings):
+        self.embeddings = dict(embeddings)
+
+    async def get_embeddings(self, model, texts):
+        return {text: self.embeddings[text] for text in texts if text in self.embeddings}
+
+    async def set_embeddings(self, model, embeddings):
+        self.embeddings.update(embeddings)
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_deduplicates_and_batches_missing_texts():
+    ollama_client = FakeOllamaClient()
+    embedding_cache = FakeEmbeddingCache({"cached": np.array([42.0], np.float32)})
+    embedding_service = EmbeddingService(
+        ollama_client=ollama_client,
+        embedding_cache=embedding_cache,
+        llm_scheduler=LLMScheduler(max_in_flight=1),
+        model="test-model",
+        batch_size=2,
+    )
+
+    embeddings = await embedding_service.embed_texts(
+        ["a", "bb", "a", "cached", "ccc", "bb"]
+    )
+
+    assert {text: embedding.tolist() for text, embedding in embeddings.items()} == {
+        "a": [1.0],
+        "bb": [2.0],
+        "cached": [42.0],
+        "ccc": [3.0],
+    }
+    assert embeddings["ccc"].dtype == np.float32
+    assert ollama_client.requests == [["a", "bb"], ["ccc"]]
+    assert embedding_cache.embeddings["ccc"].tolist() == [3.0]
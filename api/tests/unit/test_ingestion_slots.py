@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from src.tasks import dispatch_waiting_documents
+from src.utils.distributed_semaphore import RedisSemaphore
+
+
+class FakeSemaphore:
+    def __init__(self, limit, holders):
+        self.limit = limit
+        self.holders = holders
+
+    async def holders_count(self):
+        return self.holders
+
+
+class FakeProcessingRepository:
+    def __init__(self, waiting_documents):
+        self.waiting_documents = list(waiting_documents)
+
+    async def pop_waiting_document(self):
+        return self.waiting_documents.pop(0) if self.waiting_documents else None
+
+
+def waiting_document(document_id, last_completed_stage=""):
+    return {
+        "_id": document_id,
+        "file_location": f"/library/{document_id}.pdf",
+        "last_completed_stage": last_completed_stage,
+    }
+
+
+@pytest.mark.asyncio
+async def test_dispatch_queues_one_waiting_document_per_free_slot():
+    repository = FakeProcessingRepository(
+        [waiting_document("a"), waiting_document("b", "PARSED"), waiting_document("c")]
+    )
+    enqueued = []
+
+    def enqueue(pdf_url, document_id, resume_from=""):
+        enqueued.append((pdf_url, document_id, resume_from))
+
+    dispatched = await dispatch_waiting_documents(
+        FakeSemaphore(limit=4, holders=2), repository, enqueue
+    )
+
+    assert dispatched == 2
+    assert enqueued == [
+        ("/library/a.pdf", "a", ""),
+        ("/library/b.pdf", "b", "PARSED"),
+    ]
+    assert len(repository.waiting_documents) == 1
+
+    # No slot free, or no limit at all: nothing waits to be dispatched
+    for semaphore in (FakeSemaphore(limit=4, holders=4), FakeSemaphore(0, 0)):
+        assert await dispatch_waiting_documents(semaphore, repository, enqueue) == 0
+    assert len(enqueued) == 2
+
+
+class FakeRedis:
+    def __init__(self):
+        self.leases = []
+
+    async def eval(self, script, keys_count, key, now, expiry, holder, limit):
+        self.leases.append((holder, expiry))
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_while_the_stage_runs():
+    redis_client = FakeRedis()
+    semaphore = RedisSemaphore(redis_client, "slots", limit=4, lease_seconds=0.03)
+
+    async with semaphore.keep_lease("a"):
+        await asyncio.sleep(0.1)
+    renewals = len(redis_client.leases)
+    await asyncio.sleep(0.05)
+
+    assert renewals >= 2
+    assert {holder for holder, _ in redis_client.leases} == {"a"}
+    # Renewals stop with the stage
+    assert len(redis_client.leases) == renewals
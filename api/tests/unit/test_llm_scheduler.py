@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from src.utils.llm_scheduler import LLMScheduler, Priority
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_are_served_before_bulk_ones():
+    scheduler = LLMScheduler(max_in_flight=1)
+    release_first_request = asyncio.Event()
+    served = []
+
+    async def request(name):
+        if name == "first":
+            await release_first_request.wait()
+        served.append(name)
+
+    first = asyncio.create_task(scheduler.submit("model", lambda: request("first")))
+    await asyncio.sleep(0)
+    bulk = asyncio.create_task(
+        scheduler.submit("model", lambda: request("bulk"), Priority.BULK)
+    )
+    interactive = asyncio.create_task(
+        scheduler.submit("model", lambda: request("interactive"), Priority.INTERACTIVE)
+    )
+    await asyncio.sleep(0)
+    release_first_request.set()
+    await asyncio.gather(first, bulk, interactive)
+
+    assert served == ["first", "interactive", "bulk"]
+    assert scheduler.get_limiter("model").in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_timeouts_are_retried_then_raised():
+    scheduler = LLMScheduler(
+        max_in_flight=2, request_timeout=0.01, max_retries=2, backoff_base=0
+    )
+    attempts = 0
+
+    async def slow_request():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.submit("model", slow_request)
+    assert attempts == 3
+    assert scheduler.get_limiter("model").in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_are_raised_immediately():
+    scheduler = LLMScheduler(max_in_flight=1, max_retries=3, backoff_base=0)
+    attempts = 0
+
+    async def failing_request():
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("invalid request")
+
+    with pytest.raises(ValueError):
+        await scheduler.submit("model", failing_request)
+    assert attempts == 1
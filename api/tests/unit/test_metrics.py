@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from src.repository.neo4j_writer import BatchWriteStats
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.utils.llm_scheduler import LLMScheduler
+from src.utils.metrics import (
+    IngestionMetrics,
+    collect_metrics,
+    render_prometheus,
+    sum_metrics,
+)
+
+
+def to_document_metrics(increments):
+    # Nest the `$inc` keys like MongoDB does
+    document_metrics = {}
+    for key, value in increments.items():
+        _, group, label, field = key.split(".")
+        document_metrics.setdefault(group, {}).setdefault(label, {})[field] = value
+    return document_metrics
+
+
+@pytest.mark.asyncio
+async def test_scheduler_records_requests_into_the_current_metrics():
+    scheduler = LLMScheduler(max_in_flight=1)
+    metrics = IngestionMetrics()
+
+    async def request():
+        return SimpleNamespace(prompt_eval_count=12, eval_count=5)
+
+    with collect_metrics(metrics):
+        await scheduler.submit("llama3.2", request)
+        await scheduler.submit("llama3.2", request)
+    # Requests outside of a stage are not recorded
+    await scheduler.submit("llama3.2", request)
+
+    assert metrics.counters["ollama.llama3_2.requests"] == 2
+    assert metrics.counters["ollama.llama3_2.prompt_tokens"] == 24
+    assert metrics.counters["ollama.llama3_2.completion_tokens"] == 10
+
+
+def test_documents_metrics_are_summed_and_rendered():
+    documents_metrics = []
+    for seconds in (1.5, 2.5):
+        metrics = IngestionMetrics()
+        metrics.record_stage("PARSING", seconds)
+        metrics.record_neo4j_batches(
+            [BatchWriteStats(name="paragraphs", rows=500, seconds=0.25)] * 2
+        )
+        documents_metrics.append(to_document_metrics(metrics.as_increments()))
+
+    totals = sum_metrics(documents_metrics)
+    output = render_prometheus(totals, {"COMPLETED": 2})
+
+    assert 'ai_library_documents{status="COMPLETED"} 2' in output
+    assert 'ai_library_ingestion_stages_runs_total{stage="PARSING"} 2' in output
+    assert 'ai_library_ingestion_stages_seconds_total{stage="PARSING"} 4' in output
+    assert 'ai_library_ingestion_neo4j_rows_total{query="paragraphs"} 2000' in output
+    assert "# TYPE ai_library_ingestion_ollama_requests_total counter" in output
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+
+    async def update_one(self, query, update, upsert=False):
+        if query["_id"] not in self.documents and not upsert:
+            return
+        document = self.documents.setdefault(query["_id"], {})
+        document.update(update.get("$set", {}))
+        for key, value in update.get("$inc", {}).items():
+            *parents, field = key.split(".")
+            nested = document
+            for parent in parents:
+                nested = nested.setdefault(parent, {})
+            nested[field] = nested.get(field, 0) + value
+
+    async def find_one(self, query, projection=None):
+        return self.documents.get(query["_id"])
+
+
+class FakeMongoDB:
+    def __init__(self):
+        self.collections = {
+            "pdf_processing": FakeCollection(),
+            "processing_metrics": FakeCollection(),
+        }
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+
+@pytest.mark.asyncio
+async def test_library_totals_are_kept_when_a_document_is_reprocessed():
+    repository = PDFProcessingRepository(None, None, FakeMongoDB())
+    documents = repository.mongodb_client.get_collection("pdf_processing")
+    document_ids = ["0" * 24, "1" * 24]
+    for document_id in document_ids:
+        await documents.update_one({"_id": ObjectId(document_id)}, {}, upsert=True)
+        metrics = IngestionMetrics()
+        metrics.record_stage("PARSING", 2.0)
+        await repository.increment_processing_metrics(
+            document_id, metrics.as_increments()
+        )
+
+    # Reprocessing resets the metrics of the document, not the totals
+    await documents.update_one(
+        {"_id": ObjectId(document_ids[0])}, {"$set": {"metrics": {}}}
+    )
+    totals = sum_metrics([await repository.get_processing_metrics()])
+
+    assert totals == {"stages.PARSING.runs": 2, "stages.PARSING.seconds": 4.0}
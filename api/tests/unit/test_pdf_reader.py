@@ -0,0 +1,59 @@
+from llmsherpa.readers import Document
+
+from src.schemas.upload import SectionData
+from src.utils.pdf_reader import flatten_sections, paragraph_id, section_id
+
+
+def block(tag, level, page_idx, text):
+    return {"tag": tag, "level": level, "page_idx": page_idx, "sentences": [text]}
+
+
+def test_flatten_sections_keeps_every_paragraph_once_under_its_section():
+    blocks = [
+        block("header", 0, 0, "Chapter 1"),
+        block("para", 1, 0, "Introduction of the chapter."),
+        block("header", 1, 0, "Section 1.1"),
+        block("list_item", 2, 1, "A list item."),
+        block("para", 2, 1, "A paragraph."),
+        block("list_item", 2, 1, "Its list item."),
+        block("header", 0, 2, "Chapter 2"),
+    ]
+    for index, layout_block in enumerate(blocks):
+        layout_block["block_idx"] = index
+
+    chapter, section, last_chapter = [
+        SectionData(**section) for section in flatten_sections(Document(blocks))
+    ]
+
+    assert chapter.parent_section == ""
+    assert [paragraph.text for paragraph in chapter.section_paragraphs_data] == [
+        "Introduction of the chapter."
+    ]
+    assert chapter.section_text == "Chapter 1\nIntroduction of the chapter."
+
+    assert section.parent_section == "Chapter 1"
+    assert [
+        (paragraph.position, paragraph.page, paragraph.text)
+        for paragraph in section.section_paragraphs_data
+    ] == [(0, 2, "A list item."), (1, 2, "A paragraph.\nIts list item.")]
+    assert section.section_paragraphs_data[0].id == paragraph_id("A list item.")
+
+    assert last_chapter.section_paragraphs_data == []
+    assert last_chapter.section_text == "Chapter 2"
+
+
+def test_sections_of_the_same_name_have_distinct_stable_ids():
+    def section_ids(titles):
+        blocks = [block("header", 0, 0, "Chapter 1")] + [
+            block("header", 1, 0, title) for title in titles
+        ]
+        for index, layout_block in enumerate(blocks):
+            layout_block["block_idx"] = index
+        return [section["section_id"] for section in flatten_sections(Document(blocks))]
+
+    chapter, first, second = section_ids(["Exercises", "Exercises"])
+    assert len({chapter, first, second}) == 3
+    assert first == section_id("Chapter 1", "Exercises", 0)
+
+    # Other sections inserted before them don't change their ids
+    assert section_ids(["Summary", "Exercises", "Exercises"])[2:] == [first, second]
@@ -0,0 +1,14 @@
+from src.utils.ranking import reciprocal_rank_fusion
+
+
+def test_items_ranked_by_both_rankings_come_first():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["d", "c", "a"]], k=60)
+
+    assert [item for item, _ in fused] == ["a", "c", "d", "b"]
+    assert fused[0][1] == 1 / 61 + 1 / 63
+
+
+def test_single_ranking_keeps_its_order():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], []])
+
+    assert [item for item, _ in fused] == ["x", "y", "z"]
@@ -0,0 +1,116 @@
+import pytest
+
+from src.repository.search_cache import SearchCache
+from src.schemas.retrieval import SearchResult, SearchResults
+from src.services.retrieval import RetrievalService
+from src.utils.events import LIBRARY_VERSION_KEY
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = ex
+
+
+class FailingRedis:
+    async def get(self, key):
+        raise ConnectionError("Redis is down")
+
+    async def set(self, key, value, ex=None):
+        raise ConnectionError("Redis is down")
+
+
+SEARCH_RESULTS = SearchResults(
+    results=[
+        SearchResult(
+            id="1",
+            title="Introduction",
+            book="Deep Learning",
+            author="Unknown",
+            page=3,
+            relevance=0.9,
+            excerpt="Neural networks",
+        )
+    ]
+)
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert SearchCache.normalize_query("  Neural\tNETWORKS \n") == "neural networks"
+
+
+@pytest.mark.asyncio
+async def test_embedding_round_trip():
+    redis_client = FakeRedis()
+    search_cache = SearchCache(redis_client, embedding_ttl=60, results_ttl=10)
+
+    await search_cache.set_embedding("model", "neural networks", [0.5, -1.0])
+
+    assert await search_cache.get_embedding("model", "neural networks") == [0.5, -1.0]
+    assert await search_cache.get_embedding("other-model", "neural networks") is None
+    assert list(redis_client.ttls.values()) == [60]
+
+
+@pytest.mark.asyncio
+async def test_results_are_invalidated_by_a_new_library_version():
+    redis_client = FakeRedis()
+    search_cache = SearchCache(redis_client, embedding_ttl=60, results_ttl=10)
+
+    assert await search_cache.get_library_version() == 0
+    await search_cache.set_results("neural networks", 0, SEARCH_RESULTS, page=1)
+    assert await search_cache.get_results("neural networks", 0, page=1) == SEARCH_RESULTS
+    assert await search_cache.get_results("neural networks", 0, page=2) is None
+
+    redis_client.values[LIBRARY_VERSION_KEY] = b"1"
+    assert await search_cache.get_library_version() == 1
+    assert await search_cache.get_results("neural networks", 1, page=1) is None
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_cache_misses():
+    search_cache = SearchCache(FailingRedis(), embedding_ttl=60, results_ttl=10)
+
+    await search_cache.set_embedding("model", "query", [1.0])
+    await search_cache.set_results("query", 0, SEARCH_RESULTS)
+
+    assert await search_cache.get_library_version() is None
+    assert await search_cache.get_embedding("model", "query") is None
+    assert await search_cache.get_results("query", 0) is None
+
+
+class FakeConceptIndex:
+    def __init__(self, generation):
+        self.generation = generation
+
+    def __len__(self):
+        return self.generation
+
+
+@pytest.mark.asyncio
+async def test_results_of_a_previous_ann_index_are_not_served():
+    service = RetrievalService.__new__(RetrievalService)
+    service.search_cache = SearchCache(FakeRedis(), embedding_ttl=60, results_ttl=10)
+    service.concept_index = FakeConceptIndex(generation=10)
+    searches = []
+
+    async def get_search_results(user_query, page, per_page):
+        searches.append(service.concept_index.generation)
+        return SEARCH_RESULTS
+
+    service.get_search_results = get_search_results
+
+    await service.search("Neural networks")
+    await service.search("neural networks")
+    assert searches == [10]
+
+    # The book ingested was indexed since: searched again, with the new index
+    service.concept_index.generation = 12
+    await service.search("neural networks")
+    assert searches == [10, 12]
@@ -0,0 +1,138 @@
+import pytest
+
+from src.repository.pdf_processing import section_fingerprint
+from src.schemas.upload import SectionData, SectionParagraphData
+from src.services.pdf_processing import PDFProcessorService
+from src.utils.pdf_reader import paragraph_id, section_id
+
+
+def make_section(name, text, parent="", occurrence=0):
+    return SectionData(
+        section_id=section_id(parent, name, occurrence),
+        section_name=name,
+        parent_section=parent,
+        section_paragraphs_data=[
+            SectionParagraphData(
+                id=paragraph_id(text), position=0, level=1, text=text, page=1
+            )
+        ],
+    )
+
+
+class FakeProcessingRepository:
+    def __init__(self, stored_sections, parsed_sections, stored_indexes=()):
+        self.stored_fingerprints = {
+            section.section_id: section_fingerprint(section)
+            for section in stored_sections
+        }
+        self.parsed_sections = parsed_sections
+        self.stored_indexes = set(stored_indexes)
+        self.deleted = []
+        self.cleared = []
+        self.progress = 0
+        self.metadata = {}
+
+    async def get_stored_section_fingerprints(self, document_id):
+        return self.stored_fingerprints
+
+    async def get_checkpoint_section_fingerprints(self, document_id, stage):
+        return [
+            (index, section.section_id, section_fingerprint(section))
+            for index, section in enumerate(self.parsed_sections)
+        ]
+
+    async def get_checkpoint_section_indexes(self, document_id, stage):
+        return set(self.stored_indexes)
+
+    async def delete_sections_in_neo4j(self, document_id, section_ids):
+        self.deleted.extend(section_ids)
+        return []
+
+    async def clear_sections_in_neo4j(self, document_id, section_ids):
+        self.cleared.extend(section_ids)
+        return []
+
+    async def mark_sections_checkpoint(self, document_id, stage, indexes):
+        self.stored_indexes.update(indexes)
+
+    async def increment_processing_progress(self, document_id, sections, concepts):
+        self.progress += sections
+
+    async def update_pdf_processing_metadata(self, document):
+        self.metadata.update(document.model_dump(exclude_unset=True))
+
+
+def make_service(repository):
+    # The diff only needs the repository, not the clients
+    service = PDFProcessorService.__new__(PDFProcessorService)
+    service.processing_repository = repository
+    return service
+
+
+@pytest.mark.asyncio
+async def test_diff_sections_only_leaves_changed_and_new_sections_to_process():
+    repository = FakeProcessingRepository(
+        stored_sections=[
+            make_section("Introduction", "Hello"),
+            make_section("Chapter 1", "First draft"),
+            make_section("Chapter 2", "Kept"),
+            make_section("Appendix", "Removed"),
+        ],
+        parsed_sections=[
+            make_section("Introduction", "Hello"),
+            make_section("Chapter 1", "Second edition"),
+            make_section("Chapter 2", "Kept"),
+            make_section("Chapter 3", "New"),
+        ],
+    )
+
+    await make_service(repository)._diff_sections("book")
+
+    assert repository.stored_indexes == {0, 2}
+    assert repository.progress == 2
+    assert repository.cleared == [section_id("", "Chapter 1", 0)]
+    assert repository.deleted == [section_id("", "Appendix", 0)]
+    assert repository.metadata["sections_unchanged"] == 2
+    assert repository.metadata["sections_removed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_diff_sections_compares_sections_of_the_same_name_independently():
+    repository = FakeProcessingRepository(
+        stored_sections=[
+            make_section("Exercises", "Graphs", "Chapter 1"),
+            make_section("Exercises", "Trees", "Chapter 2"),
+            make_section("Exercises", "More trees", "Chapter 2", occurrence=1),
+        ],
+        parsed_sections=[
+            make_section("Exercises", "Graphs", "Chapter 1"),
+            make_section("Exercises", "Forests", "Chapter 2"),
+        ],
+    )
+
+    await make_service(repository)._diff_sections("book")
+
+    assert repository.stored_indexes == {0}
+    assert repository.cleared == [section_id("Chapter 2", "Exercises", 0)]
+    assert repository.deleted == [section_id("Chapter 2", "Exercises", 1)]
+    assert repository.metadata["sections_unchanged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_diff_sections_skips_new_books_and_counts_only_the_first_attempt():
+    repository = FakeProcessingRepository(
+        stored_sections=[], parsed_sections=[make_section("Introduction", "Hello")]
+    )
+    await make_service(repository)._diff_sections("book")
+    assert repository.stored_indexes == set()
+    assert repository.metadata == {}
+
+    # A retry after the first section was stored doesn't count it again
+    repository = FakeProcessingRepository(
+        stored_sections=[make_section("Introduction", "Hello")],
+        parsed_sections=[make_section("Introduction", "Hello")],
+        stored_indexes=[0],
+    )
+    await make_service(repository)._diff_sections("book")
+    assert repository.progress == 0
+    assert repository.metadata == {}
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from src.schemas.upload import Concepts, SectionData
+from src.services.pdf_processing import PDFProcessorService
+from src.utils.vectors import centroid, group_centroids
+
+
+class FakeEmbeddingService:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    async def embed_texts(self, texts):
+        return {text: np.asarray(self.embeddings[text]) for text in texts}
+
+
+def make_section(name, concepts):
+    return SectionData(
+        section_id=name,
+        section_name=name,
+        section_paragraphs_data=[],
+        concepts=[Concepts(name=concept) for concept in concepts],
+    )
+
+
+def test_centroids_weigh_vectors_alike_whatever_their_norm():
+    centroids = group_centroids(
+        np.array([[2.0, 0.0], [0.0, 1.0], [0.0, 3.0]]), np.array([0, 0, 2]), 3
+    )
+    np.testing.assert_allclose(centroids, [[0.7071068, 0.7071068], [0, 0], [0, 1]])
+
+    np.testing.assert_allclose(
+        centroid([[1.0, 0.0], [0.0, 1.0]], weights=[3, 1]),
+        np.array([3.0, 1.0]) / np.sqrt(10),
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_embeds_sections_as_the_centroid_of_their_concepts():
+    # Embedding only needs the embedding service, not the clients
+    service = PDFProcessorService.__new__(PDFProcessorService)
+    service.embedding_service = FakeEmbeddingService(
+        {"graph": [1.0, 0.0, 0.0], "tree": [0.0, 2.0, 0.0]}
+    )
+
+    first, second, empty = await service._get_embeddings(
+        [
+            make_section("Graphs", ["graph", "tree"]),
+            make_section("Trees", ["tree"]),
+            make_section("Preface", []),
+        ]
+    )
+
+    assert first.concepts[1].embedding.tolist() == [0.0, 2.0, 0.0]
+    np.testing.assert_allclose(first.embedding, [0.7071068, 0.7071068, 0.0])
+    np.testing.assert_allclose(second.embedding, [0.0, 1.0, 0.0])
+    assert len(empty.embedding) == 0
+    # Section embeddings are not checkpointed
+    assert "embedding" not in first.model_dump()
+
+
+class FakeConceptCache:
+    async def get_concepts(self, model, prompt_version, chunk):
+        return ["graph", "", "  ", " tree "]
+
+
+class FakeChunker:
+    def split(self, text):
+        return [text]
+
+
+@pytest.mark.asyncio
+async def test_extract_concepts_drops_blank_names():
+    service = PDFProcessorService.__new__(PDFProcessorService)
+    service.concept_cache = FakeConceptCache()
+    service.chunker = FakeChunker()
+    service.embedding_service = FakeEmbeddingService(
+        {"graph": [1.0, 0.0], "tree": [0.0, 1.0]}
+    )
+
+    section = await service._extract_concepts_from_section(
+        make_section("Graphs", [])
+    )
+    assert sorted(concept.name for concept in section.concepts) == ["graph", "tree"]
+
+    # Every name left can be embedded
+    (section,) = await service._get_embeddings([section])
+    np.testing.assert_allclose(section.embedding, [0.7071068, 0.7071068])
@@ -0,0 +1,48 @@
+import pytest
+
+from src.repository.pdf_processing import PDFProcessingRepository
+from src.schemas.upload import SectionData, SectionParagraphData
+from src.utils.pdf_reader import paragraph_id
+
+
+class FakeNeo4jWriter:
+    def __init__(self):
+        self.writes = {}
+
+    async def write(self, name, query, rows, document_id=None):
+        self.writes[name] = (query, rows)
+        return []
+
+
+def make_paragraph(position, text):
+    return SectionParagraphData(
+        id=paragraph_id(text), position=position, level=1, text=text, page=1
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_paragraph_is_linked_once_per_position():
+    # Rows are only sent to the writer, no driver is needed
+    repository = PDFProcessingRepository.__new__(PDFProcessingRepository)
+    repository.neo4j_writer = FakeNeo4jWriter()
+    section = SectionData(
+        section_id="section",
+        section_name="Tables",
+        section_paragraphs_data=[
+            make_paragraph(0, "Table 1."),
+            make_paragraph(1, "(continued)"),
+            make_paragraph(2, "Table 2."),
+            make_paragraph(3, "(continued)"),
+        ],
+    )
+
+    await repository.store_sections_in_neo4j("book", [section])
+
+    _, paragraph_rows = repository.neo4j_writer.writes["paragraphs"]
+    assert len(paragraph_rows) == 3
+    query, rows = repository.neo4j_writer.writes["section_paragraphs"]
+    assert [
+        row["position"] for row in rows if row["id"] == paragraph_id("(continued)")
+    ] == [1, 3]
+    # The relationship is merged on the position, not one per paragraph
+    assert "[r:HAS_PARAGRAPH {position: row.position}]" in query
@@ -0,0 +1,50 @@
+import hashlib
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from src.config.settings import app_settings
+from src.routers.v1.upload import save_upload
+
+PDF_CONTENT = b"%PDF-1.7\n" + b"x" * 5000
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(app_settings, "UPLOAD_CHUNK_SIZE", 1024)
+
+
+@pytest.mark.asyncio
+async def test_save_upload_streams_the_file_and_returns_its_checksum(tmp_path, small_chunks):
+    destination = tmp_path / "book.pdf"
+
+    checksum = await save_upload(UploadFile(BytesIO(PDF_CONTENT)), destination)
+
+    assert destination.read_bytes() == PDF_CONTENT
+    assert checksum == hashlib.sha256(PDF_CONTENT).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_save_upload_rejects_files_over_the_size_limit(
+    tmp_path, small_chunks, monkeypatch
+):
+    monkeypatch.setattr(app_settings, "MAX_UPLOAD_SIZE", 4096)
+    destination = tmp_path / "book.pdf"
+
+    with pytest.raises(HTTPException) as error:
+        await save_upload(UploadFile(BytesIO(PDF_CONTENT)), destination)
+
+    assert error.value.status_code == 413
+    assert not destination.exists()
+
+
+@pytest.mark.asyncio
+async def test_save_upload_rejects_files_that_are_not_pdfs(tmp_path, small_chunks):
+    destination = tmp_path / "book.pdf"
+
+    with pytest.raises(HTTPException) as error:
+        await save_upload(UploadFile(BytesIO(b"<html></html>")), destination)
+
+    assert error.value.status_code == 422
+    assert not destination.exists()